@@ -27,6 +27,12 @@ from difference_viewer.app.config import get_resource_icon_path
 def main() -> None:
     logger = logging.getLogger(__name__)
 
+    # headless modes do not create the qapplication
+    if len(sys.argv) > 1 and sys.argv[1] in ("compare", "batch"):
+        from difference_viewer.app.cli import main as cli_main
+
+        sys.exit(cli_main(sys.argv[1:]))
+
     # initialize qapplication
     logger.info("Starting application")
 
@@ -85,6 +91,7 @@ def main() -> None:
 
     # run applicaton
     app_controller = AppController(config)
+    app.aboutToQuit.connect(app_controller.close)
     app_controller.run()
 
     if splash is not None:
@@ -16,8 +16,22 @@
 from __future__ import annotations
 
 import logging
-
-from difference_viewer.app.config import Theme, UserConfig, apply_theme
+import time
+from pathlib import Path
+from typing import Generator
+
+import numpy as np
+from PyQt5.QtCore import QRectF
+
+from difference_viewer.app.config import (
+    AppConfig,
+    Theme,
+    UserConfig,
+    apply_theme,
+)
+from difference_viewer.components.dialog.file_dialog import FileSaveDialog
+from difference_viewer.components.dialog.loading_dialog import LoadingDialog
+from difference_viewer.components.dialog.message_dialog import ErrorDialog
 from difference_viewer.components.display.display_model import DisplayModel
 from difference_viewer.components.display.display_view import DisplayView
 from difference_viewer.components.display.display_vm import DisplayViewModel
@@ -28,13 +42,26 @@ from difference_viewer.components.page.page_view import PageView
 from difference_viewer.components.page.page_vm import PageViewModel
 from difference_viewer.components.prefs_window.prefs_view import PrefsWindow
 from difference_viewer.components.prefs_window.prefs_vm import PrefsViewModel
-from difference_viewer.core.imaging import (
-    DifferenceDetector,
-    add_rect_padding,
-    draw_rect_contours,
-    hex_to_rgb,
+from difference_viewer.core.alignment import align_pages
+from difference_viewer.core.box_index import BoxIndex
+from difference_viewer.core.imaging import BoxSet, DifferenceDetector
+from difference_viewer.core.comparison import (
+    PageDifference,
+    choose_page_transform,
+    compare_pages,
+    create_pair_summary,
+    merge_page_rects,
+    refine_region_rects,
+    summarize_page_pair,
+)
+from difference_viewer.core.report import ReportWriter, create_pair_record
+from difference_viewer.core.registration import (
+    PageTransform,
+    is_identity_transform,
+    transform_rects,
 )
-from difference_viewer.core.shared_model import ndarray_to_pixmap
+from difference_viewer.core.shared_model import IterationWorker, PageImage
+from difference_viewer.widgets.tiled_page import TileCache
 
 
 class AppController:
@@ -43,18 +70,45 @@ class AppController:
         self.__logger = logging.getLogger(self.__class__.__name__)
 
         self._user_config = user_config
-        self._drawer = DifferenceDetector()
+        self._drawer = DifferenceDetector(
+            tile_size=AppConfig.diff_tile_size,
+            coarse_scale=AppConfig.diff_coarse_scale,
+            box_backend=AppConfig.diff_box_backend,
+            n_threads=AppConfig.diff_threads,
+        )
+        self._transform_cache = (None, None, None)
+        self._diff_request = 0
+        self._diff_workers = set()
+        self._full_resolution_worker = None
+        self._full_resolution_pending = None
+        self._page_pairs = []
+        self._pair_index = 0
+        self._pair_of_page = ({}, {})
+        self._sync_turning = False
+        self._pair_summary = create_pair_summary(0)
+        self._summary_request = 0
+        self._summary_workers = set()
+        self._export_workers = set()
+        self._shown_options = None
+        self._summary_options = None
+        self._shown_boxes = None
+        self._details = [None, None]
+        self._diff_boxes = BoxSet()
+        self._diff_boxes_r = BoxSet()
+        self._diff_index = BoxIndex(BoxSet())
+        self._diff_cursor = -1
 
         self.__logger.debug("Initializing UI components")
 
         # initialize display component
-        self.display_model = DisplayModel()
+        self.display_model = DisplayModel(AppConfig.view_sync_interval)
 
         self.display_vm1 = DisplayViewModel(self.display_model, user_config)
         self.display_vm2 = DisplayViewModel(self.display_model, user_config)
 
-        self.display_view1 = DisplayView(self.display_vm1)
-        self.display_view2 = DisplayView(self.display_vm2)
+        self.tile_cache = TileCache(AppConfig.tile_cache_size)
+        self.display_view1 = DisplayView(self.display_vm1, self.tile_cache)
+        self.display_view2 = DisplayView(self.display_vm2, self.tile_cache)
 
         # initialize page component
         self.page_model1 = PageModel()
@@ -96,25 +150,52 @@ class AppController:
         self.page_vm2.loading_canceled.connect(
             lambda: self.main_vm.switch_window_state(True)
         )
+        self.page_vm1.loading_finished.connect(self._drop_unloaded_tiles)
+        self.page_vm2.loading_finished.connect(self._drop_unloaded_tiles)
         self.page_vm1.loading_finished.connect(self._update_widgets_state)
         self.page_vm2.loading_finished.connect(self._update_widgets_state)
 
         # setup signals for sync page turning
-        self.main_vm.turn_first_requested.connect(self.page_vm1.turn_first)
-        self.main_vm.turn_first_requested.connect(self.page_vm2.turn_first)
-        self.main_vm.turn_prev_requested.connect(self.page_vm1.turn_prev)
-        self.main_vm.turn_prev_requested.connect(self.page_vm2.turn_prev)
-        self.main_vm.turn_next_requested.connect(self.page_vm1.turn_next)
-        self.main_vm.turn_next_requested.connect(self.page_vm2.turn_next)
-        self.main_vm.turn_last_requested.connect(self.page_vm1.turn_last)
-        self.main_vm.turn_last_requested.connect(self.page_vm2.turn_last)
+        self.main_vm.turn_first_requested.connect(lambda: self._turn_pair(0))
+        self.main_vm.turn_prev_requested.connect(
+            lambda: self._turn_pair(self._current_pair_index() - 1)
+        )
+        self.main_vm.turn_next_requested.connect(
+            lambda: self._turn_pair(self._current_pair_index() + 1)
+        )
+        self.main_vm.turn_last_requested.connect(
+            lambda: self._turn_pair(len(self._page_pairs) - 1)
+        )
+        self.main_vm.turn_prev_changed_requested.connect(
+            lambda: self._turn_changed_pair(-1)
+        )
+        self.main_vm.turn_next_changed_requested.connect(
+            lambda: self._turn_changed_pair(1)
+        )
+        self.main_vm.turn_pair_requested.connect(self._turn_pair)
+        self.main_vm.step_difference_requested.connect(
+            self._step_difference
+        )
+        self.main_vm.focus_difference_requested.connect(
+            self._focus_difference
+        )
+        self.display_vm1.box_clicked.connect(self._select_difference)
+        self.display_vm2.box_clicked.connect(self._select_difference)
         self.main_vm.reset_view_requested.connect(self.display_vm1.reset_view)
         self.main_vm.reset_view_requested.connect(self.display_vm2.reset_view)
+        self.main_vm.export_report_requested.connect(self._export_report)
 
         # setup signals for difference display
         self.page_vm1.image_updated.connect(self._update_display)
         self.page_vm2.image_updated.connect(self._update_display)
-        self.prefs_vm.bbox_style_changed.connect(self._update_display)
+        self.display_vm1.detail_updated.connect(
+            lambda img, region: self._update_detail(0, img, region)
+        )
+        self.display_vm2.detail_updated.connect(
+            lambda img, region: self._update_detail(1, img, region)
+        )
+        self.prefs_vm.bbox_style_changed.connect(self._update_box_style)
+        self.prefs_vm.diff_mode_changed.connect(self._apply_detector_options)
 
         # setup signals for windows
         self.main_vm.open_prefs_requested.connect(self.prefs_window.show)
@@ -129,9 +210,14 @@ class AppController:
 
         self.main_vm.switch_button_state("fit", False)
         self.main_vm.switch_button_state("turn", False)
+        self.main_vm.switch_button_state("export", False)
         self.main_vm.switch_warning_visibility("size", False)
         self.main_vm.switch_warning_visibility("type", False)
+        self.main_vm.switch_warning_visibility("inserted", False)
+        self.main_vm.switch_warning_visibility("deleted", False)
 
+        self.display_vm1.update_box_style()
+        self.display_vm2.update_box_style()
         self._update_theme()
 
         self.__logger.debug("UI components initialized")
@@ -140,9 +226,23 @@ class AppController:
         self.main_window.show()
         self.__logger.debug("Main window opened")
 
+    def close(self) -> None:
+        self.page_vm1.close()
+        self.page_vm2.close()
+
     def _update_display(self) -> None:
+        if self._sync_turning:
+            return
+        self._show_current_pages()
+        self._prefetch_neighbors()
+
+    def _show_current_pages(self) -> None:
         has_img_l = self.page_vm1.has_image()
         has_img_r = self.page_vm2.has_image()
+        self._diff_request += 1
+        self._shown_boxes = None
+        self._details = [None, None]
+        self._update_diff_index()
 
         if has_img_l:
             img_l = self.page_vm1.image
@@ -150,47 +250,652 @@ class AppController:
             img_r = self.page_vm2.image
 
         if has_img_l and has_img_r:
-            if img_l.shape != img_r.shape:
-                self.main_vm.switch_warning_visibility("size", True)
-                self.display_vm1.update_pixmap(ndarray_to_pixmap(img_l.data))
-                self.display_vm2.update_pixmap(ndarray_to_pixmap(img_r.data))
+            self.main_vm.update_summary(
+                self._pair_summary,
+                self._current_pair_index(),
+            )
+            self.main_vm.switch_warning_visibility(
+                "size",
+                img_l.shape != img_r.shape,
+            )
+            deleted, inserted = self._unmatched_pages()
+            self.main_vm.switch_warning_visibility("deleted", deleted)
+            self.main_vm.switch_warning_visibility("inserted", inserted)
+            if deleted or inserted:
+                self.display_vm1.update_page(img_l)
+                self.display_vm2.update_page(img_r)
                 return
-            else:
-                self.main_vm.switch_warning_visibility("size", False)
-
-            rects_l, rects_r = self._drawer.get_bboxes(
-                img1=img_l.data,
-                img2=img_r.data,
-                n_merge=self._user_config.bbox_merge_level,
-            )
-            diff_l = draw_rect_contours(
-                img=img_l.data,
-                rects=add_rect_padding(
-                    rects_l,
-                    pad_x=self._user_config.bbox_padding,
-                    pad_y=self._user_config.bbox_padding,
-                ),
-                color=hex_to_rgb(self._user_config.line_color),
-                width=self._user_config.line_width,
-            )
-            diff_r = draw_rect_contours(
-                img=img_r.data,
-                rects=add_rect_padding(
-                    rects_r,
-                    pad_x=self._user_config.bbox_padding,
-                    pad_y=self._user_config.bbox_padding,
+
+            transform = self._estimate_transform(img_l, img_r)
+            self._shown_options = self._detector_options()
+            diff = compare_pages(
+                self._drawer,
+                img_l.data,
+                img_r.data,
+                transform=transform,
+                tile_hashes=_pair_tile_hashes(
+                    img_l.tile_hashes,
+                    img_r.tile_hashes,
                 ),
-                color=hex_to_rgb(self._user_config.line_color),
-                width=self._user_config.line_width,
+                **self._shown_options,
             )
-            self.display_vm1.update_pixmap(ndarray_to_pixmap(diff_l))
-            self.display_vm2.update_pixmap(ndarray_to_pixmap(diff_r))
+            if diff is None:
+                self.display_vm1.update_page(img_l)
+                self.display_vm2.update_page(img_r)
+                return
+
+            self._show_differences(img_l, img_r, diff)
+            if transform is not None and not is_identity_transform(transform):
+                self.__logger.debug(f"Page registered: {transform}")
+            elif img_l.has_source() and img_r.has_source():
+                self._start_full_resolution_diff(img_l, img_r)
             return
 
         if has_img_l:
-            self.display_vm1.update_pixmap(ndarray_to_pixmap(img_l.data))
+            self.display_vm1.update_page(img_l)
         if has_img_r:
-            self.display_vm2.update_pixmap(ndarray_to_pixmap(img_r.data))
+            self.display_vm2.update_page(img_r)
+
+    def _prefetch_neighbors(self) -> None:
+        # the pages of the adjacent pairs are tiled while the event loop is
+        # idle, so that turning to them only swaps in the prepared tiles
+        if self._page_pairs:
+            current = self._current_pair_index()
+            pairs = [
+                self._page_pairs[idx]
+                for idx in (current + 1, current - 1)
+                if 0 <= idx < len(self._page_pairs)
+            ]
+        else:
+            pairs = [
+                (self.page_vm1.page + step - 1, self.page_vm2.page + step - 1)
+                for step in (1, -1)
+            ]
+        sides = (
+            (self.page_vm1, self.display_vm1),
+            (self.page_vm2, self.display_vm2),
+        )
+        for side, (page_vm, display_vm) in enumerate(sides):
+            if not page_vm.has_image():
+                continue
+            images = page_vm.images
+            display_vm.prefetch_pages(
+                [
+                    images[pair[side]]
+                    for pair in pairs
+                    if pair[side] is not None
+                    and 0 <= pair[side] < len(images)
+                ]
+            )
+
+    def _detector_options(self) -> dict[str, int]:
+        return dict(
+            n_merge=self._user_config.bbox_merge_level,
+            threshold=self._user_config.diff_threshold,
+            kernel_size=(
+                AppConfig.diff_denoise_kernel_size
+                if self._user_config.diff_denoise
+                else 0
+            ),
+        )
+
+    def _show_differences(
+        self,
+        img_l: PageImage,
+        img_r: PageImage,
+        diff: PageDifference,
+        keep_view: bool = False,
+    ) -> None:
+        self._shown_boxes = (img_l, img_r, diff)
+        self.display_vm1.update_page(img_l, diff.rects_l, keep_view)
+        self.display_vm2.update_page(img_r, diff.rects_r, keep_view)
+        self._update_diff_index(keep_cursor=keep_view)
+
+    def _update_diff_index(self, keep_cursor: bool = False) -> None:
+        # the differences of both shown pages for hit-testing and stepping,
+        # indexed on the left page; the right pane maps its points onto it
+        # and the boxes back with the registration
+        prev = None
+        if keep_cursor and self._diff_cursor >= 0:
+            prev = self._diff_boxes[
+                int(self._diff_index.order[self._diff_cursor])
+            ]
+        transform = None
+        if self._shown_boxes is None:
+            self._diff_boxes = BoxSet()
+            self._diff_boxes_r = BoxSet()
+        else:
+            _, img_r, diff = self._shown_boxes
+            self._diff_boxes = merge_page_rects(diff.rects_l, diff.rects_w)
+            self._diff_boxes_r = self._diff_boxes
+            if diff.transform is not None and not is_identity_transform(
+                diff.transform
+            ):
+                transform = diff.transform
+                self._diff_boxes_r = transform_rects(
+                    self._diff_boxes,
+                    transform,
+                    img_size=img_r.data.shape[:2],
+                    inverse=True,
+                )
+        padding = self._user_config.bbox_padding
+        self._diff_index = BoxIndex(self._diff_boxes.pad(padding, padding))
+
+        # the cursor follows the stepped box when the boxes are refined
+        self._diff_cursor = -1
+        if prev is not None:
+            ids = self._diff_index.query_point(
+                prev.x + prev.w / 2,
+                prev.y + prev.h / 2,
+            )
+            if len(ids) > 0:
+                self._diff_cursor = self._diff_index.rank(ids[0])
+        self.display_vm1.update_box_index(self._diff_index)
+        self.display_vm2.update_box_index(self._diff_index, transform)
+        self._highlight_difference()
+
+    def _step_difference(self, step: int) -> None:
+        # differences are stepped through in reading order, and past either
+        # end of the page on to the adjacent changed pair
+        cursor = self._diff_cursor + step
+        if not 0 <= cursor < len(self._diff_index):
+            current = self._current_pair_index()
+            self._turn_changed_pair(step)
+            if (
+                self._current_pair_index() == current
+                or len(self._diff_index) == 0
+            ):
+                return
+            cursor = 0 if step > 0 else len(self._diff_index) - 1
+        self._diff_cursor = cursor
+        self._highlight_difference()
+        # the other pane follows the zoom through the shared display model
+        self.display_vm1.focus_box(self._current_difference())
+
+    def _focus_difference(self, pair: int, rect: QRectF | None) -> None:
+        # a box from the difference list was found by the summary, and the
+        # shown boxes may differ, so the one under its center is stepped to
+        if pair != self._current_pair_index():
+            self._turn_pair(pair)
+        if rect is None:
+            return
+        center = rect.center()
+        ids = self._diff_index.query_point(center.x(), center.y())
+        if len(ids) > 0:
+            self._diff_cursor = self._diff_index.rank(ids[0])
+            rect = self._current_difference()
+        else:
+            self._diff_cursor = -1
+        self._highlight_difference()
+        self.display_vm1.focus_box(rect)
+
+    def _select_difference(self, idx: int) -> None:
+        self._diff_cursor = self._diff_index.rank(idx)
+        self._highlight_difference()
+
+    def _current_difference(self) -> QRectF | None:
+        if self._diff_cursor < 0:
+            return None
+        idx = int(self._diff_index.order[self._diff_cursor])
+        return QRectF(*self._diff_boxes[idx])
+
+    def _highlight_difference(self) -> None:
+        rect_r = None
+        if self._diff_cursor >= 0:
+            idx = int(self._diff_index.order[self._diff_cursor])
+            rect_r = QRectF(*self._diff_boxes_r[idx])
+        self.display_vm1.highlight_box(self._current_difference())
+        self.display_vm2.highlight_box(rect_r)
+
+    def _update_box_style(self) -> None:
+        # color, width and padding only restyle the overlays, while the merge
+        # level changes the boxes themselves
+        self.display_vm1.update_box_style()
+        self.display_vm2.update_box_style()
+        self._apply_detector_options()
+
+    def _apply_detector_options(self) -> None:
+        # the merge level, threshold and denoising change the boxes of the
+        # shown pair and of the summary, which are found again
+        options = self._detector_options()
+        if options != self._shown_options:
+            self._update_display()
+        elif self._shown_boxes is not None:
+            self._update_diff_index(keep_cursor=True)
+        if (
+            self._summary_options is not None
+            and options != self._summary_options
+        ):
+            self._start_summary()
+
+    def _start_full_resolution_diff(
+        self,
+        img_l: PageImage,
+        img_r: PageImage,
+    ) -> None:
+        # detection on the full resolution rasters runs in the background and
+        # replaces the boxes found on the display rasters once finished; one
+        # worker runs at a time, and a pair shown meanwhile waits for it and
+        # replaces any pair that waited before
+        request = self._diff_request
+        if self._full_resolution_worker is not None:
+            self._full_resolution_worker.abort()
+            self._full_resolution_pending = (img_l, img_r, request)
+            return
+        options = self._detector_options()
+
+        def _detect() -> Generator[tuple, None, None]:
+            src_l = img_l.load_source()
+            if request != self._diff_request:
+                return
+            src_r = img_r.load_source()
+            if request != self._diff_request:
+                return
+            diff = compare_pages(
+                self._drawer,
+                src_l,
+                src_r,
+                tile_hashes=_pair_tile_hashes(
+                    img_l.source_tile_hashes,
+                    img_r.source_tile_hashes,
+                ),
+                **options,
+            )
+            if diff is None:
+                return
+            scale = img_l.data.shape[1] / src_l.shape[1]
+            yield diff.rects_l, diff.rects_r, scale
+
+        def _on_yielded(result: tuple) -> None:
+            if request != self._diff_request:
+                return
+            rects_l, rects_r, scale = result
+            to_display = PageTransform(scale, 0.0, 0.0)
+            rects_l = transform_rects(
+                rects_l,
+                to_display,
+                img_l.data.shape[:2],
+            )
+            rects_r = transform_rects(
+                rects_r,
+                to_display,
+                img_r.data.shape[:2],
+            )
+            self._show_differences(
+                img_l,
+                img_r,
+                PageDifference(rects_l, rects_r, None, rects_r),
+                keep_view=True,
+            )
+            self.__logger.debug("Full resolution differences displayed")
+
+        def _on_done() -> None:
+            self._diff_workers.discard(worker)
+            self._full_resolution_worker = None
+            worker.deleteLater()
+            pending = self._full_resolution_pending
+            self._full_resolution_pending = None
+            if pending is not None and pending[2] == self._diff_request:
+                self._start_full_resolution_diff(pending[0], pending[1])
+
+        worker = IterationWorker(iterable=_detect)
+        worker.yielded.connect(_on_yielded)
+        worker.finished.connect(_on_done)
+        worker.aborted.connect(_on_done)
+        self._diff_workers.add(worker)
+        self._full_resolution_worker = worker
+        worker.start()
+
+    def _update_detail(
+        self,
+        side: int,
+        img: np.ndarray,
+        region: tuple[int, int, int, int],
+    ) -> None:
+        # once both panes show the same region rendered again, the boxes in
+        # it are found anew on the sharper renders in the background
+        self._details[side] = (img, region)
+        detail_l, detail_r = self._details
+        if detail_l is None or detail_r is None or self._shown_boxes is None:
+            return
+        crop_l, region_l = detail_l
+        crop_r, region_r = detail_r
+        if region_l != region_r or crop_l.shape != crop_r.shape:
+            return
+        img_l, img_r, diff = self._shown_boxes
+        if (
+            img_l is not self.display_vm1.page
+            or img_r is not self.display_vm2.page
+            or img_l.data.shape != img_r.data.shape
+        ):
+            return
+        transform = self._estimate_transform(img_l, img_r)
+        if transform is not None and not is_identity_transform(transform):
+            return
+        self._details = [None, None]
+        request = self._diff_request
+        options = self._shown_options
+
+        def _detect() -> Generator[tuple, None, None]:
+            yield self._drawer.get_bboxes(img1=crop_l, img2=crop_r, **options)
+
+        def _on_yielded(result: tuple) -> None:
+            if request != self._diff_request:
+                return
+            region_rects_l, region_rects_r = result
+            rects_l = refine_region_rects(
+                diff.rects_l,
+                region_rects_l,
+                region_l,
+                crop_l.shape[:2],
+            )
+            rects_r = refine_region_rects(
+                diff.rects_r,
+                region_rects_r,
+                region_r,
+                crop_r.shape[:2],
+            )
+            self._show_differences(
+                img_l,
+                img_r,
+                PageDifference(rects_l, rects_r, None, rects_r),
+                keep_view=True,
+            )
+            self.__logger.debug(f"Boxes refined in region: {region_l}")
+
+        def _on_finished() -> None:
+            self._diff_workers.discard(worker)
+            worker.deleteLater()
+
+        worker = IterationWorker(iterable=_detect)
+        worker.yielded.connect(_on_yielded)
+        worker.finished.connect(_on_finished)
+        self._diff_workers.add(worker)
+        worker.start()
+
+    def _estimate_transform(
+        self,
+        img_l: PageImage,
+        img_r: PageImage,
+    ) -> PageTransform | None:
+        if not AppConfig.page_registration:
+            return None
+
+        cached_l, cached_r, transform = self._transform_cache
+        if cached_l is img_l and cached_r is img_r:
+            return transform
+        transform = choose_page_transform(
+            img_l.data,
+            img_r.data,
+            tile_hashes=_pair_tile_hashes(
+                img_l.tile_hashes,
+                img_r.tile_hashes,
+            ),
+            n_levels=AppConfig.registration_levels,
+        )
+        self._transform_cache = (img_l, img_r, transform)
+        return transform
+
+    def _align_pages(self) -> None:
+        hashes_l = self.page_vm1.page_hashes
+        hashes_r = self.page_vm2.page_hashes
+        if AppConfig.page_alignment:
+            start = time.perf_counter()
+            self._page_pairs = align_pages(hashes_l, hashes_r)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.__logger.debug(
+                f"Pages aligned: {len(hashes_l)} x {len(hashes_r)} pages, "
+                f"{len(self._page_pairs)} pairs ({elapsed:.1f} ms)"
+            )
+        else:
+            n_pages = max(len(hashes_l), len(hashes_r))
+            self._page_pairs = [
+                (min(i, len(hashes_l) - 1), min(i, len(hashes_r) - 1))
+                for i in range(n_pages)
+            ]
+        pair_of_l, pair_of_r = {}, {}
+        for idx, (page_l, page_r) in enumerate(self._page_pairs):
+            if page_l is not None:
+                pair_of_l.setdefault(page_l, idx)
+            if page_r is not None:
+                pair_of_r.setdefault(page_r, idx)
+        self._pair_of_page = (pair_of_l, pair_of_r)
+        self._pair_index = 0
+
+    def _current_pair_index(self) -> int:
+        if not self._page_pairs:
+            return 0
+        page_l, page_r = self.page_vm1.page - 1, self.page_vm2.page - 1
+        pair_l, pair_r = self._page_pairs[self._pair_index]
+        if pair_l in (None, page_l) and pair_r in (None, page_r):
+            return self._pair_index
+        # either page was turned on its own; follow the left one if possible
+        pair_of_l, pair_of_r = self._pair_of_page
+        return pair_of_l.get(page_l, pair_of_r.get(page_r, 0))
+
+    def _turn_pair(self, index: int) -> None:
+        if not self._page_pairs:
+            return
+        index = min(max(0, index), len(self._page_pairs) - 1)
+        self._pair_index = index
+        page_l, page_r = self._page_pairs[index]
+
+        # both pages are turned before a single display update, since the
+        # intermediate state would be diffed for nothing
+        self._sync_turning = True
+        try:
+            if page_l is not None:
+                self.page_vm1.turn_page(page_l + 1)
+            if page_r is not None:
+                self.page_vm2.turn_page(page_r + 1)
+        finally:
+            self._sync_turning = False
+        self._update_display()
+
+    def _turn_changed_pair(self, step: int) -> None:
+        # pairs not summarized yet are stopped at, since they may have changed
+        summary = self._pair_summary
+        candidates = np.flatnonzero(
+            summary["changed"] | (summary["n_boxes"] < 0)
+        )
+        current = self._current_pair_index()
+        if step > 0:
+            candidates = candidates[candidates > current]
+        else:
+            candidates = candidates[candidates < current][::-1]
+        if len(candidates) > 0:
+            self._turn_pair(int(candidates[0]))
+
+    def _start_summary(self) -> None:
+        # box counts and changed ratios of all page pairs are computed in the
+        # background, for the density strip and the changed page navigation,
+        # and their boxes for the difference list
+        for worker in self._summary_workers:
+            worker.abort()
+        self._summary_request += 1
+        request = self._summary_request
+        pairs = list(self._page_pairs)
+        images_l, images_r = self.page_vm1.images, self.page_vm2.images
+        options = self._detector_options()
+        self._summary_options = options
+        registration = AppConfig.page_registration
+        self._pair_summary = create_pair_summary(len(pairs))
+        self.main_vm.reset_differences()
+
+        def _summarize() -> Generator[tuple, None, None]:
+            start = time.perf_counter()
+            for idx, (page_l, page_r) in enumerate(pairs):
+                if page_l is None or page_r is None:
+                    yield idx, (0, 1.0, True), BoxSet(), None
+                    continue
+                img_l, img_r = images_l[page_l], images_r[page_r]
+                tile_hashes = _pair_tile_hashes(
+                    img_l.tile_hashes,
+                    img_r.tile_hashes,
+                )
+                transform = None
+                if registration:
+                    transform = choose_page_transform(
+                        img_l.data,
+                        img_r.data,
+                        tile_hashes=tile_hashes,
+                        n_levels=AppConfig.registration_levels,
+                    )
+                row, rects = summarize_page_pair(
+                    self._drawer,
+                    img_l.data,
+                    img_r.data,
+                    transform=transform,
+                    tile_hashes=tile_hashes,
+                    **options,
+                )
+                yield idx, row, rects, transform
+            self.__logger.debug(
+                f"Page pairs summarized: {len(pairs)} pairs "
+                f"({(time.perf_counter() - start) * 1000:.1f} ms)"
+            )
+
+        def _on_yielded(result: tuple) -> None:
+            if request != self._summary_request:
+                return
+            idx, row, rects, transform = result
+            self._pair_summary[idx] = row
+            self.main_vm.update_summary(
+                self._pair_summary,
+                self._current_pair_index(),
+            )
+            if row[2]:
+                self.main_vm.add_differences(idx, rects, transform)
+
+        def _on_done() -> None:
+            self._summary_workers.discard(worker)
+            worker.deleteLater()
+
+        worker = IterationWorker(iterable=_summarize)
+        worker.yielded.connect(_on_yielded)
+        worker.finished.connect(_on_done)
+        worker.aborted.connect(_on_done)
+        self._summary_workers.add(worker)
+        worker.start()
+
+    def _export_report(self) -> None:
+        if not self._page_pairs:
+            return
+        fp_l = Path(self.page_vm1.file_path)
+        fp_r = Path(self.page_vm2.file_path)
+        dialog = FileSaveDialog(
+            ".jsonl",
+            directory=self._user_config.last_opened_folder,
+            filename=f"{fp_l.stem}_{fp_r.stem}.jsonl",
+        )
+        if dialog.exec_() == FileSaveDialog.Rejected:
+            return
+        fp = Path(dialog.selectedFiles()[0])
+        try:
+            f = fp.open("w", encoding="utf-8")
+        except OSError as e:
+            self.__logger.error(f"Error occurred while exporting report: {e}")
+            ErrorDialog("レポートを保存できませんでした。").show()
+            return
+
+        # the pairs are diffed again in the background, and each record is
+        # written as soon as its pair is finished
+        pairs = list(self._page_pairs)
+        images_l, images_r = self.page_vm1.images, self.page_vm2.images
+        options = self._detector_options()
+        registration = AppConfig.page_registration
+        writer = ReportWriter(
+            f,
+            fp_l.as_posix(),
+            fp_r.as_posix(),
+            options=dict(
+                page_size=list(AppConfig.page_size),
+                page_registration=registration,
+                page_alignment=AppConfig.page_alignment,
+                **options,
+            ),
+        )
+
+        def _export() -> Generator[int, None, None]:
+            for idx, (page_l, page_r) in enumerate(pairs):
+                img_l = None if page_l is None else images_l[page_l]
+                img_r = None if page_r is None else images_r[page_r]
+                diff = None
+                if img_l is not None and img_r is not None:
+                    tile_hashes = _pair_tile_hashes(
+                        img_l.tile_hashes,
+                        img_r.tile_hashes,
+                    )
+                    transform = None
+                    if registration:
+                        transform = choose_page_transform(
+                            img_l.data,
+                            img_r.data,
+                            tile_hashes=tile_hashes,
+                            n_levels=AppConfig.registration_levels,
+                        )
+                    diff = compare_pages(
+                        self._drawer,
+                        img_l.data,
+                        img_r.data,
+                        transform=transform,
+                        tile_hashes=tile_hashes,
+                        **options,
+                    )
+                writer.write_pair(
+                    create_pair_record(
+                        idx,
+                        page_l,
+                        page_r,
+                        img_l=img_l,
+                        img_r=img_r,
+                        diff=diff,
+                    )
+                )
+                yield idx
+            writer.close()
+
+        progress = LoadingDialog(title="レポート出力", label="レポート出力中...")
+        progress.setMaximum(len(pairs))
+
+        def _on_done() -> None:
+            f.close()
+            progress.finalize()
+            progress.close()
+            self._export_workers.discard(worker)
+            worker.deleteLater()
+            self.__logger.info(
+                f'Report exported: "{fp.as_posix()}" '
+                f"({writer.n_pairs} pairs, {writer.n_changed} changed)"
+            )
+
+        worker = IterationWorker(iterable=_export)
+        worker.yielded.connect(lambda _: progress.update())
+        worker.finished.connect(_on_done)
+        worker.aborted.connect(_on_done)
+        progress.canceled.connect(worker.abort)
+        self._export_workers.add(worker)
+        progress.show()
+        worker.start()
+
+    def _unmatched_pages(self) -> tuple[bool, bool]:
+        if not self._page_pairs:
+            return False, False
+        page_l, page_r = self.page_vm1.page - 1, self.page_vm2.page - 1
+        pair_of_l, pair_of_r = self._pair_of_page
+        deleted = self._page_pairs[pair_of_l[page_l]][1] is None
+        inserted = self._page_pairs[pair_of_r[page_r]][0] is None
+        return deleted, inserted
+
+    def _drop_unloaded_tiles(self) -> None:
+        # the pages of a replaced document are not shown again
+        self.tile_cache.retain(
+            {
+                img.id
+                for page_vm in (self.page_vm1, self.page_vm2)
+                for img in page_vm.images
+            }
+        )
 
     def _update_widgets_state(self) -> None:
         has_img_l = self.page_vm1.has_image()
@@ -200,7 +905,15 @@ class AppController:
             self.main_vm.switch_button_state("fit", True)
             return
 
+        self._align_pages()
+        self.main_vm.update_pages(
+            self._page_pairs,
+            self.page_vm1.images,
+            self.page_vm2.images,
+        )
+        self._start_summary()
         self.main_vm.switch_button_state("turn", True)
+        self.main_vm.switch_button_state("export", True)
         suffix_l = self.page_vm1.file_suffix
         suffix_r = self.page_vm2.file_suffix
         if suffix_l != suffix_r:
@@ -214,3 +927,12 @@ class AppController:
         self.page_view1.apply_icon_style(theme_str)
         self.page_view2.apply_icon_style(theme_str)
         self.main_window.apply_icon_style(theme_str)
+
+
+def _pair_tile_hashes(
+    hashes_l: np.ndarray | None,
+    hashes_r: np.ndarray | None,
+) -> tuple[np.ndarray, np.ndarray] | None:
+    if hashes_l is None or hashes_r is None:
+        return None
+    return hashes_l, hashes_r
@@ -0,0 +1,679 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from itertools import zip_longest
+from pathlib import Path
+from typing import Any, Generator
+
+import cv2
+import numpy as np
+
+from difference_viewer.app.config import AppConfig, UserConfig
+from difference_viewer.core.alignment import align_pages
+from difference_viewer.core.comparison import (
+    choose_page_transform,
+    compare_pages,
+)
+from difference_viewer.core.converter import BaseConverter, ConverterFactory
+from difference_viewer.core.imaging import (
+    BoxSet,
+    DifferenceDetector,
+    add_rect_padding,
+    draw_rect_contours,
+    hex_to_rgb,
+)
+from difference_viewer.core.report import ReportWriter, create_pair_record
+from difference_viewer.core.shared_model import PageImage
+
+# exit codes following diff(1)
+EXIT_SAME = 0
+EXIT_DIFFERENT = 1
+EXIT_ERROR = 2
+
+_worker_state = {}
+
+
+def main(argv: list[str]) -> int:
+    args = _parse_args(argv)
+    options = _create_options(args)
+    if args.command == "batch":
+        return _run_batch(args, options)
+    return _run_compare(args, options)
+
+
+def _run_compare(args: argparse.Namespace, options: dict[str, Any]) -> int:
+    logger = logging.getLogger("CLI")
+    start = time.perf_counter()
+    try:
+        page_pairs = _open_document_pairs(
+            args.file_l,
+            args.file_r,
+            options["page_size"],
+            align=args.align,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    if args.format == "jsonl":
+        return _stream_compare(args, options, page_pairs)
+
+    try:
+        pages = list(_compare_in_workers(args, options, page_pairs))
+    except BrokenProcessPool as e:
+        print(f"error: a worker crashed: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    elapsed = time.perf_counter() - start
+    n_changed = sum(page["status"] != "same" for page in pages)
+    report = {
+        "file_l": args.file_l.as_posix(),
+        "file_r": args.file_r.as_posix(),
+        "n_pages": len(pages),
+        "n_changed": n_changed,
+        "elapsed": round(elapsed, 3),
+        "pages": pages,
+    }
+    logger.info(
+        f"Compared {len(pages)} page pairs, {n_changed} changed "
+        f"({elapsed:.1f} s, {args.jobs} jobs)"
+    )
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text, encoding="utf-8")
+    return EXIT_DIFFERENT if n_changed > 0 else EXIT_SAME
+
+
+def _stream_compare(
+    args: argparse.Namespace,
+    options: dict[str, Any],
+    page_pairs: Generator[tuple[int, tuple], None, None],
+) -> int:
+    # every page pair is written as soon as it and the ones before it are
+    # finished, so that the report of a huge document is never in memory
+    logger = logging.getLogger("CLI")
+    if args.output is None:
+        f = sys.stdout
+    else:
+        f = args.output.open("w", encoding="utf-8")
+    try:
+        writer = ReportWriter(
+            f,
+            args.file_l.as_posix(),
+            args.file_r.as_posix(),
+            options=json.loads(json.dumps(options)),
+        )
+        for result in _compare_in_workers(args, options, page_pairs):
+            writer.write_pair(result)
+        writer.close()
+    except BrokenProcessPool as e:
+        # the pairs written so far stay readable, without the summary
+        print(f"error: a worker crashed: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    logger.info(
+        f"Compared {writer.n_pairs} page pairs, {writer.n_changed} changed "
+        f"({args.jobs} jobs)"
+    )
+    return EXIT_DIFFERENT if writer.n_changed > 0 else EXIT_SAME
+
+
+def _compare_in_workers(
+    args: argparse.Namespace,
+    options: dict[str, Any],
+    page_pairs: Generator[tuple[int, tuple], None, None],
+) -> Generator[dict[str, Any], None, None]:
+    with ProcessPoolExecutor(
+        max_workers=args.jobs,
+        initializer=_init_worker,
+        initargs=(options,),
+    ) as executor:
+        # the pages are decoded here in document order and diffed in the
+        # workers, with a bounded number of page pairs in flight
+        pending: deque[Future] = deque()
+        for index, (page_l, page_r) in page_pairs:
+            pending.append(
+                executor.submit(
+                    _compare_page_pair,
+                    index,
+                    page_l,
+                    page_r,
+                    args.image_dir,
+                )
+            )
+            while len(pending) >= 2 * args.jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _run_batch(args: argparse.Namespace, options: dict[str, Any]) -> int:
+    logger = logging.getLogger("CLI")
+    start = time.perf_counter()
+    files_l = _list_documents(args.dir_l)
+    files_r = _list_documents(args.dir_r)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_fp = args.output_dir / "checkpoint.jsonl"
+    if args.restart:
+        checkpoint_fp.unlink(missing_ok=True)
+
+    # every finished page pair is appended to the checkpoint, so that an
+    # interrupted run resumes with the pairs and files not recorded yet;
+    # failed pairs are recorded too, and are tried again on resuming
+    header = {"options": json.loads(json.dumps(options))}
+    records = _read_checkpoint(checkpoint_fp)
+    if records and records[0] != header:
+        print(
+            "error: the checkpoint was written with other options, "
+            "use --restart to discard it",
+            file=sys.stderr,
+        )
+        return EXIT_ERROR
+    results = {}
+    finished = set()
+    for record in records[1:]:
+        if "pair" in record:
+            results.setdefault(record["file"], {})[record["pair"]] = record
+        elif "n_pairs" in record:
+            finished.add(record["file"])
+
+    queue = deque(
+        name
+        for name in sorted(files_l.keys() & files_r.keys())
+        if name not in finished
+    )
+    n_pairs = {}
+    errors = {}
+    active: deque[list] = deque()
+    pending: dict[Future, tuple[str, int]] = {}
+    with checkpoint_fp.open("a", encoding="utf-8") as checkpoint:
+
+        def _write_record(record: dict[str, Any]) -> None:
+            checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+
+        def _finish_file_if_done(name: str) -> None:
+            done = len(results.get(name, {}))
+            if name in n_pairs and name not in errors and done == n_pairs[name]:
+                _write_record({"file": name, "n_pairs": n_pairs[name]})
+                finished.add(name)
+                logger.info(f"Batch file finished: {name} ({done} pairs)")
+
+        def _create_executor() -> ProcessPoolExecutor:
+            return ProcessPoolExecutor(
+                max_workers=args.jobs,
+                initializer=_init_worker,
+                initargs=(options,),
+            )
+
+        def _submit(*pair: Any) -> Future:
+            # a worker that died since the last wait has broken the pool,
+            # and the batch goes on in a new one
+            nonlocal executor
+            try:
+                return executor.submit(_compare_page_pair, *pair)
+            except BrokenProcessPool:
+                executor.shutdown(wait=False)
+                executor = _create_executor()
+                return executor.submit(_compare_page_pair, *pair)
+
+        if not records:
+            _write_record(header)
+        executor = _create_executor()
+        try:
+            while queue or active or pending:
+                # a few files are decoded at once, and their page pairs are
+                # submitted round-robin, so that a huge file only takes its
+                # share of the workers
+                while queue and len(active) < args.jobs:
+                    name = queue.popleft()
+                    try:
+                        page_pairs = _open_document_pairs(
+                            files_l[name],
+                            files_r[name],
+                            options["page_size"],
+                            align=args.align,
+                        )
+                    except Exception as e:
+                        errors[name] = str(e)
+                        continue
+                    image_dir = args.output_dir / "images" / name
+                    active.append([name, page_pairs, image_dir, 0])
+
+                while active and len(pending) < 2 * args.jobs:
+                    entry = active.popleft()
+                    name, page_pairs, image_dir, count = entry
+                    try:
+                        index, (page_l, page_r) = next(page_pairs)
+                    except StopIteration:
+                        n_pairs[name] = count
+                        _finish_file_if_done(name)
+                        continue
+                    except Exception as e:
+                        errors[name] = str(e)
+                        continue
+                    entry[3] = index + 1
+                    active.append(entry)
+                    if index in results.get(name, {}):
+                        continue
+                    future = _submit(index, page_l, page_r, image_dir)
+                    pending[future] = (name, index)
+
+                if not pending:
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, index = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        # every pair in flight fails with the pool
+                        errors[name] = f"Worker crashed on pair {index}"
+                        _write_record(
+                            {
+                                "file": name,
+                                "failed_pair": index,
+                                "error": errors[name],
+                            }
+                        )
+                        continue
+                    except Exception as e:
+                        errors[name] = str(e)
+                        _write_record(
+                            {
+                                "file": name,
+                                "failed_pair": index,
+                                "error": errors[name],
+                            }
+                        )
+                        continue
+                    record = {"file": name, **result}
+                    results.setdefault(name, {})[index] = record
+                    _write_record(record)
+                    _finish_file_if_done(name)
+        finally:
+            executor.shutdown()
+
+    index = _create_batch_index(
+        args,
+        files_l,
+        files_r,
+        results,
+        finished,
+        errors,
+    )
+    (args.output_dir / "index.json").write_text(
+        json.dumps(index, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Batch finished: {index['n_files']} files, "
+        f"{index['n_changed_files']} changed, {len(errors)} errors "
+        f"({elapsed:.1f} s, {args.jobs} jobs)"
+    )
+    if errors:
+        return EXIT_ERROR
+    return EXIT_DIFFERENT if index["n_changed_files"] > 0 else EXIT_SAME
+
+
+def _create_batch_index(
+    args: argparse.Namespace,
+    files_l: dict[str, Path],
+    files_r: dict[str, Path],
+    results: dict[str, dict[int, dict[str, Any]]],
+    finished: set[str],
+    errors: dict[str, str],
+) -> dict[str, Any]:
+    files = []
+    for name in sorted(files_l.keys() | files_r.keys()):
+        entry = {"file": name}
+        if name not in files_r:
+            entry["status"] = "only_l"
+        elif name not in files_l:
+            entry["status"] = "only_r"
+        elif name in errors:
+            entry["status"] = "error"
+            entry["message"] = errors[name]
+        elif name not in finished:
+            entry["status"] = "incomplete"
+        else:
+            pages = [results[name][i] for i in sorted(results.get(name, {}))]
+            changed = [
+                {
+                    key: page[key]
+                    for key in ("pair", "page_l", "page_r", "status")
+                }
+                for page in pages
+                if page["status"] != "same"
+            ]
+            entry["status"] = "changed" if changed else "same"
+            entry["n_pairs"] = len(pages)
+            entry["changed_pairs"] = changed
+        files.append(entry)
+    return {
+        "dir_l": args.dir_l.as_posix(),
+        "dir_r": args.dir_r.as_posix(),
+        "n_files": len(files),
+        "n_changed_files": sum(f["status"] != "same" for f in files),
+        "files": files,
+    }
+
+
+def _read_checkpoint(fp: Path) -> list[dict[str, Any]]:
+    records = []
+    if not fp.is_file():
+        return records
+    size = 0
+    with fp.open("rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                break
+            size += len(line)
+    # the last line is cut off when the run was killed, and is dropped so
+    # that the records appended on resuming start on a line of their own
+    if size < fp.stat().st_size:
+        with fp.open("r+b") as f:
+            f.truncate(size)
+    return records
+
+
+def _list_documents(directory: Path) -> dict[str, Path]:
+    suffixes = set(ConverterFactory.suffixes())
+    return {
+        fp.relative_to(directory).as_posix(): fp
+        for fp in sorted(directory.rglob("*"))
+        if fp.is_file() and fp.suffix.lower() in suffixes
+    }
+
+
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes",
+    )
+    common.add_argument(
+        "--align",
+        action="store_true",
+        help="pair pages by similarity instead of page number",
+    )
+    common.add_argument("--threshold", type=int, default=None)
+    common.add_argument("--merge-level", type=int, default=None)
+    common.add_argument("--denoise", action="store_true", default=None)
+
+    parser = argparse.ArgumentParser(prog="python -m difference_viewer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compare = commands.add_parser(
+        "compare",
+        parents=[common],
+        description="Compare two documents page by page without the GUI.",
+    )
+    compare.add_argument("file_l", type=Path, help="original document")
+    compare.add_argument("file_r", type=Path, help="revised document")
+    compare.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        help="report file (default: stdout)",
+    )
+    compare.add_argument(
+        "--format",
+        choices=["json", "jsonl"],
+        default="json",
+        help="one JSON document, or JSON Lines written as pages finish",
+    )
+    compare.add_argument(
+        "--image-dir",
+        type=Path,
+        default=None,
+        help="directory for annotated images of the changed pages",
+    )
+    batch = commands.add_parser(
+        "batch",
+        parents=[common],
+        description="Compare the documents of the same name in two folders.",
+    )
+    batch.add_argument("dir_l", type=Path, help="folder of the originals")
+    batch.add_argument("dir_r", type=Path, help="folder of the revisions")
+    batch.add_argument(
+        "-o",
+        "--output-dir",
+        type=Path,
+        required=True,
+        help="folder for the index, the checkpoint and the images",
+    )
+    batch.add_argument(
+        "--restart",
+        action="store_true",
+        help="discard the checkpoint of an earlier run",
+    )
+    args = parser.parse_args(argv)
+    args.jobs = max(1, args.jobs)
+    return args
+
+
+def _create_options(args: argparse.Namespace) -> dict[str, Any]:
+    # the defaults are the ones of the GUI, including the user settings
+    config = UserConfig.load(AppConfig.user_config_file_path())
+    threshold = config.diff_threshold
+    if args.threshold is not None:
+        threshold = args.threshold
+    n_merge = config.bbox_merge_level
+    if args.merge_level is not None:
+        n_merge = args.merge_level
+    denoise = config.diff_denoise if args.denoise is None else args.denoise
+    return dict(
+        page_size=AppConfig.page_size,
+        tile_size=AppConfig.diff_tile_size,
+        coarse_scale=AppConfig.diff_coarse_scale,
+        box_backend=AppConfig.diff_box_backend,
+        page_registration=AppConfig.page_registration,
+        registration_levels=AppConfig.registration_levels,
+        n_merge=n_merge,
+        threshold=threshold,
+        kernel_size=AppConfig.diff_denoise_kernel_size if denoise else 0,
+        bbox_padding=config.bbox_padding,
+        line_color=config.line_color,
+        line_width=config.line_width,
+    )
+
+
+def _create_converter(fp: Path) -> BaseConverter:
+    if not fp.is_file():
+        raise FileNotFoundError(f"File not found: {fp.as_posix()}")
+    converter = ConverterFactory.create(fp)
+    if converter is None:
+        raise ValueError(f"Unsupported file type: {fp.as_posix()}")
+    return converter
+
+
+def _open_document_pairs(
+    fp_l: Path,
+    fp_r: Path,
+    page_size: tuple[int, int],
+    align: bool = False,
+) -> Generator[tuple[int, tuple], None, None]:
+    converter_l = _create_converter(fp_l)
+    converter_r = _create_converter(fp_r)
+    pairs = None
+    if align:
+        pairs = align_pages(
+            _compute_page_hashes(fp_l, page_size),
+            _compute_page_hashes(fp_r, page_size),
+        )
+    return enumerate(_iter_page_pairs(converter_l, converter_r, pairs))
+
+
+def _compute_page_hashes(
+    fp: Path,
+    page_size: tuple[int, int],
+) -> np.ndarray:
+    # hashed on the loading size, like the pages in the GUI
+    return np.array(
+        [
+            PageImage(img, loading_size=page_size).dhash
+            for img in _create_converter(fp).iter_image()
+        ],
+        dtype=np.uint64,
+    )
+
+
+def _iter_page_pairs(
+    converter_l: BaseConverter,
+    converter_r: BaseConverter,
+    pairs: list[tuple[int | None, int | None]] | None,
+) -> Generator[tuple[tuple | None, tuple | None], None, None]:
+    iter_l = enumerate(converter_l.iter_image())
+    iter_r = enumerate(converter_r.iter_image())
+    if pairs is None:
+        yield from zip_longest(iter_l, iter_r)
+        return
+    # the aligned pairs are monotonic in both documents
+    for idx_l, idx_r in pairs:
+        yield (
+            None if idx_l is None else next(iter_l),
+            None if idx_r is None else next(iter_r),
+        )
+
+
+def _init_worker(options: dict[str, Any]) -> None:
+    _worker_state["options"] = options
+    _worker_state["detector"] = DifferenceDetector(
+        tile_size=options["tile_size"],
+        coarse_scale=options["coarse_scale"],
+        box_backend=options["box_backend"],
+    )
+
+
+def _compare_page_pair(
+    index: int,
+    page_l: tuple[int, np.ndarray] | None,
+    page_r: tuple[int, np.ndarray] | None,
+    image_dir: Path | None,
+) -> dict[str, Any]:
+    options = _worker_state["options"]
+    if page_l is None or page_r is None:
+        return create_pair_record(
+            index,
+            None if page_l is None else page_l[0],
+            None if page_r is None else page_r[0],
+        )
+
+    img_l = PageImage(
+        page_l[1],
+        loading_size=options["page_size"],
+        tile_size=options["tile_size"],
+    )
+    img_r = PageImage(
+        page_r[1],
+        loading_size=options["page_size"],
+        tile_size=options["tile_size"],
+    )
+    if img_l.tile_hashes is not None and img_r.tile_hashes is not None:
+        tile_hashes = (img_l.tile_hashes, img_r.tile_hashes)
+    else:
+        tile_hashes = None
+    transform = None
+    if options["page_registration"]:
+        transform = choose_page_transform(
+            img_l.data,
+            img_r.data,
+            tile_hashes=tile_hashes,
+            n_levels=options["registration_levels"],
+        )
+    diff = compare_pages(
+        _worker_state["detector"],
+        img_l.data,
+        img_r.data,
+        transform=transform,
+        tile_hashes=tile_hashes,
+        n_merge=options["n_merge"],
+        threshold=options["threshold"],
+        kernel_size=options["kernel_size"],
+    )
+    result = create_pair_record(
+        index,
+        page_l[0],
+        page_r[0],
+        img_l=img_l,
+        img_r=img_r,
+        diff=diff,
+    )
+    if result["status"] == "changed" and image_dir is not None:
+        for side, img, rects in (
+            ("l", img_l, diff.rects_l),
+            ("r", img_r, diff.rects_r),
+        ):
+            _write_annotated_image(
+                image_dir / f"pair_{index + 1:04d}_{side}.png",
+                img.data,
+                rects,
+                options,
+            )
+    return result
+
+
+def _write_annotated_image(
+    fp: Path,
+    img: np.ndarray,
+    rects: BoxSet,
+    options: dict[str, Any],
+) -> None:
+    dst = draw_rect_contours(
+        img=img,
+        rects=add_rect_padding(
+            rects,
+            pad_x=options["bbox_padding"],
+            pad_y=options["bbox_padding"],
+        ),
+        color=hex_to_rgb(options["line_color"]),
+        width=options["line_width"],
+    )
+    if dst.ndim == 3:
+        code = cv2.COLOR_RGBA2BGR if dst.shape[2] == 4 else cv2.COLOR_RGB2BGR
+        dst = cv2.cvtColor(dst, code)
+    # encoded in memory, since cv2.imwrite cannot handle non-ASCII paths
+    _, buf = cv2.imencode(".png", dst)
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    buf.tofile(fp.as_posix())
@@ -20,7 +20,6 @@ import json
 import logging
 import os
 import re
-import winreg
 from dataclasses import asdict, dataclass
 from enum import Enum
 from pathlib import Path
@@ -29,6 +28,12 @@ from typing import Any, ClassVar
 from PyQt5.QtCore import QCoreApplication, QTimer
 from PyQt5.QtWidgets import QApplication, QWidget
 
+try:
+    import winreg
+except ImportError:
+    # not on windows
+    winreg = None
+
 
 def get_resource_icon_path(name: str) -> Path:
     return (AppConfig.resource_directory / "icons" / name).with_suffix(".ico")
@@ -82,6 +87,8 @@ class Theme(Enum):
 
 
 def get_system_theme() -> Theme:
+    if winreg is None:
+        return Theme.LIGHT
     key_path = r"Software\Microsoft\Windows\CurrentVersion\Themes\Personalize"
     try:
         with winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path) as key:
@@ -103,7 +110,10 @@ class AppConfig:
     app_config_name = "config.json"
 
     root_directory = Path(__file__).parent.parent.parent
-    working_directory = Path(os.environ.get("LOCALAPPDATA")) / app_name
+    working_directory = (
+        Path(os.environ.get("LOCALAPPDATA", Path.home() / ".local" / "share"))
+        / app_name
+    )
     log_directory = root_directory / "log"
     resource_directory = root_directory / src_name / "resources"
 
@@ -111,12 +121,35 @@ class AppConfig:
     max_scale = 10.0
     min_scale = 0.1
     zoom_factor = 1.15
+    view_sync_interval = 16
+    detail_min_scale = 1.0
+    detail_render_delay = 150
+    focus_max_scale = 4.0
+    focus_box_share = 0.25
+    opengl_viewport = False
+    log_frame_times = False
     page_size = (2560, 2560)
+    tile_cache_size = 256 * 2**20
+    thumbnail_height = 96
+    thumbnail_cache_size = 64
+    diff_preview_height = 48
+    diff_preview_cache_size = 256
+    diff_tile_size = 256
+    diff_coarse_scale = 0
+    diff_box_backend = "contour"
+    diff_threads = min(8, os.cpu_count() or 1)
     max_line_width = 15
     min_line_width = 1
     max_bbox_padding = 20
     min_bbox_padding = -10
     bbox_merge_levels = [0, 1, 2, 3]
+    max_diff_threshold = 64
+    min_diff_threshold = 0
+    diff_denoise_kernel_size = 2
+    full_resolution_diff = False
+    page_registration = True
+    registration_levels = 2
+    page_alignment = True
 
     current_theme = Theme.SYSTEM
 
@@ -128,12 +161,24 @@ class AppConfig:
             with fp.open("r") as f:
                 data = json.loads(f.read())
                 for key, value in data.items():
-                    if hasattr(cls, key):
-                        type_ = type(getattr(cls, key))
-                        value = _replace_env_vars(value)
-                        setattr(cls, key, type_(value))
-                    else:
+                    if not hasattr(cls, key):
                         cls.__logger.warning(f"Invalid key skipped: {key}")
+                        continue
+                    type_ = type(getattr(cls, key))
+                    if isinstance(value, str):
+                        value = _replace_env_vars(value)
+                    try:
+                        # bool() would take any non-empty string as true
+                        if type_ is bool:
+                            value = _parse_bool(value)
+                        else:
+                            value = type_(value)
+                    except (TypeError, ValueError) as e:
+                        cls.__logger.warning(
+                            f"Invalid value skipped: {key} ({str(e)})"
+                        )
+                        continue
+                    setattr(cls, key, value)
 
         except Exception as e:
             cls.__logger.warning(
@@ -157,6 +202,8 @@ class UserConfig:
     line_width: int
     bbox_padding: int
     bbox_merge_level: int
+    diff_threshold: int
+    diff_denoise: bool
     theme: str
 
     __logger: ClassVar[logging.Logger] = logging.getLogger("UserConfig")
@@ -211,11 +258,26 @@ class UserConfig:
             line_width=3,
             bbox_padding=5,
             bbox_merge_level=1,
+            diff_threshold=0,
+            diff_denoise=False,
             theme="system",
         )
         return data
 
 
+_BOOL_STRINGS = {"true": True, "false": False, "1": True, "0": False}
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in _BOOL_STRINGS:
+        return _BOOL_STRINGS[value.strip().lower()]
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    raise ValueError(f"Invalid boolean: {value!r}")
+
+
 def _replace_env_vars(input_str):
     pattern = r"%([^%]+)%"
 
@@ -39,3 +39,25 @@ class FileOpenDialog(QFileDialog):
             directory=directory,
         )
         self.setWindowFlags(Qt.WindowStaysOnTopHint)
+
+
+class FileSaveDialog(QFileDialog):
+
+    def __init__(
+        self,
+        filetype: str,
+        directory: str | None = None,
+        filename: str = "",
+    ) -> None:
+        if directory is None or not Path(directory).exists():
+            directory = Path.home().as_posix()
+
+        super().__init__(
+            caption="名前を付けて保存",
+            filter=f"ファイル (*{filetype})",
+            directory=directory,
+        )
+        self.setAcceptMode(QFileDialog.AcceptSave)
+        self.setDefaultSuffix(filetype.lstrip("."))
+        self.selectFile(filename)
+        self.setWindowFlags(Qt.WindowStaysOnTopHint)
@@ -24,12 +24,16 @@ from difference_viewer.widgets.patch import patch_button_padding_click_detection
 
 class LoadingDialog(QProgressDialog):
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        title: str = "ページ読込",
+        label: str = "ページ読込中...",
+    ) -> None:
         super().__init__()
         self.setWindowFlags(Qt.WindowStaysOnTopHint)
         self.setMinimumWidth(300)
-        self.setWindowTitle("ページ読込")
-        self.setLabelText("ページ読込中...")
+        self.setWindowTitle(title)
+        self.setLabelText(label)
         self.setCancelButtonText("キャンセル")
         self.setMinimumDuration(0)
         self.setAutoReset(False)
@@ -15,18 +15,26 @@
 
 from __future__ import annotations
 
-from PyQt5.QtCore import QObject, QPointF, pyqtSignal
+from PyQt5.QtCore import QObject, QPointF, QTimer, pyqtSignal
 
 
 class DisplayModel(QObject):
+    # the viewport shared by both panes; the pane that changed it applies
+    # the change itself, and the others get the latest state once per frame
 
-    scale_changed = pyqtSignal(float, QPointF)
-    pos_changed = pyqtSignal(int, int)
+    scale_changed = pyqtSignal(float, QPointF, object)
+    pos_changed = pyqtSignal(int, int, object)
 
-    def __init__(self) -> None:
+    def __init__(self, frame_interval: int = 16) -> None:
         super().__init__()
         self._last_scale = None
         self._last_pos = None
+        self._pending_scale = None
+        self._pending_pos = None
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.setInterval(frame_interval)
+        self._frame_timer.timeout.connect(self._flush)
 
     @property
     def last_scale(self) -> float:
@@ -36,11 +44,39 @@ class DisplayModel(QObject):
     def last_pos(self) -> tuple[int, int]:
         return self._last_pos
 
-    def update_scale(self, scale, center) -> None:
+    def update_scale(
+        self,
+        scale: float,
+        center: QPointF,
+        source: object = None,
+    ) -> None:
         self._last_scale = scale
         self._last_scaling_center = center
-        self.scale_changed.emit(scale, center)
+        # a zoom recenters the panes, which outdates any pending scroll
+        self._pending_scale = (scale, center, source)
+        self._pending_pos = None
+        self._schedule_flush()
 
-    def update_pos(self, h_pos, v_pos) -> None:
+    def update_pos(
+        self,
+        h_pos: int,
+        v_pos: int,
+        source: object = None,
+    ) -> None:
         self._last_pos = (h_pos, v_pos)
-        self.pos_changed.emit(h_pos, v_pos)
+        self._pending_pos = (h_pos, v_pos, source)
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        # changes within a frame are merged, so the other panes repaint at
+        # most once per frame however fast the events come
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+
+    def _flush(self) -> None:
+        scale, pos = self._pending_scale, self._pending_pos
+        self._pending_scale = self._pending_pos = None
+        if scale is not None:
+            self.scale_changed.emit(*scale)
+        if pos is not None:
+            self.pos_changed.emit(*pos)
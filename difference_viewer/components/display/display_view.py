@@ -18,43 +18,68 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 
+import numpy as np
 from PyQt5 import uic
-from PyQt5.QtCore import QPoint, QPointF, QRectF, Qt, pyqtSlot
+from PyQt5.QtCore import QPoint, QPointF, QRectF, Qt, QTimer, pyqtSlot
 from PyQt5.QtGui import (
+    QColor,
     QDragEnterEvent,
     QDragLeaveEvent,
     QDragMoveEvent,
     QDropEvent,
     QMouseEvent,
-    QPixmap,
+    QPaintEvent,
     QWheelEvent,
 )
 from PyQt5.QtWidgets import (
-    QGraphicsPixmapItem,
     QGraphicsScene,
     QGraphicsView,
     QLabel,
+    QToolTip,
     QWidget,
 )
 
 from difference_viewer.app.config import AppConfig
 from difference_viewer.components.display.display_vm import DisplayViewModel
 from difference_viewer.core.converter import ConverterFactory
+from difference_viewer.core.imaging import BoxSet
+from difference_viewer.core.shared_model import ndarray_to_qimage
+from difference_viewer.widgets.box_overlay import BoxOverlayItem
+from difference_viewer.widgets.gl_viewport import (
+    FrameTimer,
+    create_gl_viewport,
+    get_gl_functions,
+)
+from difference_viewer.widgets.tiled_page import (
+    RegionImageItem,
+    TileCache,
+    TiledPageItem,
+)
 from difference_viewer.widgets.patch import patch_button_padding_click_detection
 
 
 class DisplayView(QWidget):
 
-    def __init__(self, vm: DisplayViewModel) -> None:
+    def __init__(self, vm: DisplayViewModel, tile_cache: TileCache) -> None:
         super().__init__()
         self.__logger = logging.getLogger(self.__class__.__name__)
         self._vm = vm
+        self._tile_cache = tile_cache
         self._dropped_fp = None
+        self._applying_view = False
+        self._press_pos = None
 
         self.__fit_factor = 0.99
         self.__center_offset = QPointF(0.2, 0.2)
 
-        self._vm.pixmap_updated.connect(self._update_display)
+        self._vm.image_updated.connect(self._update_display)
+        self._vm.prefetch_requested.connect(self._prefetch)
+        self._vm.boxes_updated.connect(self._update_boxes)
+        self._vm.box_style_changed.connect(self._update_box_style)
+        self._vm.detail_updated.connect(self._update_detail)
+        self._vm.detail_cleared.connect(self._clear_detail)
+        self._vm.highlight_changed.connect(self._update_highlight)
+        self._vm.box_focus_requested.connect(self._focus_box)
         self._vm.view_reset_requested.connect(self._reset_view)
         self._vm.zoom_requested.connect(self._apply_zoom)
         self._vm.scroll_requested.connect(self._apply_scroll)
@@ -68,10 +93,17 @@ class DisplayView(QWidget):
         self.gfxView: QGraphicsView
 
         self.gfxScene = QGraphicsScene(parent=self)
-        self.pixmapItem = QGraphicsPixmapItem()
-
-        self.gfxScene.addItem(self.pixmapItem)
+        self.pageItem = TiledPageItem(self._tile_cache)
+        self.detailItem = RegionImageItem()
+        self.detailItem.setZValue(0.5)
+        self.boxOverlay = BoxOverlayItem()
+        self.boxOverlay.setZValue(1)
+
+        self.gfxScene.addItem(self.pageItem)
+        self.gfxScene.addItem(self.detailItem)
+        self.gfxScene.addItem(self.boxOverlay)
         self.gfxView.setScene(self.gfxScene)
+        self._init_viewport()
 
         self.lblMessage.dragEnterEvent = self.__drag_enter_event
         self.lblMessage.dragMoveEvent = self.__drag_move_event
@@ -85,38 +117,145 @@ class DisplayView(QWidget):
 
         self.gfxView.wheelEvent = self.__wheel_event
         self.gfxView.originalMouseMoveEvent = self.gfxView.mouseMoveEvent
+        self.gfxView.originalMousePressEvent = self.gfxView.mousePressEvent
+        self.gfxView.originalMouseReleaseEvent = (
+            self.gfxView.mouseReleaseEvent
+        )
         self.gfxView.originalScrollContentsBy = self.gfxView.scrollContentsBy
         self.gfxView.mouseMoveEvent = self.__mouse_move_event
+        self.gfxView.mousePressEvent = self.__mouse_press_event
+        self.gfxView.mouseReleaseEvent = self.__mouse_release_event
         self.gfxView.scrollContentsBy = self.__scroll_contents_by
         self.gfxView.mouseDoubleClickEvent = self.__mouse_double_click_event
 
         self.gfxView.setObjectName("droppable")
         self.lblMessage.setObjectName("droppable")
 
-    @pyqtSlot(QPixmap)
-    def _update_display(self, pixmap: QPixmap) -> None:
+        # the detail is requested once the view has settled
+        self._detail_timer = QTimer(self)
+        self._detail_timer.setSingleShot(True)
+        self._detail_timer.setInterval(AppConfig.detail_render_delay)
+        self._detail_timer.timeout.connect(self._request_detail)
+
+    def _init_viewport(self) -> None:
+        viewport = None
+        if AppConfig.opengl_viewport:
+            viewport = create_gl_viewport()
+            if viewport is None:
+                self.__logger.warning(
+                    "OpenGL is not available, falling back to raster"
+                )
+        if viewport is not None:
+            # an opengl viewport is redrawn as a whole on every update
+            self.gfxView.setViewport(viewport)
+            self.gfxView.setViewportUpdateMode(
+                QGraphicsView.FullViewportUpdate
+            )
+        self._gl_viewport = viewport
+        self._gl_functions = None
+
+        self._frame_timer = None
+        if AppConfig.log_frame_times:
+            mode = "opengl" if viewport is not None else "raster"
+            self._frame_timer = FrameTimer(mode)
+            self.gfxView.originalPaintEvent = self.gfxView.paintEvent
+            self.gfxView.paintEvent = self.__paint_event
+
+    @pyqtSlot(object, object)
+    def _update_display(self, img: np.ndarray, key: int | None) -> None:
         if self.lblMessage is not None:
             self.lblMessage.deleteLater()
             self.lblMessage = None
-        rect = QRectF(0, 0, pixmap.width(), pixmap.height())
+        h, w = img.shape[:2]
+        rect = QRectF(0, 0, w, h)
         self.gfxView.setSceneRect(rect)
         self.gfxScene.setSceneRect(rect)
-        self.pixmapItem.setPixmap(pixmap)
+        self.pageItem.set_image(img, key)
+        self._detail_timer.start()
+
+    @pyqtSlot(object, object)
+    def _prefetch(self, img: np.ndarray, key: int) -> None:
+        # started once the pending events, the paint of the shown page
+        # included, are processed
+        QTimer.singleShot(0, lambda: self.pageItem.prefetch(img, key))
+
+    @pyqtSlot(object)
+    def _update_boxes(self, boxes: BoxSet) -> None:
+        self.boxOverlay.set_boxes(boxes)
+
+    @pyqtSlot(QColor, int, int)
+    def _update_box_style(
+        self,
+        color: QColor,
+        width: int,
+        padding: int,
+    ) -> None:
+        self.boxOverlay.set_style(color, width, padding)
+
+    @pyqtSlot(object, object)
+    def _update_detail(
+        self,
+        img: np.ndarray,
+        region: tuple[int, int, int, int],
+    ) -> None:
+        self.detailItem.set_image(ndarray_to_qimage(img), QRectF(*region))
+
+    @pyqtSlot()
+    def _clear_detail(self) -> None:
+        self.detailItem.set_image(None)
+
+    @pyqtSlot(object)
+    def _update_highlight(self, rect: QRectF | None) -> None:
+        self.boxOverlay.set_highlight(rect)
+
+    @pyqtSlot(QRectF)
+    def _focus_box(self, rect: QRectF) -> None:
+        # the box is zoomed to take a part of the view, but never beyond the
+        # focus scale nor out beyond the whole page
+        viewport = self.gfxView.viewport().size()
+        share = AppConfig.focus_box_share
+        scale = min(
+            share * viewport.width() / max(1.0, rect.width()),
+            share * viewport.height() / max(1.0, rect.height()),
+            AppConfig.focus_max_scale,
+        )
+        self._vm.zoom_to(
+            scale=max(scale, self._fit_scale()),
+            center=rect.center(),
+        )
+
+    def _request_detail(self) -> None:
+        if self.pageItem.is_empty():
+            return
+        visible = self.gfxView.mapToScene(
+            self.gfxView.viewport().rect()
+        ).boundingRect()
+        self._vm.request_detail(visible, self.gfxView.transform().m11())
 
     @pyqtSlot(float, QPointF)
     def _apply_zoom(self, scale: float, center: QPointF) -> None:
-        relative_scale = scale / self.gfxView.transform().m11()
-        self.gfxView.scale(relative_scale, relative_scale)
-        self.gfxView.centerOn(center + self.__center_offset)
+        # the scrolling caused here is not reported back to the model
+        self._applying_view = True
+        try:
+            relative_scale = scale / self.gfxView.transform().m11()
+            self.gfxView.scale(relative_scale, relative_scale)
+            self.gfxView.centerOn(center + self.__center_offset)
+        finally:
+            self._applying_view = False
+        self._detail_timer.start()
 
     @pyqtSlot(int, int)
     def _apply_scroll(self, h_pos: int, v_pos: int) -> None:
-        self.gfxView.horizontalScrollBar().setValue(h_pos)
-        self.gfxView.verticalScrollBar().setValue(v_pos)
+        self._applying_view = True
+        try:
+            self.gfxView.horizontalScrollBar().setValue(h_pos)
+            self.gfxView.verticalScrollBar().setValue(v_pos)
+        finally:
+            self._applying_view = False
 
     @pyqtSlot()
     def _reset_view(self) -> None:
-        if self.pixmapItem.pixmap().isNull():
+        if self.pageItem.is_empty():
             return
         self._vm.zoom_to(
             scale=self._fit_scale(),
@@ -128,7 +267,7 @@ class DisplayView(QWidget):
         viewport_width = viewport_size.width()
         viewport_height = viewport_size.height()
 
-        item_rect = self.pixmapItem.boundingRect()
+        item_rect = self.pageItem.boundingRect()
         item_width = item_rect.width()
         item_height = item_rect.height()
 
@@ -138,7 +277,7 @@ class DisplayView(QWidget):
         return min(scale_x, scale_y) * self.__fit_factor
 
     def _fit_center(self) -> QPoint:
-        item_rect = self.pixmapItem.boundingRect()
+        item_rect = self.pageItem.boundingRect()
         center_x = item_rect.center().x()
         center_y = item_rect.center().y()
 
@@ -205,9 +344,54 @@ class DisplayView(QWidget):
                 self.gfxView.horizontalScrollBar().value(),
                 self.gfxView.verticalScrollBar().value(),
             )
+        elif event.buttons() == Qt.NoButton:
+            self.__show_box_tooltip(event)
+
+    def __mouse_press_event(self, event: QMouseEvent) -> None:
+        self.gfxView.originalMousePressEvent(event)
+        if event.button() == Qt.LeftButton:
+            self._press_pos = event.pos()
+
+    def __mouse_release_event(self, event: QMouseEvent) -> None:
+        self.gfxView.originalMouseReleaseEvent(event)
+        if event.button() != Qt.LeftButton or self._press_pos is None:
+            return
+        # a press released where it started is a click, not a drag
+        moved = (event.pos() - self._press_pos).manhattanLength()
+        self._press_pos = None
+        if moved <= 2:
+            self._vm.click_box_at(self.gfxView.mapToScene(event.pos()))
+
+    def __show_box_tooltip(self, event: QMouseEvent) -> None:
+        hit = self._vm.box_at(self.gfxView.mapToScene(event.pos()))
+        if hit is None:
+            QToolTip.hideText()
+            return
+        rank, n_boxes = hit
+        QToolTip.showText(
+            event.globalPos(),
+            f"差分 {rank + 1} / {n_boxes}",
+            self.gfxView,
+        )
+
+    def __paint_event(self, event: QPaintEvent) -> None:
+        self._frame_timer.start()
+        self.gfxView.originalPaintEvent(event)
+        # opengl only queues the frame, so it is finished before the clock
+        # stops to compare whole frames with the raster engine
+        if self._gl_viewport is not None:
+            if self._gl_functions is None:
+                self._gl_functions = get_gl_functions(self._gl_viewport)
+            if self._gl_functions is not None:
+                self._gl_viewport.makeCurrent()
+                self._gl_functions.glFinish()
+        self._frame_timer.stop()
 
     def __scroll_contents_by(self, dx: int, dy: int) -> None:
         self.gfxView.originalScrollContentsBy(dx, dy)
+        self._detail_timer.start()
+        if self._applying_view:
+            return
         self._vm.scroll_to(
             self.gfxView.horizontalScrollBar().value(),
             self.gfxView.verticalScrollBar().value(),
@@ -16,19 +16,35 @@
 from __future__ import annotations
 
 import logging
+import math
+from concurrent.futures import Future
 from pathlib import Path
 
-from PyQt5.QtCore import QObject, QPointF, pyqtSignal
-from PyQt5.QtGui import QPixmap
+import numpy as np
+from PyQt5.QtCore import QObject, QPointF, QRectF, pyqtSignal
+from PyQt5.QtGui import QColor
 
 from difference_viewer.app.config import AppConfig, UserConfig
 from difference_viewer.components.display.display_model import DisplayModel
+from difference_viewer.core.box_index import BoxIndex
+from difference_viewer.core.imaging import BoxSet
+from difference_viewer.core.registration import PageTransform
+from difference_viewer.core.shared_model import PageImage
 
 
 class DisplayViewModel(QObject):
 
     file_accepted = pyqtSignal(Path)
-    pixmap_updated = pyqtSignal(QPixmap)
+    image_updated = pyqtSignal(object, object)
+    prefetch_requested = pyqtSignal(object, object)
+    boxes_updated = pyqtSignal(object)
+    highlight_changed = pyqtSignal(object)
+    box_focus_requested = pyqtSignal(QRectF)
+    box_clicked = pyqtSignal(int)
+    box_style_changed = pyqtSignal(QColor, int, int)
+    detail_updated = pyqtSignal(object, object)
+    detail_cleared = pyqtSignal()
+    _detail_rendered = pyqtSignal(int, object, object)
     zoom_requested = pyqtSignal(float, QPointF)
     scroll_requested = pyqtSignal(int, int)
     view_reset_requested = pyqtSignal()
@@ -39,9 +55,19 @@ class DisplayViewModel(QObject):
         self._model = model
         self._config = config
         self._fp = None
+        self._page = None
+        self._detail_request = 0
+        self._detail = None
+        self._box_index = BoxIndex(BoxSet())
+        self._box_transform = None
 
-        self._model.scale_changed.connect(self.zoom_requested.emit)
-        self._model.pos_changed.connect(self.scroll_requested.emit)
+        self._model.scale_changed.connect(self._on_scale_changed)
+        self._model.pos_changed.connect(self._on_pos_changed)
+        self._detail_rendered.connect(self._on_detail_rendered)
+
+    @property
+    def page(self) -> PageImage | None:
+        return self._page
 
     def accept_file(self, fp: Path) -> None:
         self.__logger.debug(f'File dropped: "{fp.as_posix()}"')
@@ -55,9 +81,110 @@ class DisplayViewModel(QObject):
             pass
         self.file_accepted.emit(fp)
 
-    def update_pixmap(self, pixmap: QPixmap) -> None:
-        self.pixmap_updated.emit(pixmap)
-        self.reset_view()
+    def update_image(
+        self,
+        img: np.ndarray,
+        keep_view: bool = False,
+        key: int | None = None,
+    ) -> None:
+        self._page = None
+        self._clear_detail()
+        self.image_updated.emit(img, key)
+        if not keep_view:
+            self.reset_view()
+
+    def update_page(
+        self,
+        page: PageImage,
+        boxes: BoxSet | None = None,
+        keep_view: bool = False,
+    ) -> None:
+        # the page is retiled only when another page is shown; new boxes
+        # just replace the overlay
+        if page is not self._page:
+            self.update_image(page.data, keep_view, key=page.id)
+            self._page = page
+        self.boxes_updated.emit(BoxSet() if boxes is None else boxes)
+
+    def prefetch_pages(self, pages: list[PageImage]) -> None:
+        for page in pages:
+            if page is not self._page:
+                self.prefetch_requested.emit(page.data, page.id)
+
+    def request_detail(self, rect: QRectF, scale: float) -> None:
+        # the visible part of a vector page is rendered again once the view
+        # magnifies the raster, to be shown over it
+        page = self._page
+        if (
+            page is None
+            or not page.can_render_region()
+            or scale <= AppConfig.detail_min_scale
+        ):
+            self._clear_detail()
+            return
+        h, w = page.data.shape[:2]
+        x1 = max(0, math.floor(rect.left()))
+        y1 = max(0, math.floor(rect.top()))
+        x2 = min(w, math.ceil(rect.right()))
+        y2 = min(h, math.ceil(rect.bottom()))
+        if x1 >= x2 or y1 >= y2:
+            self._clear_detail()
+            return
+        region = (x1, y1, x2 - x1, y2 - y1)
+        scale = min(scale, AppConfig.max_scale)
+        if self._detail == (region, scale):
+            return
+
+        self._detail_request += 1
+        self._detail = (region, scale)
+        request = self._detail_request
+        future = page.render_region(region, scale)
+        future.add_done_callback(
+            lambda f: self._detail_rendered.emit(request, region, f)
+        )
+
+    def update_box_style(self) -> None:
+        self.box_style_changed.emit(
+            QColor(self._config.line_color),
+            self._config.line_width,
+            self._config.bbox_padding,
+        )
+
+    def update_box_index(
+        self,
+        index: BoxIndex,
+        transform: PageTransform | None = None,
+    ) -> None:
+        # the differences of the shown pair, which both panes share; they are
+        # on the left page, which the transform maps this page onto
+        self._box_index = index
+        self._box_transform = transform
+
+    def box_at(self, pos: QPointF) -> tuple[int, int] | None:
+        # the position of the difference under the point in reading order,
+        # and the number of differences
+        ids = self._query_box(pos)
+        if len(ids) == 0:
+            return None
+        return self._box_index.rank(ids[0]), len(self._box_index)
+
+    def click_box_at(self, pos: QPointF) -> None:
+        ids = self._query_box(pos)
+        if len(ids) > 0:
+            self.box_clicked.emit(int(ids[0]))
+
+    def _query_box(self, pos: QPointF) -> np.ndarray:
+        x, y = pos.x(), pos.y()
+        if self._box_transform is not None:
+            scale, tx, ty = self._box_transform
+            x, y = x * scale + tx, y * scale + ty
+        return self._box_index.query_point(x, y)
+
+    def highlight_box(self, rect: QRectF | None) -> None:
+        self.highlight_changed.emit(rect)
+
+    def focus_box(self, rect: QRectF) -> None:
+        self.box_focus_requested.emit(rect)
 
     def reset_view(self) -> None:
         self.view_reset_requested.emit()
@@ -83,7 +210,43 @@ class DisplayViewModel(QObject):
         self.zoom_to(scale=new_scale, center=new_center)
 
     def zoom_to(self, scale: float, center: QPointF) -> None:
-        self._model.update_scale(scale, center)
+        # this pane follows at once; the model passes it on to the others
+        self.zoom_requested.emit(scale, center)
+        self._model.update_scale(scale, center, source=self)
 
     def scroll_to(self, h_pos: int, v_pos: int) -> None:
-        self._model.update_pos(h_pos, v_pos)
+        self._model.update_pos(h_pos, v_pos, source=self)
+
+    def _on_scale_changed(
+        self,
+        scale: float,
+        center: QPointF,
+        source: object,
+    ) -> None:
+        if source is not self:
+            self.zoom_requested.emit(scale, center)
+
+    def _on_pos_changed(self, h_pos: int, v_pos: int, source: object) -> None:
+        if source is not self:
+            self.scroll_requested.emit(h_pos, v_pos)
+
+    def _on_detail_rendered(
+        self,
+        request: int,
+        region: tuple[int, int, int, int],
+        future: Future,
+    ) -> None:
+        if request != self._detail_request or future.cancelled():
+            return
+        if future.exception() is not None:
+            self.__logger.warning(
+                f"Failed to render page region: {future.exception()}"
+            )
+            return
+        self.detail_updated.emit(future.result(), region)
+
+    def _clear_detail(self) -> None:
+        self._detail_request += 1
+        if self._detail is not None:
+            self._detail = None
+            self.detail_cleared.emit()
@@ -20,12 +20,22 @@ from typing import Literal
 from PyQt5 import uic
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon, QKeyEvent, QMouseEvent
-from PyQt5.QtWidgets import QBoxLayout, QFrame, QLabel, QPushButton, QWidget
+from PyQt5.QtWidgets import (
+    QBoxLayout,
+    QDockWidget,
+    QFrame,
+    QLabel,
+    QPushButton,
+    QWidget,
+)
 
 from difference_viewer.app.config import AppConfig, get_resource_icon_path
 from difference_viewer.components.main_window.main_vm import MainWindowViewModel
 from difference_viewer.widgets.autoresized import AutoResizedMainWindow
+from difference_viewer.widgets.density_strip import DensityStrip
+from difference_viewer.widgets.difference_list import DifferenceList
 from difference_viewer.widgets.patch import patch_button_padding_click_detection
+from difference_viewer.widgets.thumbnail_strip import ThumbnailStrip
 
 
 class MainWindow(AutoResizedMainWindow):
@@ -40,6 +50,24 @@ class MainWindow(AutoResizedMainWindow):
             lambda t, e: self._update_button_state(t, e)
         )
         self._vm.window_state_changed.connect(self._update_window_state)
+        self._vm.summary_changed.connect(
+            lambda s, c: self.densityStrip.set_summary(s, c)
+        )
+        self._vm.summary_changed.connect(
+            lambda s, c: self.thumbnailStrip.set_summary(s, c)
+        )
+        self._vm.pages_changed.connect(
+            lambda p, l, r: self.thumbnailStrip.set_pages(p, l, r)
+        )
+        self._vm.pages_changed.connect(
+            lambda p, l, r: self.differenceList.set_pages(p, l, r)
+        )
+        self._vm.differences_reset.connect(
+            lambda: self.differenceList.clear_differences()
+        )
+        self._vm.differences_added.connect(
+            lambda p, r, t: self.differenceList.add_pair(p, r, t)
+        )
         self._init_ui()
 
         patch_button_padding_click_detection(self)
@@ -49,12 +77,18 @@ class MainWindow(AutoResizedMainWindow):
         self.btnSyncTurnFirst: QPushButton
         self.btnSyncTurnPrev: QPushButton
         self.btnSyncTurnNext: QPushButton
+        self.btnSyncTurnPrevChanged: QPushButton
+        self.btnSyncTurnNextChanged: QPushButton
         self.btnSyncTurnLast: QPushButton
         self.btnFitPage: QPushButton
+        self.btnExportReport: QPushButton
         self.lblSizeWarning: QLabel
         self.lblTypeWarning: QLabel
+        self.lblInsertedWarning: QLabel
+        self.lblDeletedWarning: QLabel
         self.lytPageL: QBoxLayout
         self.lytPageR: QBoxLayout
+        self.lytSummary: QBoxLayout
         self.frame: QFrame
         self.btnOpenPrefs: QPushButton
 
@@ -62,6 +96,8 @@ class MainWindow(AutoResizedMainWindow):
         self.btnSyncTurnPrev.setObjectName("accent")
         self.btnSyncTurnNext.setObjectName("accent")
         self.btnSyncTurnLast.setObjectName("accent")
+        self.btnSyncTurnPrevChanged.setObjectName("accent")
+        self.btnSyncTurnNextChanged.setObjectName("accent")
         self.btnOpenPrefs.setObjectName("icon")
         self.frame.setObjectName("line")
 
@@ -71,8 +107,50 @@ class MainWindow(AutoResizedMainWindow):
         self.btnSyncTurnPrev.clicked.connect(self._vm.turn_prev_requested.emit)
         self.btnSyncTurnNext.clicked.connect(self._vm.turn_next_requested.emit)
         self.btnSyncTurnLast.clicked.connect(self._vm.turn_last_requested.emit)
+        self.btnSyncTurnPrevChanged.clicked.connect(
+            self._vm.turn_prev_changed_requested.emit
+        )
+        self.btnSyncTurnNextChanged.clicked.connect(
+            self._vm.turn_next_changed_requested.emit
+        )
+
+        self.densityStrip = DensityStrip(self)
+        self.densityStrip.pair_clicked.connect(
+            self._vm.turn_pair_requested.emit
+        )
+        self.lytSummary.addWidget(self.densityStrip)
+
+        self.thumbnailStrip = ThumbnailStrip(
+            AppConfig.thumbnail_height,
+            AppConfig.thumbnail_cache_size,
+        )
+        self.thumbnailStrip.pair_clicked.connect(
+            self._vm.turn_pair_requested.emit
+        )
+        self.dckThumbnails = QDockWidget("サムネイル", self)
+        self.dckThumbnails.setObjectName("dckThumbnails")
+        self.dckThumbnails.setWidget(self.thumbnailStrip)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.dckThumbnails)
+
+        self.differenceList = DifferenceList(
+            AppConfig.diff_preview_height,
+            AppConfig.diff_preview_cache_size,
+        )
+        self.differenceList.difference_clicked.connect(
+            self._vm.focus_difference_requested.emit
+        )
+        self.dckDifferences = QDockWidget("差分一覧", self)
+        self.dckDifferences.setObjectName("dckDifferences")
+        self.dckDifferences.setWidget(self.differenceList)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.dckDifferences)
+        model = self.differenceList.model()
+        model.rowsInserted.connect(self._update_difference_count)
+        model.modelReset.connect(self._update_difference_count)
 
         self.btnFitPage.clicked.connect(self._vm.reset_view_requested.emit)
+        self.btnExportReport.clicked.connect(
+            self._vm.export_report_requested.emit
+        )
         self.btnOpenPrefs.clicked.connect(self._vm.open_prefs_requested.emit)
 
         self.keyPressEvent = self.__key_press_event
@@ -81,14 +159,22 @@ class MainWindow(AutoResizedMainWindow):
         self.labels = {
             "size": self.lblSizeWarning,
             "type": self.lblTypeWarning,
+            "inserted": self.lblInsertedWarning,
+            "deleted": self.lblDeletedWarning,
         }
         self.buttons = {
             "fit": self.btnFitPage,
+            "export": self.btnExportReport,
             "turn": [
                 self.btnSyncTurnFirst,
                 self.btnSyncTurnPrev,
                 self.btnSyncTurnNext,
                 self.btnSyncTurnLast,
+                self.btnSyncTurnPrevChanged,
+                self.btnSyncTurnNextChanged,
+                self.densityStrip,
+                self.thumbnailStrip,
+                self.differenceList,
             ],
         }
 
@@ -115,12 +201,22 @@ class MainWindow(AutoResizedMainWindow):
         else:
             self.buttons[target].setEnabled(enabled)
 
+    def _update_difference_count(self) -> None:
+        self.dckDifferences.setWindowTitle(
+            f"差分一覧 ({self.differenceList.n_differences})"
+        )
+
     def _update_window_state(self, enabled: bool) -> None:
         self.setEnabled(enabled)
 
     def __key_press_event(self, event: QKeyEvent) -> None:
         cmd = event.key()
-        if cmd == Qt.Key_Home:
+        ctrl = bool(event.modifiers() & Qt.ControlModifier)
+        if ctrl and cmd == Qt.Key_PageUp:
+            self.btnSyncTurnPrevChanged.click()
+        elif ctrl and cmd == Qt.Key_PageDown:
+            self.btnSyncTurnNextChanged.click()
+        elif cmd == Qt.Key_Home:
             self.btnSyncTurnFirst.click()
         elif cmd == Qt.Key_PageUp:
             self.btnSyncTurnPrev.click()
@@ -128,6 +224,10 @@ class MainWindow(AutoResizedMainWindow):
             self.btnSyncTurnNext.click()
         elif cmd == Qt.Key_End:
             self.btnSyncTurnLast.click()
+        elif cmd == Qt.Key_N and self.btnSyncTurnNext.isEnabled():
+            self._vm.step_difference_requested.emit(1)
+        elif cmd == Qt.Key_P and self.btnSyncTurnPrev.isEnabled():
+            self._vm.step_difference_requested.emit(-1)
 
     def __mouse_press_event(self, event: QMouseEvent) -> None:
         cmd = event.button()
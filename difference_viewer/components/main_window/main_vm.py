@@ -17,19 +17,34 @@ from __future__ import annotations
 
 from typing import Literal
 
+import numpy as np
 from PyQt5.QtCore import QObject, pyqtSignal
 
+from difference_viewer.core.imaging import BoxSet
+from difference_viewer.core.registration import PageTransform
+from difference_viewer.core.shared_model import PageImage
+
 
 class MainWindowViewModel(QObject):
     warninig_visiblity_changed = pyqtSignal(str, bool)
     button_state_changed = pyqtSignal(str, bool)
     window_state_changed = pyqtSignal(bool)
+    summary_changed = pyqtSignal(object, int)
+    pages_changed = pyqtSignal(object, object, object)
+    differences_reset = pyqtSignal()
+    differences_added = pyqtSignal(int, object, object)
 
     turn_first_requested = pyqtSignal()
     turn_prev_requested = pyqtSignal()
     turn_next_requested = pyqtSignal()
     turn_last_requested = pyqtSignal()
+    turn_prev_changed_requested = pyqtSignal()
+    turn_next_changed_requested = pyqtSignal()
+    turn_pair_requested = pyqtSignal(int)
+    step_difference_requested = pyqtSignal(int)
+    focus_difference_requested = pyqtSignal(int, object)
     reset_view_requested = pyqtSignal()
+    export_report_requested = pyqtSignal()
     open_prefs_requested = pyqtSignal()
 
     def __init__(self) -> None:
@@ -37,17 +52,39 @@ class MainWindowViewModel(QObject):
 
     def switch_warning_visibility(
         self,
-        target: Literal["size", "type"],
+        target: Literal["size", "type", "inserted", "deleted"],
         visible: bool,
     ) -> None:
         self.warninig_visiblity_changed.emit(target, visible)
 
     def switch_button_state(
         self,
-        target: Literal["fit", "turn"],
+        target: Literal["fit", "turn", "export"],
         enabled: bool,
     ) -> None:
         self.button_state_changed.emit(target, enabled)
 
     def switch_window_state(self, enabled: bool) -> None:
         self.window_state_changed.emit(enabled)
+
+    def update_pages(
+        self,
+        pairs: list[tuple[int | None, int | None]],
+        images_l: list[PageImage],
+        images_r: list[PageImage],
+    ) -> None:
+        self.pages_changed.emit(pairs, images_l, images_r)
+
+    def update_summary(self, summary: np.ndarray | None, current: int) -> None:
+        self.summary_changed.emit(summary, current)
+
+    def reset_differences(self) -> None:
+        self.differences_reset.emit()
+
+    def add_differences(
+        self,
+        pair: int,
+        rects: BoxSet,
+        transform: PageTransform | None,
+    ) -> None:
+        self.differences_added.emit(pair, rects, transform)
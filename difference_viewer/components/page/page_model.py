@@ -15,6 +15,7 @@
 
 from __future__ import annotations
 
+import numpy as np
 from PyQt5.QtCore import QObject, pyqtProperty, pyqtSignal
 
 from difference_viewer.core.shared_model import PageImage
@@ -27,6 +28,7 @@ class PageModel(QObject):
     def __init__(self) -> None:
         super().__init__()
         self._images = []
+        self._hashes = np.empty(0, dtype=np.uint64)
         self._curr_page = 1
 
     @property
@@ -35,6 +37,18 @@ class PageModel(QObject):
 
     def load(self, page_images: list[PageImage]) -> None:
         self._images = page_images
+        self._hashes = np.array(
+            [img.dhash for img in page_images],
+            dtype=np.uint64,
+        )
+
+    @property
+    def page_hashes(self) -> np.ndarray:
+        return self._hashes
+
+    @property
+    def images(self) -> list[PageImage]:
+        return list(self._images)
 
     @pyqtProperty(int, notify=page_changed)
     def page(self) -> int:
@@ -15,6 +15,7 @@
 
 from __future__ import annotations
 
+import functools
 import logging
 from pathlib import Path
 
@@ -44,6 +45,7 @@ class PageViewModel(QObject):
         self._model = model
         self._config = config
         self._file_path = Path()
+        self._region_renderer = None
 
         self._model.page_changed.connect(self.image_updated.emit)
 
@@ -70,22 +72,41 @@ class PageViewModel(QObject):
         self.__logger.info("Loading file")
         try:
             converter = ConverterFactory.create(fp)
+            renderer = converter.create_region_renderer()
             worker = IterationWorker(iterable=converter.iter_image)
             dialog = LoadingDialog()
             pages = []
             first_iter = True
+            if AppConfig.full_resolution_diff:
+                source_dir = AppConfig.working_directory / ".tmp"
+            else:
+                source_dir = None
 
             def _on_yielded(img: np.ndarray) -> None:
                 nonlocal first_iter
                 if first_iter:
                     dialog.setMaximum(converter.length())
                     first_iter = False
-                pages.append(PageImage(img, loading_size=AppConfig.page_size))
+                pages.append(
+                    PageImage(
+                        img,
+                        loading_size=AppConfig.page_size,
+                        tile_size=AppConfig.diff_tile_size,
+                        source_dir=source_dir,
+                        region_renderer=(
+                            None
+                            if renderer is None
+                            else functools.partial(renderer.render, len(pages))
+                        ),
+                    )
+                )
                 dialog.update()
 
             def _on_finished() -> None:
                 self._file_path = fp
                 worker.deleteLater()
+                self.close()
+                self._region_renderer = renderer
                 dialog.finalize()
                 dialog.close()
                 self._model.load(pages)
@@ -98,6 +119,9 @@ class PageViewModel(QObject):
                 worker.wait()
                 worker.deleteLater()
                 dialog.close()
+                # closing the dialog after loading emits canceled as well
+                if renderer not in (None, self._region_renderer):
+                    renderer.close()
                 self.__logger.info("File loading canceled")
                 self.loading_canceled.emit()
 
@@ -119,6 +143,11 @@ class PageViewModel(QObject):
             else:
                 ErrorDialog("ファイル読み込み中にエラーが発生しました").show()
 
+    def close(self) -> None:
+        if self._region_renderer is not None:
+            self._region_renderer.close()
+            self._region_renderer = None
+
     def reload_file(self) -> None:
         self.load_file(self._file_path)
 
@@ -154,6 +183,14 @@ class PageViewModel(QObject):
     def max_page(self) -> int:
         return self._model.max_page
 
+    @property
+    def page_hashes(self) -> np.ndarray:
+        return self._model.page_hashes
+
+    @property
+    def images(self) -> list[PageImage]:
+        return self._model.images
+
     @property
     def file_path(self) -> str:
         return self._file_path.as_posix()
@@ -17,7 +17,13 @@ from __future__ import annotations
 
 from PyQt5 import uic
 from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QComboBox, QLabel, QPushButton, QSpinBox
+from PyQt5.QtWidgets import (
+    QCheckBox,
+    QComboBox,
+    QLabel,
+    QPushButton,
+    QSpinBox,
+)
 
 from difference_viewer.app.config import AppConfig, Theme
 from difference_viewer.components.dialog.color_dialog import ColorDialog
@@ -46,6 +52,8 @@ class PrefsWindow(AutoResizedWidget):
         self.spbLineWidth: QSpinBox
         self.spbBoxPadding: QSpinBox
         self.cbbBoxMergeLevel: QComboBox
+        self.spbDiffThreshold: QSpinBox
+        self.chkDiffDenoise: QCheckBox
         self.cbbTheme: QComboBox
         self.btnOK: QPushButton
         self.btnCancel: QPushButton
@@ -65,6 +73,10 @@ class PrefsWindow(AutoResizedWidget):
             AppConfig.min_bbox_padding,
             AppConfig.max_bbox_padding,
         )
+        self.spbDiffThreshold.setRange(
+            AppConfig.min_diff_threshold,
+            AppConfig.max_diff_threshold,
+        )
         self.cbbBoxMergeLevel.addItem("なし", 0)
         self.cbbBoxMergeLevel.addItem("1回", 1)
         self.cbbBoxMergeLevel.addItem("2回", 2)
@@ -87,6 +99,12 @@ class PrefsWindow(AutoResizedWidget):
                 merge_level=self.cbbBoxMergeLevel.itemData(i)
             )
         )
+        self.spbDiffThreshold.valueChanged.connect(
+            lambda value: self._vm.update_diff_mode(threshold=value)
+        )
+        self.chkDiffDenoise.toggled.connect(
+            lambda checked: self._vm.update_diff_mode(denoise=checked)
+        )
         self.cbbTheme.currentIndexChanged.connect(
             lambda i: self._vm.update_window_style(self.cbbTheme.itemData(i))
         )
@@ -102,6 +120,8 @@ class PrefsWindow(AutoResizedWidget):
         self.cbbBoxMergeLevel.setCurrentIndex(
             self.cbbBoxMergeLevel.findData(self._vm.bbox_merge_level)
         )
+        self.spbDiffThreshold.setValue(self._vm.diff_threshold)
+        self.chkDiffDenoise.setChecked(self._vm.diff_denoise)
         self.cbbTheme.setCurrentIndex(self.cbbTheme.findData(self._vm.theme))
 
     def _save_and_exit(self) -> None:
@@ -24,6 +24,7 @@ from difference_viewer.app.config import AppConfig, UserConfig
 
 class PrefsViewModel(QObject):
     bbox_style_changed = pyqtSignal()
+    diff_mode_changed = pyqtSignal()
     window_style_changed = pyqtSignal()
 
     def __init__(self, config: UserConfig) -> None:
@@ -59,6 +60,22 @@ class PrefsViewModel(QObject):
                 self._config.bbox_merge_level = merge_level
         self.bbox_style_changed.emit()
 
+    def update_diff_mode(
+        self,
+        threshold: int | None = None,
+        denoise: bool | None = None,
+    ) -> None:
+        if threshold is not None:
+            if (
+                AppConfig.min_diff_threshold
+                <= threshold
+                <= AppConfig.max_diff_threshold
+            ):
+                self._config.diff_threshold = threshold
+        if denoise is not None:
+            self._config.diff_denoise = denoise
+        self.diff_mode_changed.emit()
+
     def update_window_style(self, theme: str) -> None:
         self._config.theme = theme
         self.window_style_changed.emit()
@@ -74,6 +91,10 @@ class PrefsViewModel(QObject):
             padding=self._default_config.bbox_padding,
             merge_level=self._default_config.bbox_merge_level,
         )
+        self.update_diff_mode(
+            threshold=self._default_config.diff_threshold,
+            denoise=self._default_config.diff_denoise,
+        )
         self.update_window_style(self._default_config.theme)
 
     @property
@@ -92,6 +113,14 @@ class PrefsViewModel(QObject):
     def bbox_merge_level(self) -> int:
         return self._config.bbox_merge_level
 
+    @property
+    def diff_threshold(self) -> int:
+        return self._config.diff_threshold
+
+    @property
+    def diff_denoise(self) -> bool:
+        return self._config.diff_denoise
+
     @property
     def theme(self) -> str:
         return self._config.theme
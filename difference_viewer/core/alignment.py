@@ -0,0 +1,81 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import numpy as np
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(hash_: int, hashes: np.ndarray) -> np.ndarray:
+    xor = np.bitwise_xor(np.uint64(hash_), hashes.astype(np.uint64))
+    bits = _POPCOUNT[xor.view(np.uint8)].reshape(-1, 8)
+    return bits.sum(axis=1, dtype=np.int64)
+
+
+def align_pages(
+    hashes1: np.ndarray,
+    hashes2: np.ndarray,
+    max_distance: int = 16,
+    gap_score: float = -0.6,
+) -> list[tuple[int | None, int | None]]:
+    # global sequence alignment (Needleman-Wunsch) of the page hashes; a pair
+    # scores 1 for equal hashes, 0 at max_distance and negative beyond
+    n, m = len(hashes1), len(hashes2)
+    # the table is filled for the reversed documents, so that the traceback
+    # runs from their first pages; it takes a pair over a gap on ties, which
+    # keeps runs of equal pages paired from their start
+    hashes1, hashes2 = hashes1[::-1], hashes2[::-1]
+    scores = np.empty((n + 1, m + 1), dtype=np.float64)
+    scores[0] = gap_score * np.arange(m + 1)
+    gaps = gap_score * np.arange(m + 1)
+    pair_scores = np.empty((n, m), dtype=np.float64)
+
+    # the dependency on the left neighbor within a row is resolved with a
+    # running maximum, so that every row is computed at once
+    for i in range(1, n + 1):
+        pair_scores[i - 1] = 1.0 - hamming_distances(
+            hashes1[i - 1],
+            hashes2,
+        ) / float(max_distance)
+        best = np.empty(m + 1, dtype=np.float64)
+        best[0] = gap_score * i
+        best[1:] = np.maximum(
+            scores[i - 1, :-1] + pair_scores[i - 1],
+            scores[i - 1, 1:] + gap_score,
+        )
+        scores[i] = np.maximum.accumulate(best - gaps) + gaps
+
+    pairs = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if (
+            i > 0
+            and j > 0
+            and np.isclose(
+                scores[i, j],
+                scores[i - 1, j - 1] + pair_scores[i - 1, j - 1],
+            )
+        ):
+            pairs.append((n - i, m - j))
+            i, j = i - 1, j - 1
+        elif i > 0 and np.isclose(scores[i, j], scores[i - 1, j] + gap_score):
+            pairs.append((n - i, None))
+            i -= 1
+        else:
+            pairs.append((None, m - j))
+            j -= 1
+    return pairs
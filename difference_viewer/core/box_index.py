@@ -0,0 +1,115 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import numpy as np
+
+from difference_viewer.core.imaging import BoxSet
+
+
+class BoxIndex:
+    # a uniform grid over a box set: each box is listed under the cells it
+    # covers, sorted by cell, so the boxes under a point are found with a
+    # binary search and a look at one cell instead of every box
+
+    def __init__(self, boxes: BoxSet, cell_size: int = 128) -> None:
+        self._boxes = boxes
+        self._cell_size = cell_size
+        self._order = reading_order(boxes)
+        self._rank = np.empty(len(boxes), dtype=np.intp)
+        self._rank[self._order] = np.arange(len(boxes))
+        if len(boxes) == 0:
+            self._n_cols = self._n_rows = 0
+            self._cells = np.empty(0, dtype=np.int64)
+            self._cell_boxes = np.empty(0, dtype=np.intp)
+            return
+
+        arr = boxes.array.astype(np.int64)
+        col1 = np.maximum(arr[:, 0], 0) // cell_size
+        row1 = np.maximum(arr[:, 1], 0) // cell_size
+        col2 = np.maximum(arr[:, 0] + np.maximum(arr[:, 2], 1) - 1, 0)
+        row2 = np.maximum(arr[:, 1] + np.maximum(arr[:, 3], 1) - 1, 0)
+        col2, row2 = col2 // cell_size, row2 // cell_size
+        self._n_cols = int(col2.max()) + 1
+        self._n_rows = int(row2.max()) + 1
+
+        # one entry per box and covered cell
+        span_x = col2 - col1 + 1
+        counts = span_x * (row2 - row1 + 1)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts,
+            counts,
+        )
+        span_x = np.repeat(span_x, counts)
+        cols = np.repeat(col1, counts) + offsets % span_x
+        rows = np.repeat(row1, counts) + offsets // span_x
+        cells = rows * self._n_cols + cols
+        order = np.argsort(cells, kind="stable")
+        self._cells = cells[order]
+        self._cell_boxes = np.repeat(np.arange(len(boxes)), counts)[order]
+
+    @property
+    def boxes(self) -> BoxSet:
+        return self._boxes
+
+    @property
+    def order(self) -> np.ndarray:
+        return self._order
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def rank(self, idx: int) -> int:
+        return int(self._rank[idx])
+
+    def query_point(self, x: float, y: float) -> np.ndarray:
+        # the boxes containing the point, the smallest first, so that a box
+        # nested in another one can still be picked
+        col, row = int(x // self._cell_size), int(y // self._cell_size)
+        if not (0 <= col < self._n_cols and 0 <= row < self._n_rows):
+            return np.empty(0, dtype=np.intp)
+        cell = row * self._n_cols + col
+        lo, hi = np.searchsorted(self._cells, [cell, cell + 1])
+        ids = self._cell_boxes[lo:hi]
+        arr = self._boxes.array[ids]
+        hit = (
+            (arr[:, 0] <= x)
+            & (x < arr[:, 0] + arr[:, 2])
+            & (arr[:, 1] <= y)
+            & (y < arr[:, 1] + arr[:, 3])
+        )
+        ids = ids[hit]
+        return ids[np.argsort(self._boxes.areas()[ids], kind="stable")]
+
+
+def reading_order(boxes: BoxSet) -> np.ndarray:
+    # boxes are grouped into lines from the top, a box joining the current
+    # line while its top is above the middle of the line; lines are read
+    # top to bottom and each line left to right
+    n = len(boxes)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    by_top = np.argsort(boxes.y, kind="stable")
+    tops = boxes.y[by_top].tolist()
+    bottoms = (boxes.y + boxes.h)[by_top].tolist()
+    lines = np.empty(n, dtype=np.intp)
+    line, line_top, line_bottom = 0, tops[0], bottoms[0]
+    for i in range(n):
+        if 2 * tops[i] >= line_top + line_bottom:
+            line, line_top, line_bottom = line + 1, tops[i], bottoms[i]
+        line_bottom = max(line_bottom, bottoms[i])
+        lines[i] = line
+    return by_top[np.lexsort((boxes.x[by_top], lines))]
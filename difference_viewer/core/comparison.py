@@ -0,0 +1,199 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from collections import namedtuple
+
+import numpy as np
+
+from difference_viewer.core.imaging import BoxSet, DifferenceDetector
+from difference_viewer.core.registration import (
+    IDENTITY_TRANSFORM,
+    PageTransform,
+    estimate_page_transform,
+    is_identity_transform,
+    transform_rects,
+    warp_image,
+)
+
+# boxes on each page, the transform the right page was registered with, and
+# the right boxes on the registered page, which are in left page coordinates
+PageDifference = namedtuple(
+    "PageDifference",
+    ["rects_l", "rects_r", "transform", "rects_w"],
+)
+
+# one row per page pair; n_boxes is -1 until the pair is summarized
+PAIR_SUMMARY_DTYPE = np.dtype(
+    [
+        ("n_boxes", np.int32),
+        ("changed_ratio", np.float32),
+        ("changed", np.bool_),
+    ]
+)
+
+
+def choose_page_transform(
+    img_l: np.ndarray,
+    img_r: np.ndarray,
+    tile_hashes: tuple[np.ndarray, np.ndarray] | None = None,
+    n_levels: int = 2,
+) -> PageTransform | None:
+    # pages of the same size with mostly equal tiles are aligned already
+    if (
+        img_l.shape == img_r.shape
+        and tile_hashes is not None
+        and np.mean(tile_hashes[0] != tile_hashes[1]) <= 0.5
+    ):
+        return IDENTITY_TRANSFORM
+    return estimate_page_transform(img_l, img_r, n_levels=n_levels)
+
+
+def compare_pages(
+    detector: DifferenceDetector,
+    img_l: np.ndarray,
+    img_r: np.ndarray,
+    transform: PageTransform | None = None,
+    tile_hashes: tuple[np.ndarray, np.ndarray] | None = None,
+    n_merge: int = 0,
+    threshold: int = 0,
+    kernel_size: int = 0,
+) -> PageDifference | None:
+    options = dict(
+        n_merge=n_merge,
+        threshold=threshold,
+        kernel_size=kernel_size,
+    )
+    if transform is None or is_identity_transform(transform):
+        if img_l.shape != img_r.shape:
+            return None
+        rects_l, rects_r = detector.get_bboxes(
+            img1=img_l,
+            img2=img_r,
+            tile_hashes=tile_hashes,
+            **options,
+        )
+        return PageDifference(rects_l, rects_r, transform, rects_r)
+
+    # the right page is diffed warped onto the left one, and its boxes are
+    # mapped back onto the unwarped page
+    rects_l, rects_w = detector.get_bboxes(
+        img1=img_l,
+        img2=warp_image(img_r, transform, dsize=img_l.shape[:2]),
+        **options,
+    )
+    rects_r = transform_rects(
+        rects_w,
+        transform,
+        img_size=img_r.shape[:2],
+        inverse=True,
+    )
+    return PageDifference(rects_l, rects_r, transform, rects_w)
+
+
+def create_pair_summary(n_pairs: int) -> np.ndarray:
+    summary = np.zeros(n_pairs, dtype=PAIR_SUMMARY_DTYPE)
+    summary["n_boxes"] = -1
+    return summary
+
+
+def summarize_page_pair(
+    detector: DifferenceDetector,
+    img_l: np.ndarray,
+    img_r: np.ndarray,
+    transform: PageTransform | None = None,
+    tile_hashes: tuple[np.ndarray, np.ndarray] | None = None,
+    n_merge: int = 0,
+    threshold: int = 0,
+    kernel_size: int = 0,
+) -> tuple[tuple[int, float, bool], BoxSet]:
+    # a summary row and the differences of the pair in left page coordinates
+    if transform is None or is_identity_transform(transform):
+        # pages that cannot be diffed count as entirely changed
+        if img_l.shape != img_r.shape:
+            return (0, 1.0, True), BoxSet()
+        if tile_hashes is not None and np.array_equal(*tile_hashes):
+            return (0, 0.0, False), BoxSet()
+        aligned_r = img_r
+    else:
+        aligned_r = warp_image(img_r, transform, dsize=img_l.shape[:2])
+        tile_hashes = None
+
+    # boxes are counted on the registered page, which does not change their
+    # number, so the right boxes are kept on it with the left ones
+    rects_l, rects_w = detector.get_bboxes(
+        img1=img_l,
+        img2=aligned_r,
+        tile_hashes=tile_hashes,
+        n_merge=n_merge,
+        threshold=threshold,
+        kernel_size=kernel_size,
+    )
+    n_changed = detector.count_diff_pixels(
+        img_l,
+        aligned_r,
+        tile_hashes=tile_hashes,
+        threshold=threshold,
+    )
+    changed_ratio = n_changed / (img_l.shape[0] * img_l.shape[1])
+    n_boxes = max(len(rects_l), len(rects_w))
+    return (
+        (n_boxes, changed_ratio, n_boxes > 0),
+        merge_page_rects(rects_l, rects_w),
+    )
+
+
+def merge_page_rects(rects_l: BoxSet, rects_w: BoxSet) -> BoxSet:
+    # the differences of a pair in one set; the right boxes have to be on the
+    # registered page, and one that overlaps a left box marks the same
+    # change, so only the left one is kept
+    overlaps = (rects_w.iou(rects_l) > 0).any(axis=1)
+    return BoxSet.concatenate([rects_l, rects_w[~overlaps]])
+
+
+def refine_region_rects(
+    rects: BoxSet,
+    region_rects: BoxSet,
+    region: tuple[int, int, int, int],
+    region_size: tuple[int, int],
+) -> BoxSet:
+    # boxes found on a region rendered at region_size replace the boxes
+    # lying wholly inside it; boxes crossing its border are kept, and the
+    # region boxes touching the border are dropped, as they are parts of those
+    x, y, w, h = region
+    region_h, region_w = region_size
+    inside = (
+        (rects.x >= x)
+        & (rects.y >= y)
+        & (rects.x + rects.w <= x + w)
+        & (rects.y + rects.h <= y + h)
+    )
+    off_border = (
+        (region_rects.x > 0)
+        & (region_rects.y > 0)
+        & (region_rects.x + region_rects.w < region_w)
+        & (region_rects.y + region_rects.h < region_h)
+    )
+    region_rects = region_rects[off_border]
+    # boxes grow outward to whole pixels of the page raster
+    scale_x, scale_y = w / region_w, h / region_h
+    mapped = BoxSet.from_xyxy(
+        np.floor(region_rects.x * scale_x) + x,
+        np.floor(region_rects.y * scale_y) + y,
+        np.ceil((region_rects.x + region_rects.w) * scale_x) + x,
+        np.ceil((region_rects.y + region_rects.h) * scale_y) + y,
+    )
+    return BoxSet.concatenate([rects[~inside], mapped])
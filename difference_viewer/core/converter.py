@@ -16,7 +16,10 @@
 from __future__ import annotations
 
 import logging
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Generator, Type
 
@@ -57,6 +60,10 @@ class BaseConverter(ABC):
     def iter_image(self) -> Generator[np.ndarray, None, None]:
         pass
 
+    def create_region_renderer(self) -> PDFRegionRenderer | None:
+        # only vector sources can be rendered again at a higher scale
+        return None
+
 
 class PPTConverter(BaseConverter):
 
@@ -159,6 +166,118 @@ class PDFConverter(BaseConverter):
         finally:
             pdf.close()
 
+    def create_region_renderer(self) -> PDFRegionRenderer:
+        return PDFRegionRenderer(self.__fp)
+
+
+class PDFRegionRenderer:
+    # renders parts of pages at any scale from display lists, which are made
+    # once per page and reused while the page is zoomed; pymupdf is not
+    # thread-safe, so the document is only touched by one worker thread, and
+    # closed under the same lock
+
+    def __init__(self, fp: Path, n_lists: int = 8) -> None:
+        self.__fp = fp
+        self.__pdf = None
+        self.__lists = OrderedDict()
+        self.__n_lists = n_lists
+        self.__lock = threading.Lock()
+        self.__closed = False
+        self.__futures = set()
+        self.__executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="PDFRegionRenderer",
+        )
+
+    def close(self) -> None:
+        # renders not yet started are cancelled, and the document is closed
+        # once the one in progress is done
+        self.__closed = True
+        for future in list(self.__futures):
+            future.cancel()
+        self.__executor.shutdown(wait=False)
+        with self.__lock:
+            self.__lists.clear()
+            if self.__pdf is not None:
+                self.__pdf.close()
+                self.__pdf = None
+
+    def render(
+        self,
+        index: int,
+        rect: tuple[int, int, int, int],
+        img_size: tuple[int, int],
+        scale: float,
+    ) -> Future:
+        # rect is x, y, w, h on a raster of img_size, and the result has
+        # scale pixels per raster pixel
+        if self.__closed:
+            future = Future()
+            future.cancel()
+            return future
+        future = self.__executor.submit(
+            self.__render,
+            index,
+            rect,
+            img_size,
+            scale,
+        )
+        self.__futures.add(future)
+        future.add_done_callback(self.__futures.discard)
+        return future
+
+    def __render(
+        self,
+        index: int,
+        rect: tuple[int, int, int, int],
+        img_size: tuple[int, int],
+        scale: float,
+    ) -> np.ndarray:
+        with self.__lock:
+            if self.__closed:
+                raise RuntimeError("Renderer is closed")
+            return self.__render_clip(index, rect, img_size, scale)
+
+    def __render_clip(
+        self,
+        index: int,
+        rect: tuple[int, int, int, int],
+        img_size: tuple[int, int],
+        scale: float,
+    ) -> np.ndarray:
+        display_list = self.__display_list(index)
+        page_rect = display_list.rect
+        points = page_rect.width / img_size[1]
+        x, y, w, h = rect
+        clip = pymupdf.Rect(
+            page_rect.x0 + x * points,
+            page_rect.y0 + y * points,
+            page_rect.x0 + (x + w) * points,
+            page_rect.y0 + (y + h) * points,
+        )
+        pixmap = display_list.get_pixmap(
+            matrix=pymupdf.Matrix(scale / points, scale / points),
+            clip=clip,
+            alpha=False,
+        )
+        return np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(
+            pixmap.height,
+            pixmap.width,
+            pixmap.n,
+        )
+
+    def __display_list(self, index: int) -> pymupdf.DisplayList:
+        if self.__pdf is None:
+            self.__pdf = pymupdf.open(self.__fp)
+        display_list = self.__lists.get(index)
+        if display_list is None:
+            display_list = self.__pdf.load_page(index).get_displaylist()
+            self.__lists[index] = display_list
+            while len(self.__lists) > self.__n_lists:
+                self.__lists.popitem(last=False)
+        self.__lists.move_to_end(index)
+        return display_list
+
 
 class XDWConverter(BaseConverter):
 
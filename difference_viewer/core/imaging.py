@@ -15,8 +15,12 @@
 
 from __future__ import annotations
 
+import hashlib
+import logging
+import time
 from collections import namedtuple
-from typing import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generator, Sequence
 
 import cv2
 import numpy as np
@@ -24,6 +28,148 @@ import numpy as np
 Rect = namedtuple("Rect", ["x", "y", "w", "h"])
 
 
+class BoxSet:
+    # rows of x, y, w, h in an (N, 4) int32 array, so that whole sets of
+    # boxes are transformed without a Python loop
+
+    def __init__(self, boxes: np.ndarray | Sequence[Rect] = ()) -> None:
+        self._boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+
+    @classmethod
+    def from_xyxy(
+        cls,
+        x1: np.ndarray,
+        y1: np.ndarray,
+        x2: np.ndarray,
+        y2: np.ndarray,
+    ) -> BoxSet:
+        return cls(np.column_stack([x1, y1, x2 - x1, y2 - y1]))
+
+    @classmethod
+    def concatenate(cls, box_sets: Sequence[BoxSet]) -> BoxSet:
+        if len(box_sets) == 0:
+            return cls()
+        return cls(np.concatenate([b.array for b in box_sets]))
+
+    @classmethod
+    def from_list(cls, data: list[list[int]]) -> BoxSet:
+        return cls(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> BoxSet:
+        return cls(np.frombuffer(data, dtype="<i4").astype(np.int32))
+
+    def to_list(self) -> list[list[int]]:
+        return self._boxes.tolist()
+
+    def to_bytes(self) -> bytes:
+        return self._boxes.astype("<i4").tobytes()
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._boxes
+
+    @property
+    def x(self) -> np.ndarray:
+        return self._boxes[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._boxes[:, 1]
+
+    @property
+    def w(self) -> np.ndarray:
+        return self._boxes[:, 2]
+
+    @property
+    def h(self) -> np.ndarray:
+        return self._boxes[:, 3]
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def __iter__(self) -> Generator[Rect, None, None]:
+        for box in self._boxes.tolist():
+            yield Rect(*box)
+
+    def __getitem__(self, index: int | slice | np.ndarray) -> Rect | BoxSet:
+        if isinstance(index, (int, np.integer)):
+            return Rect(*self._boxes[index].tolist())
+        return BoxSet(self._boxes[index])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BoxSet):
+            return NotImplemented
+        return np.array_equal(self._boxes, other.array)
+
+    def __repr__(self) -> str:
+        return f"BoxSet({self.to_list()})"
+
+    def areas(self) -> np.ndarray:
+        return self.w.astype(np.int64) * self.h
+
+    def offset(self, dx: int, dy: int) -> BoxSet:
+        return BoxSet(self._boxes + np.array([dx, dy, 0, 0], dtype=np.int32))
+
+    def pad(
+        self,
+        pad_x: int,
+        pad_y: int,
+        max_x: int = 1_000_000,
+        max_y: int = 1_000_000,
+    ) -> BoxSet:
+        # boxes shrunk below zero size collapse to one pixel at their center,
+        # which is rounded toward zero
+        x1 = np.maximum(0, self.x - pad_x)
+        x2 = np.minimum(max_x, self.x + self.w + pad_x)
+        y1 = np.maximum(0, self.y - pad_y)
+        y2 = np.minimum(max_y, self.y + self.h + pad_y)
+        collapsed_x, collapsed_y = x1 > x2, y1 > y2
+        x1 = np.where(collapsed_x, ((x1 + x2) / 2).astype(np.int64), x1)
+        x2 = np.where(collapsed_x, x1 + 1, x2)
+        y1 = np.where(collapsed_y, ((y1 + y2) / 2).astype(np.int64), y1)
+        y2 = np.where(collapsed_y, y1 + 1, y2)
+        return BoxSet.from_xyxy(x1, y1, x2, y2)
+
+    def clip(self, img_size: tuple[int, int]) -> BoxSet:
+        h, w = img_size
+        x1, y1 = np.clip(self.x, 0, w), np.clip(self.y, 0, h)
+        x2 = np.clip(self.x + self.w, 0, w)
+        y2 = np.clip(self.y + self.h, 0, h)
+        keep = (x1 < x2) & (y1 < y2)
+        return BoxSet.from_xyxy(x1[keep], y1[keep], x2[keep], y2[keep])
+
+    def filter(self, min_area: int = 0, min_width: int = 0) -> BoxSet:
+        keep = (
+            (self.areas() >= min_area)
+            & (self.w >= min_width)
+            & (self.h >= min_width)
+        )
+        return BoxSet(self._boxes[keep])
+
+    def iou(self, other: BoxSet) -> np.ndarray:
+        a, b = self._boxes.astype(np.int64), other.array.astype(np.int64)
+        ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+        iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+        ix2 = np.minimum((a[:, 0] + a[:, 2])[:, None], (b[:, 0] + b[:, 2]))
+        iy2 = np.minimum((a[:, 1] + a[:, 3])[:, None], (b[:, 1] + b[:, 3]))
+        inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+        union = self.areas()[:, None] + other.areas()[None, :] - inter
+        return np.divide(
+            inter,
+            union,
+            out=np.zeros(inter.shape, dtype=np.float64),
+            where=union > 0,
+        )
+
+    def bounding_rect(self) -> Rect | None:
+        if len(self) == 0:
+            return None
+        x1, y1 = self.x.min(), self.y.min()
+        x2, y2 = (self.x + self.w).max(), (self.y + self.h).max()
+        return Rect(int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+
+
 def rgb_to_hex(rgb: tuple) -> str:
     return "#{:02x}{:02x}{:02x}".format(*rgb).upper()
 
@@ -35,45 +181,274 @@ def hex_to_rgb(hex_color: str) -> tuple:
 
 class DifferenceDetector:
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        tile_size: int = 0,
+        coarse_scale: int = 0,
+        box_backend: str = "contour",
+        n_threads: int = 1,
+        min_stripe_rows: int = 256,
+    ) -> None:
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        if box_backend not in ("contour", "component"):
+            raise ValueError(f"Invalid box backend: {box_backend}")
+        if coarse_scale < 0:
+            raise ValueError(f"Invalid coarse scale: {coarse_scale}")
         self._bg_rgb = [255, 255, 255]
+        self._tile_size = tile_size
+        self._coarse_scale = coarse_scale
+        self._box_backend = box_backend
+        self._n_threads = max(1, n_threads)
+        self._min_stripe_rows = min_stripe_rows
+        # the OpenCV calls release the GIL, so stripes, windows and the two
+        # pages are processed in parallel by plain threads
+        self._executor = None
+        if self._n_threads > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._n_threads,
+                thread_name_prefix="DifferenceDetector",
+            )
 
     def get_bboxes(
         self,
         img1: np.ndarray,
         img2: np.ndarray,
         n_merge: int = 0,
-    ) -> list[list[Rect]]:
-        diff_mask = create_diff_binary_mask(img1, img2)
-        diff_cnts = extract_contours(diff_mask)
+        tile_hashes: tuple[np.ndarray, np.ndarray] | None = None,
+        threshold: int = 0,
+        kernel_size: int = 0,
+    ) -> list[BoxSet]:
+        start = time.perf_counter()
         h, w = img1.shape[:2]
-        diff_rects = create_contour_bounding_rects(diff_cnts)
+        diff_rects = self._extract_diff_rects(
+            img1,
+            img2,
+            tile_hashes,
+            threshold=threshold,
+            kernel_size=kernel_size,
+        )
         filt_rects = filter_rects(diff_rects, min_width=2)
 
-        ret = []
-        for img in (img1, img2):
+        bg_judge_rects = add_rect_padding(filt_rects, pad_x=-15, pad_y=-15)
+        roi = create_union_bounding_rect(bg_judge_rects)
 
-            rects = []
-            bg_judge_rects = add_rect_padding(filt_rects, pad_x=-15, pad_y=-15)
-            for fr, br in zip(filt_rects, bg_judge_rects):
-                if np.all(clip_image_rect(img, br) == self._bg_rgb):
-                    continue
-                rects.append(fr)
+        def select_rects(img: np.ndarray) -> BoxSet:
+            if roi is None:
+                rects = BoxSet()
+            else:
+                integral = create_foreground_integral(
+                    clip_image_rect(img, roi),
+                    self._bg_rgb,
+                )
+                fg_counts = count_rect_pixels(
+                    integral,
+                    bg_judge_rects,
+                    origin=(roi.x, roi.y),
+                )
+                rects = filt_rects[fg_counts > 0]
 
             for _ in range(n_merge):
                 enlarged_rects = add_rect_padding(rects, pad_x=10, pad_y=10)
-                merged_mask = create_merged_rects_binary_mask(
+                merged_rects = merge_touching_rects(
                     enlarged_rects,
                     img_size=(h, w),
                 )
-                merged_cnts = extract_contours(merged_mask)
-                merged_rects = create_contour_bounding_rects(merged_cnts)
                 rects = add_rect_padding(merged_rects, pad_x=-10, pad_y=-10)
+            return rects
 
-            ret.append(rects)
+        ret = self._map(select_rects, (img1, img2))
 
+        self.__logger.debug(
+            f"Differences detected: {len(diff_rects)} contours, "
+            f"{len(filt_rects)} candidates, "
+            f"threshold={threshold}, kernel_size={kernel_size}, "
+            f"backend={self._box_backend}, threads={self._n_threads} "
+            f"({(time.perf_counter() - start) * 1000:.1f} ms)"
+        )
         return ret
 
+    def count_diff_pixels(
+        self,
+        img1: np.ndarray,
+        img2: np.ndarray,
+        tile_hashes: tuple[np.ndarray, np.ndarray] | None = None,
+        threshold: int = 0,
+    ) -> int:
+        # tiles with equal hashes hold equal pixels, so only the others are
+        # diffed
+        if self._tile_size <= 0 or tile_hashes is None:
+            return cv2.countNonZero(
+                create_diff_binary_mask(img1, img2, threshold)
+            )
+        hashes1, hashes2 = tile_hashes
+        if hashes1.shape != hashes2.shape:
+            raise ValueError("Tile hashes must have same shape")
+        size = self._tile_size
+        count = 0
+        for r, c in zip(*np.nonzero(hashes1 != hashes2)):
+            rows = slice(r * size, (r + 1) * size)
+            cols = slice(c * size, (c + 1) * size)
+            count += cv2.countNonZero(
+                create_diff_binary_mask(
+                    img1[rows, cols],
+                    img2[rows, cols],
+                    threshold,
+                )
+            )
+        return count
+
+    def _map(self, func: Callable, items: Sequence) -> list:
+        if self._executor is None:
+            return [func(item) for item in items]
+        return list(self._executor.map(func, items))
+
+    def _extract_diff_rects(
+        self,
+        img1: np.ndarray,
+        img2: np.ndarray,
+        tile_hashes: tuple[np.ndarray, np.ndarray] | None,
+        threshold: int = 0,
+        kernel_size: int = 0,
+    ) -> BoxSet:
+        img_size = img1.shape[:2]
+
+        # only the tiles whose hashes differ are diffed
+        if self._tile_size > 0:
+            if tile_hashes is None:
+                tile_hashes = (
+                    compute_tile_hashes(img1, self._tile_size),
+                    compute_tile_hashes(img2, self._tile_size),
+                )
+            hashes1, hashes2 = tile_hashes
+            if hashes1.shape != hashes2.shape:
+                raise ValueError("Tile hashes must have same shape")
+            changed_tiles = hashes1 != hashes2
+            if np.mean(changed_tiles) <= 0.5:
+                return self._extract_window_rects(
+                    changed_tiles,
+                    cell_size=self._tile_size,
+                    img_size=img_size,
+                    create_mask=lambda win: create_diff_binary_mask(
+                        clip_image_rect(img1, win),
+                        clip_image_rect(img2, win),
+                        threshold,
+                    ),
+                    kernel_size=kernel_size,
+                )
+
+        n_stripes = min(self._n_threads, img_size[0] // self._min_stripe_rows)
+        if (
+            n_stripes > 1
+            and self._coarse_scale <= 1
+            and self._box_backend == "component"
+        ):
+            return self._extract_stripe_rects(
+                img1,
+                img2,
+                n_stripes,
+                threshold=threshold,
+                kernel_size=kernel_size,
+            )
+
+        diff_mask = create_diff_binary_mask(img1, img2, threshold)
+
+        # the binary diff is kept at full resolution, as any changed pixel
+        # has to mark its cell; the opening and the box extraction, which
+        # cost the most, then run only inside windows around the cells
+        if self._coarse_scale > 1:
+            changed_cells = create_coarse_cell_mask(
+                diff_mask,
+                self._coarse_scale,
+            )
+            changed_cells = cv2.dilate(
+                changed_cells.view(np.uint8),
+                np.ones((3, 3), dtype=np.uint8),
+            ).view(bool)
+            if np.mean(changed_cells) <= 0.5:
+                return self._extract_window_rects(
+                    changed_cells,
+                    cell_size=self._coarse_scale,
+                    img_size=img_size,
+                    create_mask=lambda win: clip_image_rect(diff_mask, win),
+                    kernel_size=kernel_size,
+                )
+
+        diff_mask = denoise_binary_mask(diff_mask, kernel_size)
+        return self._extract_boxes(diff_mask)
+
+    def _extract_stripe_rects(
+        self,
+        img1: np.ndarray,
+        img2: np.ndarray,
+        n_stripes: int,
+        threshold: int = 0,
+        kernel_size: int = 0,
+    ) -> BoxSet:
+        h = img1.shape[0]
+        # the labeling scans blocks of two rows, so seams on even rows keep
+        # its label order across the stripes
+        bounds = np.linspace(0, h // 2, n_stripes + 1).astype(int) * 2
+        bounds[-1] = h
+        # the opening reaches less than 2 * kernel_size rows, so a stripe
+        # denoised with this halo is exact in its own rows
+        halo = 2 * kernel_size if kernel_size > 1 else 0
+
+        def label_stripe(
+            idx: int,
+        ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+            y1, y2 = bounds[idx], bounds[idx + 1]
+            top, bottom = max(0, y1 - halo), min(h, y2 + halo)
+            diff_mask = create_diff_binary_mask(
+                img1[top:bottom],
+                img2[top:bottom],
+                threshold,
+            )
+            diff_mask = denoise_binary_mask(diff_mask, kernel_size)
+            diff_mask = diff_mask[y1 - top : y2 - top]
+            return (diff_mask,) + label_components(diff_mask)
+
+        masks, labels, stats = zip(*self._map(label_stripe, range(n_stripes)))
+        return BoxSet(stitch_stripe_components(masks, labels, stats)[:, :4])
+
+    def _extract_window_rects(
+        self,
+        changed_cells: np.ndarray,
+        cell_size: int,
+        img_size: tuple[int, int],
+        create_mask: Callable[[Rect], np.ndarray],
+        kernel_size: int = 0,
+    ) -> BoxSet:
+        # each window covers one 8-connected cluster of changed cells and
+        # the clusters in its holes, so that no blob can be split by a cell
+        # seam or escape the outer-contour test of a blob around it
+        def extract_window(
+            window: tuple[Rect, np.ndarray | None],
+        ) -> BoxSet:
+            win, win_mask = window
+            diff_mask = create_mask(win)
+            if win_mask is not None:
+                diff_mask = cv2.bitwise_and(
+                    diff_mask,
+                    diff_mask,
+                    mask=np.ascontiguousarray(win_mask).view(np.uint8),
+                )
+            diff_mask = denoise_binary_mask(diff_mask, kernel_size)
+            return self._extract_boxes(diff_mask).offset(win.x, win.y)
+
+        windows = list(
+            iter_changed_tile_windows(
+                changed_cells,
+                tile_size=cell_size,
+                img_size=img_size,
+            )
+        )
+        return BoxSet.concatenate(self._map(extract_window, windows))
+
+    def _extract_boxes(self, bin_mask: np.ndarray) -> BoxSet:
+        if self._box_backend == "component":
+            return BoxSet(extract_component_boxes(bin_mask)[:, :4])
+        return create_contour_bounding_rects(extract_contours(bin_mask))
+
 
 def draw_contours(
     img: np.ndarray,
@@ -94,20 +469,33 @@ def draw_contours(
 
 def draw_rect_contours(
     img: np.ndarray,
-    rects: Sequence[Rect],
+    rects: BoxSet,
     color: tuple[int, int, int] = (0, 0, 0),
     width: int = 1,
 ) -> np.ndarray:
     dst = img.copy()
-    for rect in rects:
-        cv2.rectangle(
-            dst,
-            (rect.x, rect.y),
-            (rect.x + rect.w, rect.y + rect.h),
-            color,
-            thickness=width,
-            lineType=cv2.LINE_AA,
-        )
+    if len(rects) == 0:
+        return dst
+    # the same closed polygons cv2.rectangle draws, in a single call
+    x1, y1 = rects.x, rects.y
+    x2, y2 = x1 + rects.w, y1 + rects.h
+    corners = np.stack(
+        [
+            np.column_stack([x1, y1]),
+            np.column_stack([x2, y1]),
+            np.column_stack([x2, y2]),
+            np.column_stack([x1, y2]),
+        ],
+        axis=1,
+    )
+    cv2.polylines(
+        dst,
+        list(corners),
+        isClosed=True,
+        color=color,
+        thickness=width,
+        lineType=cv2.LINE_AA,
+    )
     return dst
 
 
@@ -120,20 +508,131 @@ def extract_contours(bin_mask: np.ndarray) -> list[np.ndarray]:
     return cnts
 
 
+def extract_component_boxes(bin_mask: np.ndarray) -> np.ndarray:
+    # rows of (x, y, w, h, area) of the 8-connected blobs; blobs lying in a
+    # hole of another blob are dropped, as the outer contours would do
+    labels, stats = label_components(bin_mask)
+    n = len(stats)
+    boxes = stats[1:]
+    # only a blob with background inside its box can enclose another one
+    w, h, area = boxes[:, 2], boxes[:, 3], boxes[:, 4]
+    if n > 2 and np.any((w >= 3) & (h >= 3) & (area < w * h)):
+        boxes = boxes[_find_external_components(bin_mask, labels, n)[1:]]
+    return boxes
+
+
+def label_components(bin_mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    _, labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+        bin_mask,
+        connectivity=8,
+        ltype=cv2.CV_32S,
+        ccltype=cv2.CCL_GRANA,
+    )
+    return labels, stats
+
+
+def _find_external_components(
+    bin_mask: np.ndarray,
+    labels: np.ndarray,
+    n_labels: int,
+) -> np.ndarray:
+    is_external = np.zeros(n_labels, dtype=bool)
+    is_external[labels[_find_outside_touching(bin_mask)]] = True
+    return is_external
+
+
+def _find_outside_touching(bin_mask: np.ndarray) -> np.ndarray:
+    # the background 4-connected to the image border is the outside; a blob
+    # is external when any of its pixels touches it
+    bg = cv2.copyMakeBorder(
+        cv2.compare(bin_mask, 0, cv2.CMP_EQ),
+        1,
+        1,
+        1,
+        1,
+        cv2.BORDER_CONSTANT,
+        value=255,
+    )
+    cv2.floodFill(bg, None, (0, 0), 128, flags=4)
+    outside = cv2.dilate(
+        cv2.compare(bg, 128, cv2.CMP_EQ),
+        cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3)),
+    )[1:-1, 1:-1]
+    return cv2.bitwise_and(outside, bin_mask) > 0
+
+
+def stitch_stripe_components(
+    stripe_masks: Sequence[np.ndarray],
+    stripe_labels: Sequence[np.ndarray],
+    stripe_stats: Sequence[np.ndarray],
+) -> np.ndarray:
+    # joins the blobs labeled per horizontal stripe into the blobs of the
+    # whole mask; rows are ordered and filtered as extract_component_boxes
+    # orders and filters them on the unsplit mask, given seams on even rows
+    counts = np.array([len(stats) - 1 for stats in stripe_stats])
+    offsets = np.cumsum(counts) - counts
+    tops = np.cumsum([0] + [len(mask) for mask in stripe_masks])[:-1]
+    stats = np.concatenate([stats[1:] for stats in stripe_stats])
+    stats = stats.astype(np.int64)
+    stats[:, 1] += np.repeat(tops, counts)
+
+    # 8-connected foreground pixels facing each other across a seam join
+    # their blobs
+    idx_i, idx_j = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for k in range(len(stripe_labels) - 1):
+        above, below = stripe_labels[k][-1], stripe_labels[k + 1][0]
+        w = len(above)
+        for dx in (-1, 0, 1):
+            a = above[max(0, -dx) : w - max(0, dx)]
+            b = below[max(0, dx) : w - max(0, -dx)]
+            both = (a > 0) & (b > 0)
+            idx_i.append(a[both] - 1 + offsets[k])
+            idx_j.append(b[both] - 1 + offsets[k + 1])
+    roots = _propagate_min_labels(
+        len(stats),
+        np.concatenate(idx_i),
+        np.concatenate(idx_j),
+    )
+
+    # the smallest member of a blob is the first one the labeling scan met,
+    # so sorting the roots restores the label order of the unsplit mask
+    _, blob_ids = np.unique(roots, return_inverse=True)
+    n_blobs = blob_ids.max() + 1 if len(blob_ids) > 0 else 0
+    x1 = np.full(n_blobs, np.iinfo(np.int64).max, dtype=np.int64)
+    y1 = x1.copy()
+    x2 = np.zeros(n_blobs, dtype=np.int64)
+    y2 = x2.copy()
+    area = x2.copy()
+    np.minimum.at(x1, blob_ids, stats[:, 0])
+    np.minimum.at(y1, blob_ids, stats[:, 1])
+    np.maximum.at(x2, blob_ids, stats[:, 0] + stats[:, 2])
+    np.maximum.at(y2, blob_ids, stats[:, 1] + stats[:, 3])
+    np.add.at(area, blob_ids, stats[:, 4])
+    boxes = np.stack([x1, y1, x2 - x1, y2 - y1, area], axis=1)
+
+    w, h = boxes[:, 2], boxes[:, 3]
+    if n_blobs > 1 and np.any((w >= 3) & (h >= 3) & (area < w * h)):
+        touching = _find_outside_touching(np.concatenate(stripe_masks))
+        is_external = np.zeros(n_blobs, dtype=bool)
+        for top, labels, offset in zip(tops, stripe_labels, offsets):
+            ids = labels[touching[top : top + len(labels)]] - 1 + offset
+            is_external[blob_ids[ids]] = True
+        boxes = boxes[is_external]
+    return boxes.astype(np.int32)
+
+
 def filter_rects(
-    rects: list[Rect],
+    rects: BoxSet,
     min_area: int = 0,
     min_width: int = 0,
-) -> list[Rect]:
-    rects = list(filter(lambda rect: rect.w * rect.h >= min_area, rects))
-    rects = list(filter(lambda rect: rect.w >= min_width, rects))
-    rects = list(filter(lambda rect: rect.h >= min_width, rects))
-    return rects
+) -> BoxSet:
+    return rects.filter(min_area=min_area, min_width=min_width)
 
 
 def create_diff_binary_mask(
     img1: np.ndarray,
     img2: np.ndarray,
+    threshold: int = 0,
 ) -> np.ndarray:
     if img1.shape != img2.shape:
         raise ValueError("Images must have same size")
@@ -142,14 +641,26 @@ def create_diff_binary_mask(
     if img2.ndim == 3:
         img2 = cv2.cvtColor(img2, cv2.COLOR_RGB2GRAY)
 
-    diff = np.abs(img1.astype(np.int64) - img2.astype(np.int64))
-    diff = diff.astype(np.uint8)
-    _, bin_ = cv2.threshold(diff, 0, 255, cv2.THRESH_BINARY)
+    diff = cv2.absdiff(img1, img2)
+    _, bin_ = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
     return bin_
 
 
+def denoise_binary_mask(bin_mask: np.ndarray, kernel_size: int) -> np.ndarray:
+    if kernel_size <= 1:
+        return bin_mask
+    kernel = np.ones((kernel_size, kernel_size), dtype=np.uint8)
+    return cv2.morphologyEx(
+        bin_mask,
+        cv2.MORPH_OPEN,
+        kernel,
+        borderType=cv2.BORDER_CONSTANT,
+        borderValue=0,
+    )
+
+
 def create_merged_rects_binary_mask(
-    rects: Sequence[Rect],
+    rects: BoxSet,
     img_size: tuple[int, int],
 ) -> np.ndarray:
     mask = np.zeros(img_size, dtype=np.uint8)
@@ -164,31 +675,238 @@ def create_merged_rects_binary_mask(
     return mask
 
 
-def create_contour_bounding_rects(cnts: list[np.ndarray]) -> list[Rect]:
-    rects = list(Rect(*cv2.boundingRect(cnt)) for cnt in cnts)
-    return rects
+def merge_touching_rects(
+    rects: BoxSet,
+    img_size: tuple[int, int],
+) -> BoxSet:
+    # Analytical equivalent of drawing the rects filled into a mask and
+    # taking the bounding rects of its external contours. A drawn rect covers
+    # pixels x..x+w and y..y+h, and two rects belong to the same blob when
+    # they overlap or touch each other, diagonals included. Unlike the
+    # external contours, a rect lying inside a hole of a blob is kept.
+    if len(rects) == 0:
+        return BoxSet()
+    h, w = img_size
+    arr = rects.array.astype(np.int64)
+    x1, y1 = arr[:, 0], arr[:, 1]
+    x2 = np.minimum(arr[:, 0] + arr[:, 2], w - 1)
+    y2 = np.minimum(arr[:, 1] + arr[:, 3], h - 1)
+    valid = (x1 <= x2) & (y1 <= y2)
+    x1, y1, x2, y2 = x1[valid], y1[valid], x2[valid], y2[valid]
+    if len(x1) == 0:
+        return BoxSet()
+
+    # bucket the rects into horizontal bands, then sweep along x within each
+    # band so that only rects close in both directions become candidates
+    n = len(x1)
+    band_h = max(32, int(np.median(y2 - y1)) + 2)
+    band_start, band_end = y1 // band_h, (y2 + 1) // band_h
+    n_bands = band_end - band_start + 1
+    ids = np.repeat(np.arange(n), n_bands)
+    bands = np.repeat(band_start, n_bands) + _group_offsets(n_bands)
+    # the keys order by band and then by x, also for boxes left of the page
+    x0 = min(0, int(x1.min()))
+    keys = bands * (w + 2 - x0) + x1[ids] - x0
+    order = np.argsort(keys, kind="stable")
+    ids, keys = ids[order], keys[order]
+
+    m = len(ids)
+    sweep_ends = np.searchsorted(keys, keys - x1[ids] + x2[ids] + 1, "right")
+    n_cands = np.maximum(sweep_ends - np.arange(1, m + 1), 0)
+    pos_i = np.repeat(np.arange(m), n_cands)
+    pos_j = pos_i + 1 + _group_offsets(n_cands)
+    idx_i, idx_j = ids[pos_i], ids[pos_j]
+    touching = (y1[idx_j] <= y2[idx_i] + 1) & (y1[idx_i] <= y2[idx_j] + 1)
+    idx_i, idx_j = idx_i[touching], idx_j[touching]
+
+    _, labels = np.unique(
+        _propagate_min_labels(n, idx_i, idx_j),
+        return_inverse=True,
+    )
+    n_labels = labels.max() + 1
+    bx1 = np.full(n_labels, w, dtype=np.int64)
+    by1 = np.full(n_labels, h, dtype=np.int64)
+    bx2 = np.full(n_labels, x1.min(), dtype=np.int64)
+    by2 = np.full(n_labels, y1.min(), dtype=np.int64)
+    np.minimum.at(bx1, labels, x1)
+    np.minimum.at(by1, labels, y1)
+    np.maximum.at(bx2, labels, x2)
+    np.maximum.at(by2, labels, y2)
+
+    return BoxSet.from_xyxy(bx1, by1, bx2 + 1, by2 + 1)
+
+
+def _propagate_min_labels(
+    n: int,
+    idx_i: np.ndarray,
+    idx_j: np.ndarray,
+) -> np.ndarray:
+    # union-find by label propagation with pointer jumping; every item ends
+    # up labeled with the smallest item of its group
+    labels = np.arange(n)
+    while True:
+        prev = labels
+        labels = labels.copy()
+        np.minimum.at(labels, idx_i, labels[idx_j])
+        np.minimum.at(labels, idx_j, labels[idx_i])
+        labels = labels[labels]
+        if np.array_equal(labels, prev):
+            return labels
+
+
+def _group_offsets(counts: np.ndarray) -> np.ndarray:
+    starts = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - np.repeat(starts, counts)
+
+
+def create_contour_bounding_rects(cnts: list[np.ndarray]) -> BoxSet:
+    return BoxSet([cv2.boundingRect(cnt) for cnt in cnts])
 
 
 def add_rect_padding(
-    rects: list[Rect],
+    rects: BoxSet,
     pad_x: int,
     pad_y: int,
-    max_x: int = 1e6,
-    max_y: int = 1e6,
-) -> Rect:
-    ret = []
-    for rec in rects:
-        x1, x2 = max(0, rec.x - pad_x), min(max_x, rec.x + rec.w + pad_x)
-        y1, y2 = max(0, rec.y - pad_y), min(max_y, rec.y + rec.h + pad_y)
-        if x1 > x2:
-            x1 = int((x1 + x2) * 0.5)
-            x2 = x1 + 1
-        if y1 > y2:
-            y1 = int((y1 + y2) * 0.5)
-            y2 = y1 + 1
-        ret.append(Rect(x1, y1, x2 - x1, y2 - y1))
-    return ret
+    max_x: int = 1_000_000,
+    max_y: int = 1_000_000,
+) -> BoxSet:
+    return rects.pad(pad_x, pad_y, max_x=max_x, max_y=max_y)
 
 
 def clip_image_rect(img: np.ndarray, rect: Rect) -> np.ndarray:
     return img[rect.y : rect.y + rect.h, rect.x : rect.x + rect.w]
+
+
+def create_foreground_integral(
+    img: np.ndarray,
+    bg_rgb: Sequence[int],
+) -> np.ndarray:
+    n_ch = img.shape[2] if img.ndim == 3 else 1
+    bg = tuple(bg_rgb[:n_ch])
+    lower = bg + (0,) * (n_ch - len(bg))
+    upper = bg + (255,) * (n_ch - len(bg))
+    bg_mask = cv2.inRange(img, lower, upper)
+    fg_mask = (bg_mask == 0).view(np.uint8)
+    return cv2.integral(fg_mask, sdepth=cv2.CV_32S)
+
+
+def count_rect_pixels(
+    integral: np.ndarray,
+    rects: BoxSet,
+    origin: tuple[int, int] = (0, 0),
+) -> np.ndarray:
+    if len(rects) == 0:
+        return np.zeros(0, dtype=np.int64)
+    h, w = integral.shape[0] - 1, integral.shape[1] - 1
+    arr = rects.array.astype(np.int64)
+    x, y = arr[:, 0] - origin[0], arr[:, 1] - origin[1]
+    x1 = np.clip(x, 0, w)
+    y1 = np.clip(y, 0, h)
+    x2 = np.clip(x + arr[:, 2], 0, w)
+    y2 = np.clip(y + arr[:, 3], 0, h)
+    return (
+        integral[y2, x2].astype(np.int64)
+        - integral[y1, x2]
+        - integral[y2, x1]
+        + integral[y1, x1]
+    )
+
+
+def create_union_bounding_rect(rects: BoxSet) -> Rect | None:
+    return rects.bounding_rect()
+
+
+def create_coarse_cell_mask(bin_mask: np.ndarray, scale: int) -> np.ndarray:
+    # a max-pool: the dilation anchored at the top left corner carries every
+    # set pixel of a cell to the cell origin, which is then sampled; the
+    # partial cells along the right and bottom edges see a zero border
+    kernel = np.ones((scale, scale), dtype=np.uint8)
+    dilated = cv2.dilate(
+        bin_mask,
+        kernel,
+        anchor=(0, 0),
+        borderType=cv2.BORDER_CONSTANT,
+        borderValue=0,
+    )
+    return dilated[::scale, ::scale] > 0
+
+
+def compute_dhash(img: np.ndarray, hash_size: int = 8) -> int:
+    if img.ndim == 3:
+        img = cv2.cvtColor(img[:, :, :3], cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(
+        img,
+        (hash_size + 1, hash_size),
+        interpolation=cv2.INTER_AREA,
+    )
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def compute_tile_hashes(img: np.ndarray, tile_size: int) -> np.ndarray:
+    h, w = img.shape[:2]
+    n_rows, n_cols = -(-h // tile_size), -(-w // tile_size)
+    hashes = np.zeros((n_rows, n_cols), dtype=np.uint64)
+    for r in range(n_rows):
+        for c in range(n_cols):
+            tile = img[
+                r * tile_size : (r + 1) * tile_size,
+                c * tile_size : (c + 1) * tile_size,
+            ]
+            digest = hashlib.blake2b(
+                np.ascontiguousarray(tile).data,
+                digest_size=8,
+            ).digest()
+            hashes[r, c] = int.from_bytes(digest, "little")
+    return hashes
+
+
+def iter_changed_tile_windows(
+    changed_tiles: np.ndarray,
+    tile_size: int,
+    img_size: tuple[int, int],
+) -> Generator[tuple[Rect, np.ndarray | None], None, None]:
+    h, w = img_size
+    # a cluster lying in a hole of another cluster joins its window, so that
+    # the outer-contour test sees a blob together with the blobs it encloses
+    n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
+        _fill_cell_holes(changed_tiles),
+        connectivity=8,
+    )
+    for label in range(1, n_labels):
+        tx, ty, tw, th = stats[label, :4]
+        x, y = tx * tile_size, ty * tile_size
+        win = Rect(
+            int(x),
+            int(y),
+            int(min(w, (tx + tw) * tile_size) - x),
+            int(min(h, (ty + th) * tile_size) - y),
+        )
+        tile_mask = labels[ty : ty + th, tx : tx + tw] == label
+        tile_mask &= changed_tiles[ty : ty + th, tx : tx + tw]
+        if np.all(tile_mask):
+            yield win, None
+            continue
+        pixel_mask = np.repeat(
+            np.repeat(tile_mask, tile_size, axis=0),
+            tile_size,
+            axis=1,
+        )
+        yield win, pixel_mask[: win.h, : win.w]
+
+
+def _fill_cell_holes(cells: np.ndarray) -> np.ndarray:
+    # the unchanged cells 4-connected to the border are the outside; a blob
+    # in any other unchanged cell may lie in a hole of a blob of the
+    # surrounding cells
+    bg = cv2.copyMakeBorder(
+        cv2.compare(cells.view(np.uint8), 0, cv2.CMP_EQ),
+        1,
+        1,
+        1,
+        1,
+        cv2.BORDER_CONSTANT,
+        value=255,
+    )
+    cv2.floodFill(bg, None, (0, 0), 128, flags=4)
+    return cv2.compare(bg[1:-1, 1:-1], 128, cv2.CMP_NE)
@@ -0,0 +1,284 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import math
+from collections import namedtuple
+from typing import Sequence
+
+import cv2
+import numpy as np
+
+from difference_viewer.core.imaging import BoxSet
+
+# maps a point p of the second image onto the first image as scale * p + t
+PageTransform = namedtuple("PageTransform", ["scale", "tx", "ty"])
+
+IDENTITY_TRANSFORM = PageTransform(1.0, 0.0, 0.0)
+
+
+def estimate_page_transform(
+    img1: np.ndarray,
+    img2: np.ndarray,
+    n_levels: int = 2,
+    min_response: float = 0.05,
+    scale_tolerance: float = 2e-4,
+    refine_size: int = 512,
+    min_gain: float = 0.1,
+) -> PageTransform | None:
+    h1, w1 = img1.shape[:2]
+    h2, w2 = img2.shape[:2]
+    canvas_size = (max(h1, h2), max(w1, w2))
+    full1, full2 = _to_ink(img1, canvas_size), _to_ink(img2, canvas_size)
+    coarse1 = _build_pyramid(full1, n_levels)[-1]
+    coarse2 = unwarped2 = _build_pyramid(full2, n_levels)[-1]
+
+    # scale from the log-polar magnitude spectra (Fourier-Mellin) and then
+    # the translation, both on the coarsest level; rotation is not expected
+    # between document pages and is ignored
+    scale, response = _estimate_scale(coarse1, coarse2)
+    if response < min_response:
+        return None
+    coarse2 = _apply_transform(
+        coarse2,
+        PageTransform(scale, 0.0, 0.0),
+        dsize=coarse1.shape[:2],
+    )
+    (dx, dy), response = cv2.phaseCorrelate(coarse1, coarse2)
+    if response < min_response:
+        return None
+    factor = 2**n_levels
+    transform = PageTransform(scale, -dx * factor, -dy * factor)
+
+    # refinement on full resolution crops: the residual shifts of two crops
+    # on the diagonal correct the scale, the one of a center crop the shift
+    h, w = canvas_size
+    if abs(transform.scale - 1.0) >= scale_tolerance:
+        centers = [(w * 0.25, h * 0.25), (w * 0.75, h * 0.75)]
+        shifts = _measure_residual_shifts(
+            full1,
+            full2,
+            transform,
+            centers=centers,
+            crop_size=refine_size,
+            min_response=min_response,
+        )
+        if shifts is not None:
+            (ca, cb), (da, db) = centers, shifts
+            e = float(
+                np.mean([-(db[i] - da[i]) / (cb[i] - ca[i]) for i in (0, 1)])
+            )
+            transform = PageTransform(
+                transform.scale * (1 + e),
+                transform.tx * (1 + e),
+                transform.ty * (1 + e),
+            )
+    if abs(transform.scale - 1.0) < scale_tolerance:
+        transform = transform._replace(scale=1.0)
+
+    shifts = _measure_residual_shifts(
+        full1,
+        full2,
+        transform,
+        centers=[(w * 0.5, h * 0.5)],
+        crop_size=refine_size * 2,
+        min_response=min_response,
+    )
+    if shifts is not None:
+        dx, dy = shifts[0]
+        transform = transform._replace(
+            tx=transform.tx - dx,
+            ty=transform.ty - dy,
+        )
+
+    # pure translations are snapped to whole pixels, so that the warped page
+    # reproduces the original pixels instead of interpolated ones
+    if transform.scale == 1.0:
+        transform = transform._replace(
+            tx=float(round(transform.tx)),
+            ty=float(round(transform.ty)),
+        )
+
+    # heavily edited pages give spurious warps, which are dropped unless
+    # they clearly reduce the difference of the coarse pages
+    if not is_identity_transform(transform):
+        warped2 = _apply_transform(
+            unwarped2,
+            PageTransform(
+                transform.scale,
+                transform.tx / factor,
+                transform.ty / factor,
+            ),
+            dsize=coarse1.shape[:2],
+        )
+        area = _difference_area(coarse1, warped2)
+        if area > (1.0 - min_gain) * _difference_area(coarse1, unwarped2):
+            return None
+    return transform
+
+
+def is_identity_transform(transform: PageTransform) -> bool:
+    return transform == IDENTITY_TRANSFORM
+
+
+def warp_image(
+    img: np.ndarray,
+    transform: PageTransform,
+    dsize: tuple[int, int],
+    border_value: Sequence[int] = (255, 255, 255),
+) -> np.ndarray:
+    scale, tx, ty = transform
+    if scale == 1.0 and float(tx).is_integer() and float(ty).is_integer():
+        return _shift_image(img, int(tx), int(ty), dsize, border_value)
+    return _apply_transform(img, transform, dsize, border_value)
+
+
+def transform_rects(
+    rects: BoxSet,
+    transform: PageTransform,
+    img_size: tuple[int, int],
+    inverse: bool = False,
+) -> BoxSet:
+    if inverse:
+        scale = 1.0 / transform.scale
+        tx, ty = -transform.tx * scale, -transform.ty * scale
+    else:
+        scale, tx, ty = transform
+    x1 = np.floor(rects.x * scale + tx)
+    y1 = np.floor(rects.y * scale + ty)
+    x2 = np.ceil((rects.x + rects.w) * scale + tx)
+    y2 = np.ceil((rects.y + rects.h) * scale + ty)
+    return BoxSet.from_xyxy(x1, y1, x2, y2).clip(img_size)
+
+
+def _to_ink(img: np.ndarray, canvas_size: tuple[int, int]) -> np.ndarray:
+    if img.ndim == 3:
+        img = cv2.cvtColor(img[:, :, :3], cv2.COLOR_RGB2GRAY)
+    ink = np.zeros(canvas_size, dtype=np.float32)
+    h, w = img.shape[:2]
+    ink[:h, :w] = 255.0 - img
+    return ink
+
+
+def _difference_area(
+    ink1: np.ndarray,
+    ink2: np.ndarray,
+    threshold: float = 32.0,
+) -> int:
+    return int(np.count_nonzero(cv2.absdiff(ink1, ink2) > threshold))
+
+
+def _build_pyramid(img: np.ndarray, n_levels: int) -> list[np.ndarray]:
+    pyramid = [img]
+    for _ in range(n_levels):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def _estimate_scale(
+    img1: np.ndarray,
+    img2: np.ndarray,
+) -> tuple[float, float]:
+    h, w = img1.shape[:2]
+    window = cv2.createHanningWindow((w, h), cv2.CV_32F)
+    center = (w / 2, h / 2)
+    max_radius = min(w, h) / 2
+    log_polars = []
+    for img in (img1, img2):
+        spectrum = np.fft.fftshift(np.abs(np.fft.fft2(img * window)))
+        log_polars.append(
+            cv2.warpPolar(
+                np.log1p(spectrum).astype(np.float32),
+                (w, h),
+                center,
+                max_radius,
+                cv2.WARP_POLAR_LOG | cv2.INTER_LINEAR,
+            )
+        )
+    (d_rho, _), response = cv2.phaseCorrelate(*log_polars)
+    return math.exp(d_rho * math.log(max_radius) / w), response
+
+
+def _apply_transform(
+    img: np.ndarray,
+    transform: PageTransform,
+    dsize: tuple[int, int],
+    border_value: Sequence[int] | int = 0,
+) -> np.ndarray:
+    h, w = dsize
+    matrix = np.float32(
+        [
+            [transform.scale, 0.0, transform.tx],
+            [0.0, transform.scale, transform.ty],
+        ]
+    )
+    return cv2.warpAffine(
+        img,
+        matrix,
+        (w, h),
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=border_value,
+    )
+
+
+def _shift_image(
+    img: np.ndarray,
+    dx: int,
+    dy: int,
+    dsize: tuple[int, int],
+    border_value: Sequence[int],
+) -> np.ndarray:
+    h, w = dsize
+    dst = np.empty((h, w) + img.shape[2:], dtype=img.dtype)
+    n_ch = img.shape[2] if img.ndim == 3 else 1
+    dst[...] = np.resize(np.asarray(border_value, dtype=img.dtype), n_ch)
+    src_h, src_w = img.shape[:2]
+    x1, y1 = max(0, dx), max(0, dy)
+    x2, y2 = min(w, src_w + dx), min(h, src_h + dy)
+    if x1 < x2 and y1 < y2:
+        dst[y1:y2, x1:x2] = img[y1 - dy : y2 - dy, x1 - dx : x2 - dx]
+    return dst
+
+
+def _measure_residual_shifts(
+    img1: np.ndarray,
+    img2: np.ndarray,
+    transform: PageTransform,
+    centers: list[tuple[float, float]],
+    crop_size: int,
+    min_response: float,
+) -> list[tuple[float, float]] | None:
+    h, w = img1.shape[:2]
+    ch, cw = min(h, crop_size), min(w, crop_size)
+    shifts = []
+    for cx, cy in centers:
+        x = int(min(max(0, cx - cw / 2), w - cw))
+        y = int(min(max(0, cy - ch / 2), h - ch))
+        # warp only the crop by moving the crop origin into the transform
+        crop2 = _apply_transform(
+            img2,
+            transform._replace(tx=transform.tx - x, ty=transform.ty - y),
+            dsize=(ch, cw),
+        )
+        (dx, dy), response = cv2.phaseCorrelate(
+            img1[y : y + ch, x : x + cw],
+            crop2,
+        )
+        if response < min_response:
+            return None
+        shifts.append((dx, dy))
+    return shifts
@@ -0,0 +1,175 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import json
+import time
+from collections import Counter
+from typing import Any, TextIO
+
+import numpy as np
+
+from difference_viewer.core.comparison import PageDifference
+from difference_viewer.core.imaging import BoxSet
+from difference_viewer.core.shared_model import PageImage
+
+REPORT_VERSION = 1
+
+
+class ReportWriter:
+    # writes a report as JSON Lines: a header, one record per page pair as
+    # soon as it is finished and a summary, so that neither the writer nor
+    # the reader has to hold the whole report in memory
+
+    def __init__(
+        self,
+        f: TextIO,
+        file_l: str,
+        file_r: str,
+        options: dict[str, Any] | None = None,
+    ) -> None:
+        self._f = f
+        self._start = time.perf_counter()
+        self._n_pairs = 0
+        self._status_counts = Counter()
+        self._n_boxes = [0, 0]
+        self._write(
+            {
+                "type": "header",
+                "version": REPORT_VERSION,
+                "file_l": file_l,
+                "file_r": file_r,
+                "options": options or {},
+            }
+        )
+
+    @property
+    def n_pairs(self) -> int:
+        return self._n_pairs
+
+    @property
+    def n_changed(self) -> int:
+        return self._n_pairs - self._status_counts["same"]
+
+    def write_pair(self, record: dict[str, Any]) -> None:
+        self._n_pairs += 1
+        self._status_counts[record["status"]] += 1
+        stats = record.get("stats")
+        if stats is not None:
+            self._n_boxes[0] += stats["n_boxes_l"]
+            self._n_boxes[1] += stats["n_boxes_r"]
+        self._write({"type": "pair", **record})
+
+    def close(self) -> None:
+        self._write(
+            {
+                "type": "summary",
+                "n_pairs": self._n_pairs,
+                "n_changed": self.n_changed,
+                "status_counts": dict(self._status_counts),
+                "n_boxes_l": self._n_boxes[0],
+                "n_boxes_r": self._n_boxes[1],
+                "elapsed": round(time.perf_counter() - self._start, 3),
+            }
+        )
+
+    def _write(self, record: dict[str, Any]) -> None:
+        # flushed per line, so that a consumer can follow the stream
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+
+def create_pair_record(
+    index: int,
+    page_l: int | None,
+    page_r: int | None,
+    img_l: PageImage | None = None,
+    img_r: PageImage | None = None,
+    diff: PageDifference | None = None,
+) -> dict[str, Any]:
+    # page numbers are 1-based; boxes are x, y, w, h on the compared page
+    # and on the raster the document was converted to
+    record = {
+        "pair": index,
+        "page_l": None if page_l is None else page_l + 1,
+        "page_r": None if page_r is None else page_r + 1,
+    }
+    if page_l is None:
+        record["status"] = "inserted"
+        return record
+    if page_r is None:
+        record["status"] = "deleted"
+        return record
+
+    if img_l is None or img_r is None:
+        record["status"] = "incomparable"
+        return record
+
+    record["size_l"] = list(img_l.data.shape[:2])
+    record["size_r"] = list(img_r.data.shape[:2])
+    record["source_size_l"] = list(img_l.shape)
+    record["source_size_r"] = list(img_r.shape)
+    if diff is None:
+        record["status"] = "incomparable"
+        return record
+
+    changed = len(diff.rects_l) > 0 or len(diff.rects_r) > 0
+    record["status"] = "changed" if changed else "same"
+    record["transform"] = (
+        None if diff.transform is None else list(diff.transform)
+    )
+    record["boxes_l"] = diff.rects_l.to_list()
+    record["boxes_r"] = diff.rects_r.to_list()
+    record["source_boxes_l"] = scale_rects(
+        diff.rects_l,
+        img_l.data.shape[:2],
+        img_l.shape,
+    ).to_list()
+    record["source_boxes_r"] = scale_rects(
+        diff.rects_r,
+        img_r.data.shape[:2],
+        img_r.shape,
+    ).to_list()
+    record["stats"] = {
+        "n_boxes_l": len(diff.rects_l),
+        "n_boxes_r": len(diff.rects_r),
+        "box_ratio_l": _box_ratio(diff.rects_l, img_l.data.shape[:2]),
+        "box_ratio_r": _box_ratio(diff.rects_r, img_r.data.shape[:2]),
+    }
+    return record
+
+
+def scale_rects(
+    rects: BoxSet,
+    img_size: tuple[int, int],
+    dst_size: tuple[int, int],
+) -> BoxSet:
+    # the loading size keeps the aspect ratio only up to rounding, so both
+    # axes are scaled on their own; boxes grow outward to whole pixels
+    scale_y = dst_size[0] / img_size[0]
+    scale_x = dst_size[1] / img_size[1]
+    return BoxSet.from_xyxy(
+        np.floor(rects.x * scale_x),
+        np.floor(rects.y * scale_y),
+        np.ceil((rects.x + rects.w) * scale_x),
+        np.ceil((rects.y + rects.h) * scale_y),
+    ).clip(dst_size)
+
+
+def _box_ratio(rects: BoxSet, img_size: tuple[int, int]) -> float:
+    # overlapping boxes are counted twice, which merging mostly rules out
+    area = int(rects.areas().sum())
+    return round(area / (img_size[0] * img_size[1]), 6)
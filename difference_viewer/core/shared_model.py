@@ -15,11 +15,19 @@
 
 from __future__ import annotations
 
+import itertools
+import tempfile
+import weakref
+from concurrent.futures import Future
+from pathlib import Path
 from typing import Any, Callable, Generator
 
 import numpy as np
+from PyQt5 import sip
 from PyQt5.QtCore import QThread, pyqtSignal
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtGui import QImage
+
+from difference_viewer.core.imaging import compute_dhash, compute_tile_hashes
 
 try:
     from PIL import Image
@@ -35,17 +43,81 @@ except ImportError:
         return cv2.resize(image, (h, w), interpolation=cv2.INTER_AREA)
 
 
-def ndarray_to_pixmap(arr: np.ndarray) -> QPixmap:
-    h, w = arr.shape[:2]
-    return QPixmap(QImage(arr.data, w, h, 3 * w, QImage.Format_RGB888))
+class ArrayImage(QImage):
+    # a QImage over the memory of an array, which stays referenced for as
+    # long as this object lives; copies made by Qt share the memory without
+    # the reference, so the object itself has to be passed around
+
+    def __init__(
+        self,
+        arr: np.ndarray,
+        format_: QImage.Format,
+        width: int | None = None,
+    ) -> None:
+        h, w = arr.shape[:2]
+        if width is not None:
+            w = width
+        super().__init__(
+            sip.voidptr(arr.ctypes.data),
+            w,
+            h,
+            arr.strides[0],
+            format_,
+        )
+        self._array = arr
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._array
+
+
+_MONO_COLORS = [0xFF000000, 0xFFFFFFFF]
+
+
+def ndarray_to_qimage(arr: np.ndarray) -> ArrayImage:
+    # rows may be strided; only pixels and channels have to be packed, which
+    # holds for crops and row slices of a page. 4-channel rows are packed
+    # too, as qt converts them to rgba as if they had no padding and writes
+    # past the converted image
+    if arr.dtype == np.bool_ and arr.ndim == 2:
+        # 1-bit pixels need packing in any case; True is white
+        img = ArrayImage(
+            np.packbits(arr, axis=-1),
+            QImage.Format_Mono,
+            width=arr.shape[1],
+        )
+        img.setColorTable(_MONO_COLORS)
+        return img
+    if arr.dtype != np.uint8:
+        raise ValueError(f"Unsupported dtype: {arr.dtype}")
+    if arr.ndim == 2:
+        n_ch, format_ = 1, QImage.Format_Grayscale8
+    elif arr.ndim == 3 and arr.shape[2] == 3:
+        n_ch, format_ = 3, QImage.Format_RGB888
+    elif arr.ndim == 3 and arr.shape[2] == 4:
+        n_ch, format_ = 4, QImage.Format_RGBX8888
+    else:
+        raise ValueError(f"Unsupported shape: {arr.shape}")
+    if (
+        arr.strides[0] < 0
+        or arr.strides[1:] != (n_ch, 1)[: arr.ndim - 1]
+        or (n_ch == 4 and arr.strides[0] != arr.shape[1] * n_ch)
+    ):
+        arr = np.ascontiguousarray(arr)
+    return ArrayImage(arr, format_)
 
 
 class PageImage:
 
+    _ids = itertools.count()
+
     def __init__(
         self,
         image: np.ndarray,
         loading_size: tuple[int, int] | None = None,
+        tile_size: int = 0,
+        source_dir: Path | None = None,
+        region_renderer: Callable[..., Future] | None = None,
     ) -> None:
         h, w = image.shape[:2]
         if loading_size is not None:
@@ -54,8 +126,41 @@ class PageImage:
             new_h, new_w = int(h * scale), int(w * scale)
             self._image = _hq_resize(image, new_h, new_w)
         else:
+            scale = 1.0
             self._image = image
         self._default_shape = (h, w)
+        self._id = next(PageImage._ids)
+        self._region_renderer = region_renderer
+        self._dhash = compute_dhash(self._image)
+        if tile_size > 0:
+            self._tile_hashes = compute_tile_hashes(self._image, tile_size)
+        else:
+            self._tile_hashes = None
+
+        # the full resolution raster is kept on disk and memory-mapped on
+        # demand, so that only the display raster stays in memory
+        self._source_fp = None
+        self._source_tile_hashes = None
+        if source_dir is not None and scale < 1.0:
+            source_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=source_dir,
+                prefix="page_",
+                suffix=".npy",
+                delete=False,
+            ) as f:
+                np.save(f, np.ascontiguousarray(image))
+            self._source_fp = Path(f.name)
+            weakref.finalize(self, _remove_file, self._source_fp)
+            if tile_size > 0:
+                self._source_tile_hashes = compute_tile_hashes(
+                    image,
+                    tile_size,
+                )
+
+    @property
+    def id(self) -> int:
+        return self._id
 
     @property
     def shape(self) -> tuple[int, int]:
@@ -65,6 +170,45 @@ class PageImage:
     def data(self) -> np.ndarray:
         return self._image
 
+    @property
+    def dhash(self) -> int:
+        return self._dhash
+
+    @property
+    def tile_hashes(self) -> np.ndarray | None:
+        return self._tile_hashes
+
+    @property
+    def source_tile_hashes(self) -> np.ndarray | None:
+        return self._source_tile_hashes
+
+    def has_source(self) -> bool:
+        return self._source_fp is not None
+
+    def load_source(self) -> np.ndarray:
+        if self._source_fp is None:
+            return self._image
+        return np.load(self._source_fp, mmap_mode="r")
+
+    def can_render_region(self) -> bool:
+        return self._region_renderer is not None
+
+    def render_region(
+        self,
+        rect: tuple[int, int, int, int],
+        scale: float,
+    ) -> Future:
+        # a part of this raster rendered again from the vector source, with
+        # scale pixels per raster pixel
+        return self._region_renderer(rect, self._image.shape[:2], scale)
+
+
+def _remove_file(fp: Path) -> None:
+    try:
+        fp.unlink(missing_ok=True)
+    except OSError:
+        pass
+
 
 class IterationWorker(QThread):
 
@@ -0,0 +1,132 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QColor, QPainter, QPen
+from PyQt5.QtWidgets import (
+    QGraphicsItem,
+    QStyleOptionGraphicsItem,
+    QWidget,
+)
+
+from difference_viewer.core.imaging import BoxSet
+
+
+class BoxOverlayItem(QGraphicsItem):
+    # all difference boxes of a page as one vector item above the page
+    # pixmap, so that new boxes or a new style never touch the pixmap
+
+    def __init__(self, parent: QGraphicsItem | None = None) -> None:
+        super().__init__(parent)
+        # without the flag, exposedRect is the whole bounding rect
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self._boxes = BoxSet()
+        self._padding = 0
+        self._pen = QPen(QColor(0, 0, 0), 1)
+        self._pen.setJoinStyle(Qt.MiterJoin)
+        self._padded = BoxSet()
+        self._rects = []
+        self._highlight = None
+        self._bounding_rect = QRectF()
+
+    @property
+    def boxes(self) -> BoxSet:
+        return self._boxes
+
+    def set_boxes(self, boxes: BoxSet) -> None:
+        self._boxes = boxes
+        self._rebuild()
+
+    def set_style(self, color: QColor, width: int, padding: int) -> None:
+        self._pen.setColor(color)
+        self._pen.setWidth(width)
+        if padding != self._padding:
+            self._padding = padding
+            self._rebuild()
+        else:
+            self.prepareGeometryChange()
+            self._update_bounding_rect()
+            self.update()
+
+    def set_highlight(self, rect: QRectF | None) -> None:
+        # a box filled with the line color, such as the difference stepped to
+        self.prepareGeometryChange()
+        self._highlight = rect
+        self._update_bounding_rect()
+        self.update()
+
+    def boundingRect(self) -> QRectF:
+        return self._bounding_rect
+
+    def paint(
+        self,
+        painter: QPainter,
+        option: QStyleOptionGraphicsItem,
+        widget: QWidget | None = None,
+    ) -> None:
+        if self._highlight is not None:
+            fill = QColor(self._pen.color())
+            fill.setAlphaF(0.25)
+            painter.fillRect(self._padded_highlight(), fill)
+        if not self._rects:
+            return
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(self._pen)
+        painter.setBrush(Qt.NoBrush)
+        # only the boxes in the exposed area are stroked
+        exposed = option.exposedRect.adjusted(
+            -self._pen.width(),
+            -self._pen.width(),
+            self._pen.width(),
+            self._pen.width(),
+        )
+        painter.drawRects([r for r in self._rects if exposed.intersects(r)])
+
+    def _rebuild(self) -> None:
+        self.prepareGeometryChange()
+        self._padded = self._boxes.pad(self._padding, self._padding)
+        # a line on pixel row y runs through the pixel centers at y + 0.5,
+        # where the rasterized boxes were drawn
+        self._rects = [
+            QRectF(x + 0.5, y + 0.5, w, h)
+            for x, y, w, h in self._padded.to_list()
+        ]
+        self._update_bounding_rect()
+        self.update()
+
+    def _padded_highlight(self) -> QRectF:
+        return self._highlight.adjusted(
+            -self._padding + 0.5,
+            -self._padding + 0.5,
+            self._padding + 0.5,
+            self._padding + 0.5,
+        )
+
+    def _update_bounding_rect(self) -> None:
+        rect = self._padded.bounding_rect()
+        if rect is None:
+            self._bounding_rect = QRectF()
+        else:
+            margin = self._pen.width() / 2 + 1
+            self._bounding_rect = QRectF(
+                rect.x - margin,
+                rect.y - margin,
+                rect.w + 2 * margin + 1,
+                rect.h + 2 * margin + 1,
+            )
+        if self._highlight is not None:
+            self._bounding_rect |= self._padded_highlight()
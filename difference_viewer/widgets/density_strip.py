@@ -0,0 +1,109 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import numpy as np
+from PyQt5.QtCore import QRectF, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QMouseEvent, QPainter, QPaintEvent, QPalette
+from PyQt5.QtWidgets import QSizePolicy, QToolTip, QWidget
+
+
+class DensityStrip(QWidget):
+    # one cell per page pair, filled by how much of the pair changed
+
+    pair_clicked = pyqtSignal(int)
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self._summary = None
+        self._current = -1
+        self.setMouseTracking(True)
+        self.setFixedHeight(12)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+    def set_summary(self, summary: np.ndarray | None, current: int) -> None:
+        self._summary = summary
+        self._current = current
+        self.update()
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        if self._summary is None or len(self._summary) == 0:
+            return
+        painter = QPainter(self)
+        palette = self.palette()
+        n_pairs = len(self._summary)
+        cell_w = self.width() / n_pairs
+        h = self.height()
+        painter.fillRect(self.rect(), palette.color(QPalette.Base))
+
+        pending = palette.color(QPalette.Mid)
+        pending.setAlphaF(0.3)
+        highlight = palette.color(QPalette.Highlight)
+        n_boxes = self._summary["n_boxes"]
+        changed = self._summary["changed"]
+        ratios = self._summary["changed_ratio"]
+        for idx in np.flatnonzero((n_boxes < 0) | changed):
+            if n_boxes[idx] < 0:
+                color = pending
+            else:
+                # small changes stay visible, large ones saturate
+                color = QColor(highlight)
+                color.setAlphaF(float(min(1.0, 0.35 + 10.0 * ratios[idx])))
+            painter.fillRect(
+                QRectF(idx * cell_w, 0, max(1.0, cell_w), h),
+                color,
+            )
+        if 0 <= self._current < n_pairs:
+            painter.setPen(palette.color(QPalette.Text))
+            painter.drawRect(
+                QRectF(
+                    self._current * cell_w,
+                    0,
+                    max(1.0, cell_w) - 1,
+                    h - 1,
+                )
+            )
+        painter.end()
+
+    def mousePressEvent(self, event: QMouseEvent) -> None:
+        idx = self._pair_at(event.x())
+        if event.button() == Qt.LeftButton and idx >= 0:
+            self.pair_clicked.emit(idx)
+
+    def mouseMoveEvent(self, event: QMouseEvent) -> None:
+        idx = self._pair_at(event.x())
+        if idx < 0:
+            QToolTip.hideText()
+            return
+        row = self._summary[idx]
+        if row["n_boxes"] < 0:
+            text = f"{idx + 1}: 未集計"
+        elif row["changed"] and row["n_boxes"] == 0:
+            text = f"{idx + 1}: 比較できないページ"
+        elif row["changed"]:
+            text = (
+                f"{idx + 1}: 差分 {row['n_boxes']} 箇所 "
+                f"({row['changed_ratio']:.1%})"
+            )
+        else:
+            text = f"{idx + 1}: 差分なし"
+        QToolTip.showText(event.globalPos(), text, self)
+
+    def _pair_at(self, x: int) -> int:
+        if self._summary is None or len(self._summary) == 0:
+            return -1
+        idx = int(x * len(self._summary) / max(1, self.width()))
+        return min(max(0, idx), len(self._summary) - 1)
@@ -0,0 +1,280 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import bisect
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import (
+    QAbstractListModel,
+    QModelIndex,
+    QObject,
+    QRectF,
+    QSize,
+    Qt,
+    pyqtSignal,
+)
+from PyQt5.QtWidgets import QAbstractItemView, QListView, QWidget
+
+from difference_viewer.core.imaging import BoxSet, Rect
+from difference_viewer.core.registration import (
+    PageTransform,
+    is_identity_transform,
+    transform_rects,
+)
+from difference_viewer.core.shared_model import (
+    ArrayImage,
+    PageImage,
+    ndarray_to_qimage,
+)
+
+
+class DifferenceListModel(QAbstractListModel):
+    # one row per difference of the whole document, appended pair by pair
+    # as the pairs are summarized; a changed pair without boxes, such as an
+    # inserted page, gets one row of its own. Previews are cropped from the
+    # page rasters when a row is shown, and only the recent ones are kept.
+
+    def __init__(
+        self,
+        height: int,
+        cache_size: int,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self._height = height
+        self._cache_size = cache_size
+        self._pairs = []
+        self._images = ([], [])
+        self._entries = []
+        self._starts = []
+        self._n_rows = 0
+        self._cache: OrderedDict[int, ArrayImage] = OrderedDict()
+
+    def set_pages(
+        self,
+        pairs: list[tuple[int | None, int | None]],
+        images_l: list[PageImage],
+        images_r: list[PageImage],
+    ) -> None:
+        self.beginResetModel()
+        self._pairs = list(pairs)
+        self._images = (images_l, images_r)
+        self._drop_rows()
+        self.endResetModel()
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._drop_rows()
+        self.endResetModel()
+
+    def add_pair(
+        self,
+        pair: int,
+        rects: BoxSet,
+        transform: PageTransform | None,
+    ) -> None:
+        if not 0 <= pair < len(self._pairs):
+            return
+        n_rows = max(1, len(rects))
+        self.beginInsertRows(
+            QModelIndex(),
+            self._n_rows,
+            self._n_rows + n_rows - 1,
+        )
+        self._entries.append((pair, rects, transform))
+        self._starts.append(self._n_rows)
+        self._n_rows += n_rows
+        self.endInsertRows()
+
+    def target(self, row: int) -> tuple[int, QRectF | None]:
+        # the pair of the row and its box, or None for a whole page
+        pair, rects, _, offset = self._entry(row)
+        if len(rects) == 0:
+            return pair, None
+        return pair, QRectF(*rects[offset])
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._n_rows
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self._text(row)
+        if role == Qt.DecorationRole:
+            return self._preview(row)
+        if role == Qt.SizeHintRole:
+            return QSize(4 * self._height + 160, self._height + 6)
+        return None
+
+    def _drop_rows(self) -> None:
+        self._entries.clear()
+        self._starts.clear()
+        self._n_rows = 0
+        self._cache.clear()
+
+    def _entry(
+        self,
+        row: int,
+    ) -> tuple[int, BoxSet, PageTransform | None, int]:
+        k = bisect.bisect_right(self._starts, row) - 1
+        pair, rects, transform = self._entries[k]
+        return pair, rects, transform, row - self._starts[k]
+
+    def _text(self, row: int) -> str:
+        pair, rects, _, offset = self._entry(row)
+        page_l, page_r = self._pairs[pair]
+        label = " | ".join(
+            "-" if page is None else str(page + 1)
+            for page in (page_l, page_r)
+        )
+        if page_l is None:
+            return f"{label}  挿入ページ"
+        if page_r is None:
+            return f"{label}  削除ページ"
+        if len(rects) == 0:
+            return f"{label}  比較できないページ"
+        x, y, w, h = rects[offset]
+        return f"{label}  ({x}, {y})  {w}×{h}"
+
+    def _preview(self, row: int) -> ArrayImage:
+        image = self._cache.get(row)
+        if image is not None:
+            self._cache.move_to_end(row)
+            return image
+        pair, rects, transform, offset = self._entry(row)
+        page_l, page_r = self._pairs[pair]
+        images_l, images_r = self._images
+        img_l = None if page_l is None else images_l[page_l].data
+        img_r = None if page_r is None else images_r[page_r].data
+        if len(rects) > 0:
+            rect = rects[offset]
+            if img_l is not None:
+                img_l = _crop_around(img_l, rect)
+            if img_r is not None:
+                # the boxes lie on the left page, onto which the right page
+                # was registered
+                if transform is not None and not is_identity_transform(
+                    transform
+                ):
+                    rect = transform_rects(
+                        BoxSet([rect]),
+                        transform,
+                        img_size=img_r.shape[:2],
+                        inverse=True,
+                    )[0]
+                img_r = _crop_around(img_r, rect)
+
+        image = ndarray_to_qimage(create_preview(img_l, img_r, self._height))
+        self._cache[row] = image
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return image
+
+
+def create_preview(
+    img_l: np.ndarray | None,
+    img_r: np.ndarray | None,
+    height: int,
+) -> np.ndarray:
+    # both crops side by side, each fitted into a 2:1 cell, so that every
+    # preview has the same size
+    cell_w = 2 * height
+    preview = np.full((height, 2 * cell_w + 2, 3), 255, np.uint8)
+    preview[:, cell_w : cell_w + 2] = 192
+    for i, img in enumerate((img_l, img_r)):
+        if img is None or img.size == 0:
+            continue
+        h, w = img.shape[:2]
+        scale = min(height / h, cell_w / w)
+        new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+        fitted = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        if fitted.ndim == 2:
+            fitted = cv2.cvtColor(fitted, cv2.COLOR_GRAY2RGB)
+        elif fitted.shape[2] == 4:
+            fitted = cv2.cvtColor(fitted, cv2.COLOR_RGBA2RGB)
+        x = i * (cell_w + 2) + (cell_w - new_w) // 2
+        y = (height - new_h) // 2
+        preview[y : y + new_h, x : x + new_w] = fitted
+    return preview
+
+
+def _crop_around(img: np.ndarray, rect: Rect) -> np.ndarray:
+    # the box with some of its surroundings, grown to a shape between 1:1
+    # and 4:1, so that thin boxes keep their context
+    x, y, w, h = rect
+    cx, cy = x + w // 2, y + h // 2
+    margin = max(8, (w + h) // 8)
+    w, h = w + 2 * margin, h + 2 * margin
+    w = max(w, h)
+    h = max(h, w // 4)
+    img_h, img_w = img.shape[:2]
+    x1, y1 = max(0, cx - w // 2), max(0, cy - h // 2)
+    x2, y2 = min(img_w, cx + (w + 1) // 2), min(img_h, cy + (h + 1) // 2)
+    return img[y1:y2, x1:x2]
+
+
+class DifferenceList(QListView):
+    # the differences of the whole document; with uniform rows only the
+    # rows on screen are laid out and asked for their previews
+
+    difference_clicked = pyqtSignal(int, object)
+
+    def __init__(
+        self,
+        height: int,
+        cache_size: int,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self._model = DifferenceListModel(height, cache_size, self)
+        self.setModel(self._model)
+        self.setUniformItemSizes(True)
+        self.setIconSize(QSize(4 * height + 2, height))
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.clicked.connect(
+            lambda index: self.difference_clicked.emit(
+                *self._model.target(index.row())
+            )
+        )
+
+    @property
+    def n_differences(self) -> int:
+        return self._model.rowCount()
+
+    def set_pages(
+        self,
+        pairs: list[tuple[int | None, int | None]],
+        images_l: list[PageImage],
+        images_r: list[PageImage],
+    ) -> None:
+        self._model.set_pages(pairs, images_l, images_r)
+
+    def clear_differences(self) -> None:
+        self._model.clear()
+
+    def add_pair(
+        self,
+        pair: int,
+        rects: BoxSet,
+        transform: PageTransform | None,
+    ) -> None:
+        self._model.add_pair(pair, rects, transform)
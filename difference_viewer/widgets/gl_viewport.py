@@ -0,0 +1,87 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+import numpy as np
+from PyQt5.QtGui import QOffscreenSurface, QOpenGLContext, QSurfaceFormat
+from PyQt5.QtWidgets import QOpenGLWidget
+
+
+def create_gl_viewport(samples: int = 0) -> QOpenGLWidget | None:
+    # a context is made up front, so that a machine without opengl keeps the
+    # raster viewport instead of showing a blank one; software mesa counts
+    context = QOpenGLContext()
+    if not context.create():
+        return None
+    surface = QOffscreenSurface()
+    surface.setFormat(context.format())
+    surface.create()
+    if not surface.isValid() or not context.makeCurrent(surface):
+        return None
+    context.doneCurrent()
+
+    # the paint engine keeps a texture per image cache key, so the tiles,
+    # which live as long as their page, are uploaded once and reused while
+    # the view pans and zooms
+    viewport = QOpenGLWidget()
+    fmt = QSurfaceFormat()
+    fmt.setSamples(samples)
+    viewport.setFormat(fmt)
+    return viewport
+
+
+def get_gl_functions(viewport: QOpenGLWidget) -> Any | None:
+    # pyqt5 exposes the gl calls only through the versioned function objects,
+    # and only once the viewport has made its context
+    context = viewport.context()
+    if context is None:
+        return None
+    funcs = context.versionFunctions()
+    if funcs is not None:
+        funcs.initializeOpenGLFunctions()
+    return funcs
+
+
+class FrameTimer:
+    # paint times of a view, logged as a summary every n_frames frames so
+    # that the raster and the opengl viewport can be compared from the log
+
+    def __init__(self, name: str, n_frames: int = 120) -> None:
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self._name = name
+        self._times = np.zeros(n_frames)
+        self._n_times = 0
+        self._start = 0.0
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+
+    def stop(self) -> None:
+        self._times[self._n_times] = time.perf_counter() - self._start
+        self._n_times += 1
+        if self._n_times < len(self._times):
+            return
+        self._n_times = 0
+        ms = self._times * 1000
+        self.__logger.debug(
+            f"Frame times ({self._name}, {len(ms)} frames): "
+            f"mean={ms.mean():.2f}ms, p95={np.percentile(ms, 95):.2f}ms, "
+            f"max={ms.max():.2f}ms"
+        )
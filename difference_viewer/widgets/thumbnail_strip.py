@@ -0,0 +1,364 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import (
+    QAbstractListModel,
+    QModelIndex,
+    QObject,
+    QRect,
+    QSize,
+    Qt,
+    pyqtSignal,
+)
+from PyQt5.QtGui import QPainter, QPalette, QResizeEvent
+from PyQt5.QtWidgets import (
+    QAbstractItemView,
+    QListView,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionViewItem,
+    QWidget,
+)
+
+from difference_viewer.core.shared_model import (
+    ArrayImage,
+    PageImage,
+    ndarray_to_qimage,
+)
+
+BADGE_ROLE = Qt.UserRole + 1
+
+
+class ThumbnailModel(QAbstractListModel):
+    # one row per page pair; a thumbnail is made in the background when the
+    # view first asks for it, and only the recently asked ones are kept, so
+    # the memory follows the visible rows rather than the document length
+
+    thumbnail_ready = pyqtSignal(int, int, object)
+
+    def __init__(
+        self,
+        height: int,
+        cache_size: int,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self._height = height
+        self._cache_size = cache_size
+        self._pairs = []
+        self._images = ([], [])
+        self._summary = None
+        self._generation = 0
+        self._cache: OrderedDict[int, ArrayImage] = OrderedDict()
+        self._pending: dict[int, Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="Thumbnail",
+        )
+        self.thumbnail_ready.connect(self._on_thumbnail_ready)
+
+    def set_pages(
+        self,
+        pairs: list[tuple[int | None, int | None]],
+        images_l: list[PageImage],
+        images_r: list[PageImage],
+    ) -> None:
+        self.beginResetModel()
+        self._generation += 1
+        self._pairs = list(pairs)
+        self._images = (images_l, images_r)
+        self._summary = None
+        self._cache.clear()
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self.endResetModel()
+
+    def set_summary(self, summary: np.ndarray | None) -> None:
+        if summary is None or len(summary) != len(self._pairs):
+            summary = None
+        self._summary = summary
+        if self._pairs:
+            self.dataChanged.emit(
+                self.index(0),
+                self.index(len(self._pairs) - 1),
+                [BADGE_ROLE],
+            )
+
+    def set_visible_rows(self, first: int, last: int) -> None:
+        # rows scrolled past before their turn came are not made at all
+        for row in list(self._pending):
+            if not first <= row <= last and self._pending[row].cancel():
+                del self._pending[row]
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._pairs)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return " | ".join(
+                "-" if page is None else str(page + 1)
+                for page in self._pairs[row]
+            )
+        if role == Qt.DecorationRole:
+            return self._thumbnail(row)
+        if role == BADGE_ROLE:
+            # None while the pair is not summarized yet
+            if self._summary is None or self._summary[row]["n_boxes"] < 0:
+                return None
+            return (
+                bool(self._summary[row]["changed"]),
+                int(self._summary[row]["n_boxes"]),
+            )
+        return None
+
+    def _thumbnail(self, row: int) -> ArrayImage | None:
+        image = self._cache.get(row)
+        if image is not None:
+            self._cache.move_to_end(row)
+            return image
+        if row not in self._pending:
+            page_l, page_r = self._pairs[row]
+            images_l, images_r = self._images
+            self._pending[row] = self._executor.submit(
+                self._make_thumbnail,
+                self._generation,
+                row,
+                None if page_l is None else images_l[page_l],
+                None if page_r is None else images_r[page_r],
+            )
+        return None
+
+    def _make_thumbnail(
+        self,
+        generation: int,
+        row: int,
+        img_l: PageImage | None,
+        img_r: PageImage | None,
+    ) -> None:
+        thumb = create_pair_thumbnail(
+            None if img_l is None else img_l.data,
+            None if img_r is None else img_r.data,
+            self._height,
+        )
+        self.thumbnail_ready.emit(generation, row, ndarray_to_qimage(thumb))
+
+    def _on_thumbnail_ready(
+        self,
+        generation: int,
+        row: int,
+        image: ArrayImage,
+    ) -> None:
+        if generation != self._generation:
+            return
+        self._pending.pop(row, None)
+        self._cache[row] = image
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+def create_pair_thumbnail(
+    img_l: np.ndarray | None,
+    img_r: np.ndarray | None,
+    height: int,
+) -> np.ndarray:
+    # both pages side by side at the same height; a missing page is left
+    # blank at the width of the other one
+    thumbs = [
+        None if img is None else _resize_to_height(img, height)
+        for img in (img_l, img_r)
+    ]
+    shown = [thumb for thumb in thumbs if thumb is not None]
+    blank_w = shown[0].shape[1] if shown else height
+    gap = np.full((height, 2, 3), 255, np.uint8)
+    parts = []
+    for thumb in thumbs:
+        if thumb is None:
+            thumb = np.full((height, blank_w, 3), 255, np.uint8)
+        parts.append(thumb)
+    return np.hstack([parts[0], gap, parts[1]])
+
+
+def _resize_to_height(img: np.ndarray, height: int) -> np.ndarray:
+    h, w = img.shape[:2]
+    width = max(1, round(w * height / h))
+    thumb = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+    if thumb.ndim == 2:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_GRAY2RGB)
+    elif thumb.shape[2] == 4:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_RGBA2RGB)
+    return thumb
+
+
+class ThumbnailDelegate(QStyledItemDelegate):
+    # the thumbnail, the page numbers below it and a badge with the number
+    # of differences once the pair is summarized
+
+    def __init__(self, height: int, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._height = height
+
+    def sizeHint(
+        self,
+        option: QStyleOptionViewItem,
+        index: QModelIndex,
+    ) -> QSize:
+        return QSize(3 * self._height, self._height + 24)
+
+    def paint(
+        self,
+        painter: QPainter,
+        option: QStyleOptionViewItem,
+        index: QModelIndex,
+    ) -> None:
+        palette = option.palette
+        rect = option.rect
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(rect, palette.color(QPalette.Highlight))
+
+        image_rect = QRect(rect.x(), rect.y() + 4, rect.width(), self._height)
+        image = index.data(Qt.DecorationRole)
+        if image is None:
+            placeholder = palette.color(QPalette.Mid)
+            placeholder.setAlphaF(0.3)
+            w = int(1.4 * self._height)
+            painter.fillRect(
+                QRect(
+                    image_rect.center().x() - w // 2,
+                    image_rect.y(),
+                    w,
+                    self._height,
+                ),
+                placeholder,
+            )
+        else:
+            w = image.width()
+            painter.drawImage(
+                QRect(
+                    image_rect.center().x() - w // 2,
+                    image_rect.y(),
+                    w,
+                    self._height,
+                ),
+                image,
+            )
+
+        text_rect = QRect(rect.x(), image_rect.bottom() + 2, rect.width(), 18)
+        painter.setPen(
+            palette.color(
+                QPalette.HighlightedText
+                if option.state & QStyle.State_Selected
+                else QPalette.Text
+            )
+        )
+        painter.drawText(text_rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+
+        badge = index.data(BADGE_ROLE)
+        if badge is not None:
+            self._paint_badge(painter, palette, image_rect, *badge)
+        painter.restore()
+
+    def _paint_badge(
+        self,
+        painter: QPainter,
+        palette: QPalette,
+        rect: QRect,
+        changed: bool,
+        n_boxes: int,
+    ) -> None:
+        # pages that cannot be diffed are marked without a count
+        text = str(n_boxes) if n_boxes > 0 or not changed else "!"
+        color = palette.color(
+            QPalette.Highlight if changed else QPalette.Mid
+        )
+        width = max(18, painter.fontMetrics().width(text) + 10)
+        badge_rect = QRect(rect.right() - width - 4, rect.y() + 2, width, 18)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(badge_rect, 9, 9)
+        painter.setPen(palette.color(QPalette.HighlightedText))
+        painter.drawText(badge_rect, Qt.AlignCenter, text)
+
+
+class ThumbnailStrip(QListView):
+    # a list of page pair thumbnails; only the rows on screen are painted,
+    # and so only their thumbnails are made
+
+    pair_clicked = pyqtSignal(int)
+
+    def __init__(
+        self,
+        height: int,
+        cache_size: int,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self._model = ThumbnailModel(height, cache_size, self)
+        self.setModel(self._model)
+        self.setItemDelegate(ThumbnailDelegate(height, self))
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setMinimumWidth(3 * height + 24)
+        self.clicked.connect(lambda index: self.pair_clicked.emit(index.row()))
+        self.verticalScrollBar().valueChanged.connect(self._update_visible)
+
+    def set_pages(
+        self,
+        pairs: list[tuple[int | None, int | None]],
+        images_l: list[PageImage],
+        images_r: list[PageImage],
+    ) -> None:
+        self._model.set_pages(pairs, images_l, images_r)
+
+    def set_summary(self, summary: np.ndarray | None, current: int) -> None:
+        self._model.set_summary(summary)
+        if not 0 <= current < self._model.rowCount():
+            return
+        index = self._model.index(current)
+        if index != self.currentIndex():
+            self.setCurrentIndex(index)
+            self.scrollTo(index)
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        super().resizeEvent(event)
+        self._update_visible()
+
+    def _update_visible(self) -> None:
+        n_rows = self._model.rowCount()
+        if n_rows == 0:
+            return
+        viewport = self.viewport().rect()
+        first = self.indexAt(viewport.topLeft())
+        last = self.indexAt(viewport.bottomLeft())
+        self._model.set_visible_rows(
+            first.row() if first.isValid() else 0,
+            last.row() if last.isValid() else n_rows - 1,
+        )
@@ -0,0 +1,312 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QObject, QRectF, pyqtSignal
+from PyQt5.QtGui import QPainter
+from PyQt5.QtWidgets import (
+    QGraphicsItem,
+    QGraphicsObject,
+    QStyleOptionGraphicsItem,
+    QWidget,
+)
+
+from difference_viewer.core.shared_model import ArrayImage, ndarray_to_qimage
+
+
+class ImagePyramid:
+    # the page and its halved copies; the levels are made on first use by
+    # whichever thread needs them
+
+    def __init__(self, img: np.ndarray, n_levels: int) -> None:
+        self._levels = [img] + [None] * (n_levels - 1)
+        self._lock = threading.Lock()
+
+    @property
+    def n_levels(self) -> int:
+        return len(self._levels)
+
+    @property
+    def nbytes(self) -> int:
+        # the first level is the page itself, which the pyramid keeps alive
+        # for as long as it is cached, so it is counted too
+        return sum(lv.nbytes for lv in self._levels if lv is not None)
+
+    def level(self, idx: int) -> np.ndarray:
+        with self._lock:
+            for i in range(1, idx + 1):
+                if self._levels[i] is None:
+                    prev = self._levels[i - 1]
+                    h, w = prev.shape[:2]
+                    self._levels[i] = cv2.resize(
+                        prev,
+                        (max(1, (w + 1) // 2), max(1, (h + 1) // 2)),
+                        interpolation=cv2.INTER_AREA,
+                    )
+            return self._levels[idx]
+
+
+class PageTiles:
+    # the tiles of one page; a level is cut into tiles at once, as views of
+    # the level made by the pyramid
+
+    def __init__(self, img: np.ndarray, n_levels: int, tile_size: int) -> None:
+        self._pyramid = ImagePyramid(img, n_levels)
+        self._tile_size = tile_size
+        self._levels = {}
+        self._copied_bytes = 0
+        self.pending_levels = set()
+        self.size = img.shape[:2]
+
+    @property
+    def n_levels(self) -> int:
+        return self._pyramid.n_levels
+
+    @property
+    def tile_size(self) -> int:
+        return self._tile_size
+
+    @property
+    def nbytes(self) -> int:
+        return self._pyramid.nbytes + self._copied_bytes
+
+    def has_level(self, level: int) -> bool:
+        return level in self._levels
+
+    def tile(self, level: int, col: int, row: int) -> ArrayImage | None:
+        return self._levels[level].get((col, row))
+
+    def prepare_level(self, level: int) -> None:
+        if level in self._levels:
+            return
+        arr = self._pyramid.level(level)
+        ts = self._tile_size
+        h, w = arr.shape[:2]
+        # the images hold their level, so that the tiles outlive the pyramid
+        tiles = {
+            (col, row): ndarray_to_qimage(
+                arr[row * ts : (row + 1) * ts, col * ts : (col + 1) * ts]
+            )
+            for row in range(math.ceil(h / ts))
+            for col in range(math.ceil(w / ts))
+        }
+        # tiles that had to be packed hold copies of their pixels
+        self._copied_bytes += sum(
+            image.array.nbytes
+            for image in tiles.values()
+            if not np.may_share_memory(image.array, arr)
+        )
+        self._levels[level] = tiles
+
+
+class TileCache(QObject):
+    # the tiles of the recently shown and prefetched pages; the least
+    # recently used pages are dropped once their levels exceed max_bytes,
+    # while items showing a dropped page keep its tiles on their own
+
+    level_ready = pyqtSignal(object, int)
+
+    def __init__(
+        self,
+        max_bytes: int,
+        n_levels: int = 5,
+        tile_size: int = 512,
+    ) -> None:
+        super().__init__()
+        self._max_bytes = max_bytes
+        self._n_levels = n_levels
+        self._tile_size = tile_size
+        self._entries: OrderedDict[Hashable, PageTiles] = OrderedDict()
+        self._executor = ThreadPoolExecutor(
+            max_workers=2,
+            thread_name_prefix="TileCache",
+        )
+        self.level_ready.connect(self._on_level_ready)
+
+    def get(self, key: Hashable, img: np.ndarray) -> PageTiles:
+        tiles = self._entries.get(key)
+        if tiles is None:
+            tiles = PageTiles(img, self._n_levels, self._tile_size)
+            self._entries[key] = tiles
+        self._entries.move_to_end(key)
+        self._trim()
+        return tiles
+
+    def retain(self, keys: set[Hashable]) -> None:
+        # drops the pages of other keys, such as those of a replaced document
+        for key in [key for key in self._entries if key not in keys]:
+            del self._entries[key]
+
+    def request(self, tiles: PageTiles, level: int) -> None:
+        # the page level is cut on the spot; smaller levels are resized in
+        # the background
+        if tiles.has_level(level) or level in tiles.pending_levels:
+            return
+        if level == 0:
+            tiles.prepare_level(level)
+            return
+        tiles.pending_levels.add(level)
+        self._executor.submit(self._prepare_level, tiles, level)
+
+    def _prepare_level(self, tiles: PageTiles, level: int) -> None:
+        tiles.prepare_level(level)
+        self.level_ready.emit(tiles, level)
+
+    def _on_level_ready(self, tiles: PageTiles, level: int) -> None:
+        tiles.pending_levels.discard(level)
+        self._trim()
+
+    def _trim(self) -> None:
+        total = sum(entry.nbytes for entry in self._entries.values())
+        while total > self._max_bytes and len(self._entries) > 1:
+            _, dropped = self._entries.popitem(last=False)
+            total -= dropped.nbytes
+
+
+class TiledPageItem(QGraphicsObject):
+    # paints only the visible tiles of a page, from the pyramid level that
+    # matches the zoom; missing levels are made in the background while a
+    # coarser one stands in for them. Tiles are images over the memory of
+    # their level, which the raster engine paints without converting them
+    # to pixmaps first.
+
+    def __init__(
+        self,
+        cache: TileCache,
+        parent: QGraphicsItem | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self._cache = cache
+        self._tiles = None
+        self._level = 0
+        self._cache.level_ready.connect(self._on_level_ready)
+
+    def is_empty(self) -> bool:
+        return self._tiles is None
+
+    def set_image(
+        self,
+        img: np.ndarray | None,
+        key: Hashable | None = None,
+    ) -> None:
+        self.prepareGeometryChange()
+        if img is None:
+            self._tiles = None
+        else:
+            if key is None:
+                key = object()
+            self._tiles = self._cache.get(key, img)
+            # the coarsest level is the stand-in of last resort, so a page
+            # that was not prefetched makes it before the first paint
+            self._tiles.prepare_level(self._tiles.n_levels - 1)
+        self.update()
+
+    def prefetch(self, img: np.ndarray, key: Hashable) -> None:
+        # the levels of the current zoom are made ahead for a page that is
+        # likely shown next
+        tiles = self._cache.get(key, img)
+        self._cache.request(tiles, tiles.n_levels - 1)
+        self._cache.request(tiles, self._level)
+
+    def boundingRect(self) -> QRectF:
+        if self._tiles is None:
+            return QRectF()
+        h, w = self._tiles.size
+        return QRectF(0, 0, w, h)
+
+    def paint(
+        self,
+        painter: QPainter,
+        option: QStyleOptionGraphicsItem,
+        widget: QWidget | None = None,
+    ) -> None:
+        tiles = self._tiles
+        if tiles is None:
+            return
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        # the finest level that is not magnified on screen
+        level = 0
+        if 0 < lod < 1:
+            level = min(int(math.log2(1.0 / lod)), tiles.n_levels - 1)
+        self._level = level
+        self._cache.request(tiles, level)
+        while not tiles.has_level(level):
+            level += 1
+
+        exposed = option.exposedRect & self.boundingRect()
+        span = tiles.tile_size * 2**level
+        col1, row1 = int(exposed.left() // span), int(exposed.top() // span)
+        col2 = int(math.ceil(exposed.right() / span))
+        row2 = int(math.ceil(exposed.bottom() / span))
+        for row in range(row1, row2):
+            for col in range(col1, col2):
+                image = tiles.tile(level, col, row)
+                if image is None:
+                    continue
+                target = QRectF(col * span, row * span, span, span)
+                painter.drawImage(
+                    target & self.boundingRect(),
+                    image,
+                    QRectF(image.rect()),
+                )
+
+    def _on_level_ready(self, tiles: PageTiles, level: int) -> None:
+        if tiles is self._tiles:
+            self.update()
+
+
+class RegionImageItem(QGraphicsItem):
+    # an image over a part of the page, such as a part rendered again at a
+    # higher scale than the page raster
+
+    def __init__(self, parent: QGraphicsItem | None = None) -> None:
+        super().__init__(parent)
+        self._image = None
+        self._rect = QRectF()
+
+    def set_image(
+        self,
+        image: ArrayImage | None,
+        rect: QRectF | None = None,
+    ) -> None:
+        self.prepareGeometryChange()
+        self._image = image
+        self._rect = QRectF() if image is None else rect
+        self.update()
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def paint(
+        self,
+        painter: QPainter,
+        option: QStyleOptionGraphicsItem,
+        widget: QWidget | None = None,
+    ) -> None:
+        if self._image is None:
+            return
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.drawImage(self._rect, self._image, QRectF(self._image.rect()))
@@ -0,0 +1,154 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from difference_viewer.core.alignment import align_pages, hamming_distances
+
+
+def create_hashes(seed: int, n: int) -> list[int]:
+    rng = np.random.default_rng(seed)
+    return [int(h) for h in rng.integers(0, 2**63, n)]
+
+
+def flip_bits(hash_: int, bits: list[int]) -> int:
+    for bit in bits:
+        hash_ ^= 1 << bit
+    return hash_
+
+
+def align(hashes1: list[int], hashes2: list[int]) -> list[tuple]:
+    return align_pages(
+        np.array(hashes1, dtype=np.uint64),
+        np.array(hashes2, dtype=np.uint64),
+    )
+
+
+def alignment_score(
+    hashes1: list[int],
+    hashes2: list[int],
+    pairs: list[tuple],
+    max_distance: int = 16,
+    gap_score: float = -0.6,
+) -> float:
+    score = 0.0
+    for i, j in pairs:
+        if i is None or j is None:
+            score += gap_score
+        else:
+            distance = bin(hashes1[i] ^ hashes2[j]).count("1")
+            score += 1.0 - distance / max_distance
+    return score
+
+
+def best_score(
+    hashes1: list[int],
+    hashes2: list[int],
+    max_distance: int = 16,
+    gap_score: float = -0.6,
+) -> float:
+    n, m = len(hashes1), len(hashes2)
+    scores = np.zeros((n + 1, m + 1))
+    scores[:, 0] = gap_score * np.arange(n + 1)
+    scores[0] = gap_score * np.arange(m + 1)
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            distance = bin(hashes1[i - 1] ^ hashes2[j - 1]).count("1")
+            scores[i, j] = max(
+                scores[i - 1, j - 1] + 1.0 - distance / max_distance,
+                scores[i - 1, j] + gap_score,
+                scores[i, j - 1] + gap_score,
+            )
+    return scores[n, m]
+
+
+def test_hamming_distances():
+    hashes = np.array([0, 1, 2**64 - 1, 0b1011], dtype=np.uint64)
+    assert hamming_distances(0, hashes).tolist() == [0, 1, 64, 3]
+
+
+def test_identical_documents():
+    hashes = create_hashes(0, 8)
+    assert align(hashes, hashes) == [(i, i) for i in range(8)]
+
+
+def test_inserted_page():
+    hashes = create_hashes(0, 8)
+    inserted = hashes[:3] + create_hashes(1, 1) + hashes[3:]
+    assert align(hashes, inserted) == (
+        [(0, 0), (1, 1), (2, 2), (None, 3)]
+        + [(i, i + 1) for i in range(3, 8)]
+    )
+
+
+def test_deleted_pages():
+    hashes = create_hashes(0, 8)
+    deleted = hashes[:2] + hashes[4:]
+    assert align(hashes, deleted) == (
+        [(0, 0), (1, 1), (2, None), (3, None)]
+        + [(i, i - 2) for i in range(4, 8)]
+    )
+
+
+def test_edited_pages_stay_paired():
+    hashes = create_hashes(0, 8)
+    edited = [flip_bits(h, [i, 40 + i]) for i, h in enumerate(hashes)]
+    assert align(hashes, edited) == [(i, i) for i in range(8)]
+
+
+@pytest.mark.parametrize("n_bits", [0, 3])
+def test_near_duplicate_pages(n_bits: int):
+    # a copy of page 2 follows it; the pages keep their partners, and the
+    # copy is the inserted one
+    hashes = create_hashes(0, 6)
+    copy = flip_bits(hashes[2], list(range(n_bits)))
+    duplicated = hashes[:3] + [copy] + hashes[3:]
+    expected = (
+        [(0, 0), (1, 1), (2, 2), (None, 3)]
+        + [(i, i + 1) for i in range(3, 6)]
+    )
+    assert align(hashes, duplicated) == expected
+    assert align(duplicated, hashes) == [(j, i) for i, j in expected]
+
+
+def test_runs_of_equal_pages_stay_aligned():
+    blank = create_hashes(1, 1)[0]
+    hashes = create_hashes(0, 2)
+    assert align(hashes + [blank] * 4, hashes + [blank] * 3) == [
+        (0, 0),
+        (1, 1),
+        (2, 2),
+        (3, 3),
+        (4, 4),
+        (5, None),
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_alignment_is_optimal(seed: int):
+    rng = np.random.default_rng(seed)
+    pool = create_hashes(seed, 6)
+    pool += [flip_bits(h, [1, 7, 30]) for h in pool]
+    hashes1 = [pool[k] for k in rng.integers(0, len(pool), rng.integers(0, 9))]
+    hashes2 = [pool[k] for k in rng.integers(0, len(pool), rng.integers(1, 9))]
+    pairs = align(hashes1, hashes2)
+    assert [i for i, _ in pairs if i is not None] == list(range(len(hashes1)))
+    assert [j for _, j in pairs if j is not None] == list(range(len(hashes2)))
+    assert alignment_score(hashes1, hashes2, pairs) == pytest.approx(
+        best_score(hashes1, hashes2)
+    )
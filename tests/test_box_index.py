@@ -0,0 +1,93 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import numpy as np
+
+from difference_viewer.core.box_index import BoxIndex, reading_order
+from difference_viewer.core.imaging import BoxSet
+
+
+def query_all(boxes: BoxSet, x: float, y: float) -> list[int]:
+    arr = boxes.array
+    return [
+        i
+        for i, (bx, by, bw, bh) in enumerate(arr.tolist())
+        if bx <= x < bx + bw and by <= y < by + bh
+    ]
+
+
+def test_empty():
+    index = BoxIndex(BoxSet())
+    assert len(index) == 0
+    assert index.query_point(10, 10).tolist() == []
+    assert reading_order(BoxSet()).tolist() == []
+
+
+def test_box_spanning_cells():
+    # a box over 3 x 2 cells is found from every one of them
+    index = BoxIndex(BoxSet([(20, 30, 250, 150)]), cell_size=100)
+    for x in (20, 99.5, 100, 150, 269.5):
+        for y in (30, 99, 100, 179.5):
+            assert index.query_point(x, y).tolist() == [0]
+    for x, y in ((19.5, 50), (270, 50), (50, 29.5), (50, 180), (500, 500)):
+        assert index.query_point(x, y).tolist() == []
+
+
+def test_nested_boxes_smallest_first():
+    boxes = BoxSet(
+        [
+            (0, 0, 400, 400),
+            (100, 100, 50, 50),
+            (50, 50, 200, 200),
+        ]
+    )
+    index = BoxIndex(boxes, cell_size=64)
+    assert index.query_point(120, 120).tolist() == [1, 2, 0]
+    assert index.query_point(60, 60).tolist() == [2, 0]
+    assert index.query_point(10, 10).tolist() == [0]
+
+
+def test_query_point_matches_brute_force():
+    rng = np.random.default_rng(0)
+    xy = rng.integers(0, 900, size=(60, 2))
+    wh = rng.integers(1, 300, size=(60, 2))
+    boxes = BoxSet(np.hstack([xy, wh]))
+    index = BoxIndex(boxes, cell_size=128)
+    areas = boxes.areas()
+    for x, y in rng.uniform(-10, 1200, size=(500, 2)):
+        ids = index.query_point(x, y).tolist()
+        assert sorted(ids) == query_all(boxes, x, y)
+        assert areas[ids].tolist() == sorted(areas[ids].tolist())
+
+
+def test_reading_order_two_lines():
+    # the words of a line are read left to right even when their tops are
+    # a few pixels apart, and the second line after the whole first one
+    boxes = BoxSet(
+        [
+            (300, 104, 80, 20),
+            (10, 150, 60, 20),
+            (10, 100, 80, 22),
+            (150, 98, 100, 24),
+            (200, 146, 60, 22),
+        ]
+    )
+    assert reading_order(boxes).tolist() == [2, 3, 0, 1, 4]
+    index = BoxIndex(boxes)
+    assert index.order.tolist() == [2, 3, 0, 1, 4]
+    assert [index.rank(i) for i in range(5)] == [2, 3, 0, 1, 4]
@@ -0,0 +1,166 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from difference_viewer.app import cli
+
+pymupdf = pytest.importorskip("pymupdf")
+
+_compare_page_pair = cli._compare_page_pair
+
+
+def _crash_on_second_pair(index, page_l, page_r, image_dir):
+    if index == 1:
+        os._exit(1)
+    return _compare_page_pair(index, page_l, page_r, image_dir)
+
+
+def create_pdf(fp: Path, texts: list[str]) -> None:
+    doc = pymupdf.open()
+    for text in texts:
+        page = doc.new_page()
+        page.insert_text((72, 72), text, fontsize=24)
+    doc.save(fp)
+    doc.close()
+
+
+@pytest.fixture
+def batch_dirs(tmp_path: Path) -> tuple[Path, Path, Path]:
+    dir_l = tmp_path / "l"
+    dir_r = tmp_path / "r"
+    dir_l.mkdir()
+    dir_r.mkdir()
+    create_pdf(dir_l / "a.pdf", ["one", "two", "three"])
+    create_pdf(dir_r / "a.pdf", ["one", "TWO", "three"])
+    create_pdf(dir_l / "b.pdf", ["four", "five"])
+    create_pdf(dir_r / "b.pdf", ["four", "five"])
+    return dir_l, dir_r, tmp_path / "out"
+
+
+def run_batch(dirs: tuple[Path, Path, Path]) -> int:
+    dir_l, dir_r, out = dirs
+    args = cli._parse_args(
+        ["batch", str(dir_l), str(dir_r), "-o", str(out), "-j", "2"]
+    )
+    return cli._run_batch(args, cli._create_options(args))
+
+
+def read_jsonl(fp: Path) -> list[dict]:
+    return [json.loads(line) for line in fp.read_text().splitlines()]
+
+
+def read_statuses(out: Path) -> dict[str, str]:
+    index = json.loads((out / "index.json").read_text())
+    return {entry["file"]: entry["status"] for entry in index["files"]}
+
+
+def test_batch(batch_dirs: tuple[Path, Path, Path]):
+    out = batch_dirs[2]
+    assert run_batch(batch_dirs) == cli.EXIT_DIFFERENT
+    assert read_statuses(out) == {"a.pdf": "changed", "b.pdf": "same"}
+    index = json.loads((out / "index.json").read_text())
+    assert [p["pair"] for p in index["files"][0]["changed_pairs"]] == [1]
+
+
+def test_batch_resumes_half_written_checkpoint(
+    batch_dirs: tuple[Path, Path, Path],
+):
+    out = batch_dirs[2]
+    run_batch(batch_dirs)
+    checkpoint = out / "checkpoint.jsonl"
+    lines = checkpoint.read_text().splitlines(keepends=True)
+    kept = [
+        line
+        for line in lines
+        if "options" in json.loads(line)
+        or json.loads(line).get("pair") == 0
+    ]
+    assert len(kept) == 3
+    # the run was killed while writing the next record
+    cut = next(line for line in lines if line not in kept)
+    checkpoint.write_text("".join(kept) + cut[: len(cut) // 2])
+
+    assert run_batch(batch_dirs) == cli.EXIT_DIFFERENT
+    assert read_statuses(out) == {"a.pdf": "changed", "b.pdf": "same"}
+    records = read_jsonl(checkpoint)
+    pairs = [(r["file"], r["pair"]) for r in records if "pair" in r]
+    # only the pairs missing from the checkpoint are compared again
+    assert sorted(pairs) == [
+        ("a.pdf", 0),
+        ("a.pdf", 1),
+        ("a.pdf", 2),
+        ("b.pdf", 0),
+        ("b.pdf", 1),
+    ]
+    assert sorted(r["file"] for r in records if "n_pairs" in r) == [
+        "a.pdf",
+        "b.pdf",
+    ]
+
+
+def test_batch_survives_crashed_worker(
+    batch_dirs: tuple[Path, Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    out = batch_dirs[2]
+    monkeypatch.setattr(cli, "_compare_page_pair", _crash_on_second_pair)
+    assert run_batch(batch_dirs) == cli.EXIT_ERROR
+    assert read_statuses(out)["a.pdf"] == "error"
+    records = read_jsonl(out / "checkpoint.jsonl")
+    failed = {
+        (r["file"], r["failed_pair"]) for r in records if "failed_pair" in r
+    }
+    assert ("a.pdf", 1) in failed
+    assert ("b.pdf", 1) in failed
+
+    # the failed pairs are compared again on resuming
+    monkeypatch.setattr(cli, "_compare_page_pair", _compare_page_pair)
+    assert run_batch(batch_dirs) == cli.EXIT_DIFFERENT
+    assert read_statuses(out) == {"a.pdf": "changed", "b.pdf": "same"}
+
+
+def test_stream_compare_is_valid_after_crash(
+    batch_dirs: tuple[Path, Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    dir_l, dir_r, out = batch_dirs
+    out.mkdir()
+    report = out / "report.jsonl"
+    monkeypatch.setattr(cli, "_compare_page_pair", _crash_on_second_pair)
+    args = cli._parse_args(
+        [
+            "compare",
+            str(dir_l / "a.pdf"),
+            str(dir_r / "a.pdf"),
+            "-o",
+            str(report),
+            "--format",
+            "jsonl",
+            "-j",
+            "1",
+        ]
+    )
+    assert cli._run_compare(args, cli._create_options(args)) == cli.EXIT_ERROR
+    # the pairs finished before the crash are kept, without the summary
+    records = read_jsonl(report)
+    assert [r["type"] for r in records] == ["header", "pair"]
+    assert records[1]["pair"] == 0
@@ -0,0 +1,60 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import cv2
+import numpy as np
+import pytest
+
+from difference_viewer.core.comparison import summarize_page_pair
+from difference_viewer.core.imaging import (
+    DifferenceDetector,
+    compute_tile_hashes,
+    create_diff_binary_mask,
+)
+
+
+def create_page_pair(seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    img1 = np.full((900, 700, 3), 255, dtype=np.uint8)
+    img2 = img1.copy()
+    for _ in range(rng.integers(1, 6)):
+        center = (int(rng.integers(0, 700)), int(rng.integers(0, 900)))
+        radius = int(rng.integers(2, 120))
+        gray = int(rng.integers(0, 250))
+        cv2.circle(img2, center, radius, (gray, gray, gray), -1)
+    return img1, img2
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("threshold", [0, 128])
+def test_changed_ratio_counts_only_changed_tiles(seed: int, threshold: int):
+    img1, img2 = create_page_pair(seed)
+    detector = DifferenceDetector(tile_size=64)
+    tile_hashes = (
+        compute_tile_hashes(img1, 64),
+        compute_tile_hashes(img2, 64),
+    )
+    (n_boxes, changed_ratio, changed), _ = summarize_page_pair(
+        detector,
+        img1,
+        img2,
+        tile_hashes=tile_hashes,
+        threshold=threshold,
+    )
+    diff_mask = create_diff_binary_mask(img1, img2, threshold)
+    assert changed_ratio == cv2.countNonZero(diff_mask) / diff_mask.size
+    assert changed == (n_boxes > 0)
@@ -0,0 +1,79 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from difference_viewer.app.config import AppConfig
+
+BOOL_KEYS = [
+    "page_registration",
+    "page_alignment",
+    "opengl_viewport",
+    "log_frame_times",
+    "full_resolution_diff",
+]
+
+
+@pytest.fixture
+def override(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def _override(data: dict[str, Any]) -> None:
+        for key in data:
+            if hasattr(AppConfig, key):
+                monkeypatch.setattr(AppConfig, key, getattr(AppConfig, key))
+        fp = tmp_path / "config.json"
+        fp.write_text(json.dumps(data))
+        AppConfig.override_config_from_json(fp)
+
+    return _override
+
+
+@pytest.mark.parametrize("key", BOOL_KEYS)
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (True, True),
+        (False, False),
+        ("true", True),
+        ("false", False),
+        ("False", False),
+        ("1", True),
+        ("0", False),
+        (1, True),
+        (0, False),
+    ],
+)
+def test_bool_values(override, key: str, value: Any, expected: bool):
+    override({key: value})
+    assert getattr(AppConfig, key) is expected
+
+
+@pytest.mark.parametrize("key", BOOL_KEYS)
+def test_invalid_bool_is_skipped(override, key: str):
+    default = getattr(AppConfig, key)
+    override({key: "yes", "diff_tile_size": 128})
+    assert getattr(AppConfig, key) is default
+    assert AppConfig.diff_tile_size == 128
+
+
+def test_env_vars_in_strings(override, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("DV_TEST_BACKEND", "contour")
+    override({"diff_box_backend": "%DV_TEST_BACKEND%"})
+    assert AppConfig.diff_box_backend == "contour"
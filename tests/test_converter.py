@@ -0,0 +1,59 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from difference_viewer.core.converter import PDFRegionRenderer
+
+pymupdf = pytest.importorskip("pymupdf")
+
+
+@pytest.fixture
+def renderer(tmp_path: Path):
+    fp = tmp_path / "page.pdf"
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.draw_circle((300, 400), 100)
+    doc.save(fp)
+    doc.close()
+    renderer = PDFRegionRenderer(fp)
+    yield renderer
+    renderer.close()
+
+
+def test_render_region(renderer: PDFRegionRenderer):
+    future = renderer.render(0, (0, 0, 100, 50), (842, 595), 2.0)
+    assert future.result(timeout=10).shape == (100, 200, 3)
+
+
+def test_close_cancels_queued_renders(renderer: PDFRegionRenderer):
+    # the worker is held by another job so that the renders stay queued
+    executor = renderer._PDFRegionRenderer__executor
+    release = threading.Event()
+    blocker = executor.submit(release.wait, 10)
+    queued = [
+        renderer.render(0, (0, 0, 100, 100), (842, 595), 1.0)
+        for _ in range(3)
+    ]
+    renderer.close()
+    release.set()
+    blocker.result(timeout=10)
+    assert all(future.cancelled() for future in queued)
+    assert renderer.render(0, (0, 0, 10, 10), (842, 595), 1.0).cancelled()
@@ -0,0 +1,76 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import cv2
+import numpy as np
+import pytest
+
+from difference_viewer.core.comparison import choose_page_transform
+from difference_viewer.core.registration import (
+    PageTransform,
+    estimate_page_transform,
+    warp_image,
+)
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do".split()
+
+
+def create_text_page(seed: int, edit_seed: int = 0, edited: float = 0.0):
+    rng = np.random.default_rng(seed)
+    edit_rng = np.random.default_rng(edit_seed)
+    img = np.full((2000, 1400, 3), 255, dtype=np.uint8)
+    for y in range(100, 1900, 40):
+        words = rng.choice(WORDS, 6)
+        if edit_rng.random() < edited:
+            words = edit_rng.choice(WORDS, 6)
+        cv2.putText(
+            img,
+            " ".join(words),
+            (80, y),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.0,
+            (0, 0, 0),
+            2,
+        )
+    return img
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_heavily_edited_page_stays_unwarped(seed: int):
+    img1 = create_text_page(seed)
+    img2 = create_text_page(seed, edit_seed=seed + 100, edited=0.7)
+    assert estimate_page_transform(img1, img2) is None
+    assert choose_page_transform(img1, img2) is None
+
+
+@pytest.mark.parametrize(
+    "transform",
+    [PageTransform(1.0, 7.0, -5.0), PageTransform(1.01, -12.0, 8.0)],
+)
+def test_shifted_page_is_registered(transform: PageTransform):
+    img1 = create_text_page(0)
+    inverse = PageTransform(
+        1.0 / transform.scale,
+        -transform.tx / transform.scale,
+        -transform.ty / transform.scale,
+    )
+    img2 = warp_image(create_text_page(0), inverse, img1.shape[:2])
+    estimated = estimate_page_transform(img1, img2)
+    assert estimated is not None
+    assert estimated.scale == pytest.approx(transform.scale, abs=3e-3)
+    assert estimated.tx == pytest.approx(transform.tx, abs=3.0)
+    assert estimated.ty == pytest.approx(transform.ty, abs=3.0)
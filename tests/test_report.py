@@ -0,0 +1,107 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import io
+import json
+
+import numpy as np
+
+from difference_viewer.core.comparison import PageDifference
+from difference_viewer.core.imaging import BoxSet
+from difference_viewer.core.report import ReportWriter, create_pair_record
+from difference_viewer.core.shared_model import PageImage
+
+
+class FlushRecorder(io.StringIO):
+    # keeps what a reader of the stream would have seen at every flush
+    def __init__(self) -> None:
+        super().__init__()
+        self.flushed = []
+
+    def flush(self) -> None:
+        super().flush()
+        self.flushed.append(self.getvalue())
+
+
+def create_records() -> list[dict]:
+    img = PageImage(np.full((100, 80, 3), 255, dtype=np.uint8))
+    same = PageDifference(BoxSet(), BoxSet(), None, BoxSet())
+    rects = BoxSet([(10, 20, 5, 5)])
+    changed = PageDifference(rects, rects, None, rects)
+    return [
+        create_pair_record(0, 0, 0, img_l=img, img_r=img, diff=same),
+        create_pair_record(1, 1, 1, img_l=img, img_r=img, diff=changed),
+        create_pair_record(2, None, 2),
+        create_pair_record(3, 2, None),
+    ]
+
+
+def read_lines(text: str) -> list[dict]:
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_one_record_per_pair():
+    f = io.StringIO()
+    writer = ReportWriter(f, "a.pdf", "b.pdf", options={"threshold": 0})
+    records = create_records()
+    for record in records:
+        writer.write_pair(record)
+    writer.close()
+    lines = read_lines(f.getvalue())
+    assert [line["type"] for line in lines] == (
+        ["header"] + ["pair"] * len(records) + ["summary"]
+    )
+    assert lines[0]["options"] == {"threshold": 0}
+    for line, record in zip(lines[1:-1], records):
+        assert line == {"type": "pair", **record}
+    summary = lines[-1]
+    assert summary["n_pairs"] == 4
+    assert summary["n_changed"] == 3
+    assert summary["status_counts"] == {
+        "same": 1,
+        "changed": 1,
+        "inserted": 1,
+        "deleted": 1,
+    }
+    assert summary["n_boxes_l"] == 1
+    assert summary["n_boxes_r"] == 1
+
+
+def test_flushed_per_line():
+    f = FlushRecorder()
+    writer = ReportWriter(f, "a.pdf", "b.pdf")
+    for record in create_records():
+        writer.write_pair(record)
+    writer.close()
+    assert len(f.flushed) == 6
+    for i, text in enumerate(f.flushed):
+        assert text.endswith("\n")
+        assert len(read_lines(text)) == i + 1
+
+
+def test_valid_after_interruption():
+    # a killed run leaves the header and the finished pairs, without the
+    # summary, and every line of it can still be read
+    f = io.StringIO()
+    writer = ReportWriter(f, "a.pdf", "b.pdf")
+    records = create_records()
+    for record in records[:2]:
+        writer.write_pair(record)
+    lines = read_lines(f.getvalue())
+    assert [line["type"] for line in lines] == ["header", "pair", "pair"]
+    assert [line["pair"] for line in lines[1:]] == [0, 1]
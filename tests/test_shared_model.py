@@ -0,0 +1,50 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from PyQt5.QtGui import QImage
+
+from difference_viewer.core.shared_model import ndarray_to_qimage
+
+
+def qimage_to_ndarray(img: QImage, n_ch: int) -> np.ndarray:
+    ptr = img.constBits()
+    ptr.setsize(img.sizeInBytes())
+    rows = np.frombuffer(ptr, dtype=np.uint8).reshape(img.height(), -1)
+    return rows[:, : img.width() * n_ch].reshape(img.height(), -1, n_ch)
+
+
+@pytest.mark.parametrize("n_ch", [3, 4])
+def test_cropped_array_converts(n_ch: int):
+    rng = np.random.default_rng(0)
+    arr = rng.integers(0, 256, (100, 77, n_ch), dtype=np.uint8)
+    crop = arr[3:60, 5:40]
+    img = ndarray_to_qimage(crop)
+    for _ in range(20):
+        converted = img.convertToFormat(QImage.Format_RGBA8888)
+        rgba = qimage_to_ndarray(converted, 4)
+        assert np.array_equal(rgba[..., :3], crop[..., :3])
+    if n_ch == 4:
+        assert img.bytesPerLine() == crop.shape[1] * 4
+
+
+def test_row_slice_shares_memory():
+    arr = np.zeros((100, 77, 3), dtype=np.uint8)
+    img = ndarray_to_qimage(arr[10:20])
+    assert np.shares_memory(img.array, arr)
+    assert img.bytesPerLine() == arr.strides[0]
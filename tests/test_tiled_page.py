@@ -0,0 +1,60 @@
+# Copyright (C) 2025 Blueno
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import numpy as np
+
+from difference_viewer.widgets.tiled_page import PageTiles, TileCache
+
+
+def create_page(n_ch: int = 3) -> np.ndarray:
+    return np.zeros((1000, 800, n_ch), dtype=np.uint8)
+
+
+def test_nbytes_counts_all_levels():
+    img = create_page()
+    tiles = PageTiles(img, n_levels=3, tile_size=256)
+    assert tiles.nbytes == img.nbytes
+    tiles.prepare_level(0)
+    assert tiles.nbytes == img.nbytes
+    tiles.prepare_level(2)
+    assert tiles.nbytes == img.nbytes + 500 * 400 * 3 + 250 * 200 * 3
+
+
+def test_nbytes_counts_packed_tiles():
+    img = create_page(n_ch=4)
+    tiles = PageTiles(img, n_levels=1, tile_size=256)
+    tiles.prepare_level(0)
+    assert tiles.nbytes == 2 * img.nbytes
+
+
+def test_get_evicts_least_recently_used():
+    img = create_page()
+    cache = TileCache(max_bytes=2 * img.nbytes, n_levels=1)
+    first = cache.get("a", create_page())
+    cache.get("b", create_page())
+    assert cache.get("a", img) is first
+    cache.get("c", create_page())
+    assert list(cache._entries) == ["a", "c"]
+
+
+def test_retain_drops_other_pages():
+    cache = TileCache(max_bytes=2**30, n_levels=1)
+    kept = cache.get(1, create_page())
+    cache.get(2, create_page())
+    cache.retain({1})
+    assert list(cache._entries) == [1]
+    assert cache.get(1, create_page()) is kept